@@ -8,8 +8,13 @@ from typing import Any
 from fastapi import APIRouter, HTTPException, status
 from fastapi.responses import JSONResponse
 
+from app.core.cache import cache_stats
 from app.core.config import settings
+from app.core.single_flight import flight_stats
 from app.middleware.monitoring import health_checker, metrics_collector
+from app.services.llm_health import health_stats
+from app.services.llm_providers import usage_stats
+from app.services.llm_scheduler import scheduler_stats
 
 router = APIRouter()
 
@@ -108,6 +113,23 @@ async def get_system_resource_metrics():
         )
 
 
+@router.get("/metrics/cache")
+async def get_cache_metrics():
+    """Get cache hit rates and request coalescing for this worker."""
+    return {"timestamp": datetime.now(UTC).isoformat(), "caches": cache_stats(), "singleFlight": flight_stats()}
+
+
+@router.get("/metrics/llm")
+async def get_llm_metrics():
+    """Get token usage, provider prompt-cache hits, call queues and provider health for this worker."""
+    return {
+        "timestamp": datetime.now(UTC).isoformat(),
+        "providers": usage_stats(),
+        "scheduler": scheduler_stats(),
+        "health": health_stats(),
+    }
+
+
 @router.get("/dashboard")
 async def get_monitoring_dashboard():
     """Get comprehensive monitoring dashboard data."""
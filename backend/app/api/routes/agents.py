@@ -1,103 +1,95 @@
-import os
+from typing import Any
 
-import yaml
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from app.schemas.agent import AgentConfig
+from app.services import chat_streaming, reply_cache, tutor_chat
+from app.services.agent_registry import RenderedResponse, agent_registry
+from app.services.llm_providers import Completion, LLMError, LLMUnavailableError
+from app.services.reply_cache import AgentReply
 
 router = APIRouter()
 
 
-@router.get("/", response_model=list[dict])
-async def get_available_agents():
-    """Get list of available AI agents."""
-    agents = []
+def _rendered(request: Request, rendered: RenderedResponse) -> Response:
+    headers = {"ETag": rendered.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == rendered.etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=rendered.body, media_type="application/json", headers=headers)
 
-    agents_dir = os.path.join(os.path.dirname(__file__), "..", "..", "agents")
 
-    for agent_file in ["arabic.yaml", "english.yaml", "islamic.yaml"]:
-        agent_path = os.path.join(agents_dir, agent_file)
-
-        try:
-            with open(agent_path, encoding="utf-8") as f:
-                agent_config = yaml.safe_load(f)
+async def _reply(agent: AgentConfig, user_message: str, **kwargs) -> AgentReply:
+    """Agent reply, with provider failures mapped to HTTP errors."""
+    try:
+        return await reply_cache.get_reply(agent, user_message, **kwargs)
+    except LLMUnavailableError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="AI tutor is not available")
+    except LLMError:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="AI tutor failed to respond")
 
-            agents.append(
-                {
-                    "id": agent_file.replace(".yaml", ""),
-                    "name": agent_config.get("name", "Unknown"),
-                    "subject": agent_config.get("subject", "unknown"),
-                    "style": agent_config.get("style", "neutral"),
-                    "voice": agent_config.get("voice", "default"),
-                    "avatar": agent_config.get("avatar", "/avatars/default.png"),
-                    "language": agent_config.get("language", "ar"),
-                    "focusAreas": agent_config.get("focusAreas", []),
-                }
-            )
-        except Exception as e:
-            # Log error but continue with other agents
-            print(f"Error loading agent {agent_file}: {e}")
-            continue
 
-    return agents
+@router.get("/", response_model=list[dict])
+async def get_available_agents(request: Request):
+    """Get list of available AI agents."""
+    return _rendered(request, agent_registry.listing())
 
 
 @router.get("/{agent_id}", response_model=dict)
-async def get_agent_details(agent_id: str):
+async def get_agent_details(agent_id: str, request: Request):
     """Get detailed configuration for specific agent."""
-    agent_file = f"{agent_id}.yaml"
-    agents_dir = os.path.join(os.path.dirname(__file__), "..", "..", "agents")
-    agent_path = os.path.join(agents_dir, agent_file)
-
-    if not os.path.exists(agent_path):
+    rendered = agent_registry.details(agent_id)
+    if rendered is None:
         raise HTTPException(status_code=404, detail="Agent not found")
-
-    try:
-        with open(agent_path, encoding="utf-8") as f:
-            agent_config = yaml.safe_load(f)
-
-        return {
-            "id": agent_id,
-            "name": agent_config.get("name", "Unknown"),
-            "subject": agent_config.get("subject", "unknown"),
-            "style": agent_config.get("style", "neutral"),
-            "voice": agent_config.get("voice", "default"),
-            "avatar": agent_config.get("avatar", "/avatars/default.png"),
-            "language": agent_config.get("language", "ar"),
-            "rules": agent_config.get("rules", []),
-            "contentGuardrails": agent_config.get("contentGuardrails", []),
-            "focusAreas": agent_config.get("focusAreas", []),
-            "examples": agent_config.get("examples", []),
-            "systemPrompt": agent_config.get("systemPrompt", ""),
-        }
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error loading agent configuration: {str(e)}")
+    return _rendered(request, rendered)
 
 
 @router.post("/{agent_id}/chat")
 async def chat_with_agent(agent_id: str, message_data: dict):
     """Send message to AI agent and get response."""
     # Get agent configuration
-    agent_details = await get_agent_details(agent_id)
-
-    # For now, return a simple response based on agent
-    # This will be replaced with actual AI integration
+    agent = agent_registry.get(agent_id)
+    if agent is None:
+        raise HTTPException(status_code=404, detail="Agent not found")
 
     user_message = message_data.get("content", "")
-    child_name = message_data.get("childName", "يا بني")
-
-    if agent_id == "arabic":
-        response = f"أهلاً وسهلاً {child_name}! أنا الأستاذ فصيح وأحب أن أساعدك في تعلم اللغة العربية. شكراً لك على رسالتك: '{user_message}'. هل تريد أن نتعلم حروفاً جديدة معاً؟"
-    elif agent_id == "english":
-        response = f"Hello there {child_name}! I'm Miss Emily and I'm excited to help you learn English! You said: '{user_message}'. That's wonderful! Should we learn some new words together?"
-    elif agent_id == "islamic":
-        response = f"السلام عليكم {child_name}! أنا الشيخ نور وأحب أن أعلمك عن ديننا الجميل. رسالتك: '{user_message}' جميلة جداً. هل تريد أن نتعلم عن الصدق والأمانة؟"
-    else:
-        response = f"Hello! I received your message: '{user_message}'. How can I help you learn today?"
+    reply = await _reply(
+        agent,
+        user_message,
+        lesson_id=message_data.get("lessonId"),
+        age_group=message_data.get("ageGroup"),
+        child_name=message_data.get("childName"),
+    )
 
     return {
         "agentId": agent_id,
-        "agentName": agent_details["name"],
-        "response": response,
+        "agentName": agent.name,
+        "response": reply.completion.text,
         "contentType": "text",
         "suggestions": ["احكي لي عن الحروف", "أريد أن أتعلم كلمات جديدة", "هل يمكنك مساعدتي؟"],
     }
+
+
+@router.post("/{agent_id}/chat/stream")
+async def stream_chat_with_agent(agent_id: str, message_data: dict, request: Request):
+    """Send message to AI agent and stream its response as server-sent events."""
+    agent = agent_registry.get(agent_id)
+    if agent is None:
+        raise HTTPException(status_code=404, detail="Agent not found")
+
+    age_group = message_data.get("ageGroup")
+    events = tutor_chat.stream_reply(
+        agent,
+        message_data.get("content", ""),
+        child_name=message_data.get("childName"),
+        age_group=age_group,
+    )
+
+    async def check(completion: Completion) -> dict[str, Any]:
+        return chat_streaming.safety_fields(reply_cache.checked(agent, completion, age_group))
+
+    return StreamingResponse(
+        chat_streaming.until_disconnected(request, chat_streaming.to_sse(chat_streaming.relay(events, check))),
+        media_type="text/event-stream",
+        headers=chat_streaming.SSE_HEADERS,
+    )
@@ -1,29 +1,46 @@
-from datetime import datetime, timedelta
-
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.security import HTTPBearer
+from sqlmodel import Session
 
 from app.core.database import get_db_session
+from app.core.security import verify_token
 from app.models.assessment import AssessmentResult
 from app.models.child import Child
+from app.services import (
+    assessment_ingest,
+    daily_stats,
+    entity_cache,
+    progress_queries,
+    progress_reports,
+)
+from app.services.entity_cache import GuardianPrincipal
 
 router = APIRouter()
+security = HTTPBearer()
+
+
+async def get_current_guardian(
+    token: str = Depends(security), session: Session = Depends(get_db_session)
+) -> GuardianPrincipal:
+    """Get current authenticated guardian."""
+    payload = verify_token(token.credentials)
+    guardian_id = payload.get("sub")
+
+    guardian = await entity_cache.get_guardian_principal(session, guardian_id)
+    if not guardian:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Guardian not found")
+    return guardian
 
 
 @router.get("/child/{child_id}/progress")
 async def get_child_progress(child_id: str, session: Session = Depends(get_db_session)):
     """Get progress summary for a child."""
-    child = session.get(Child, child_id)
+    child = await session.get(Child, child_id)
     if not child:
         raise HTTPException(status_code=404, detail="Child not found")
 
     # Get recent assessments
-    recent_assessments = session.exec(
-        select(AssessmentResult)
-        .where(AssessmentResult.child_id == child_id)
-        .order_by(AssessmentResult.created_at.desc())
-        .limit(10)
-    ).all()
+    recent_assessments = (await session.execute(progress_queries.recent_assessments_query(child_id, limit=10))).all()
 
     # Calculate basic stats
     total_sessions = len(recent_assessments)
@@ -51,7 +68,7 @@ async def get_child_progress(child_id: str, session: Session = Depends(get_db_se
 @router.post("/child/{child_id}/assessment")
 async def create_assessment(child_id: str, assessment_data: dict, session: Session = Depends(get_db_session)):
     """Create new assessment result for a child."""
-    child = session.get(Child, child_id)
+    child = await session.get(Child, child_id)
     if not child:
         raise HTTPException(status_code=404, detail="Child not found")
 
@@ -60,68 +77,69 @@ async def create_assessment(child_id: str, assessment_data: dict, session: Sessi
         child_id=child_id,
         subject=assessment_data["subject"],
         overall_score=assessment_data.get("overallScore", 0),
-        skill_scores=assessment_data.get("skillScores", "{}"),
-        strengths=assessment_data.get("strengths", "[]"),
-        areas_for_improvement=assessment_data.get("areasForImprovement", "[]"),
-        recommendations=assessment_data.get("recommendations", "[]"),
+        skill_scores=assessment_data.get("skillScores", {}),
+        strengths=assessment_data.get("strengths", []),
+        areas_for_improvement=assessment_data.get("areasForImprovement", []),
+        recommendations=assessment_data.get("recommendations", []),
     )
 
     session.add(assessment)
-    session.commit()
-    session.refresh(assessment)
+    await daily_stats.record_assessment(session, assessment)
+    await session.commit()
 
     return {"assessmentId": assessment.id, "message": "Assessment created successfully"}
 
 
+@router.post("/bulk")
+async def create_assessments_bulk(
+    request: Request,
+    guardian: GuardianPrincipal = Depends(get_current_guardian),
+    session: Session = Depends(get_db_session),
+):
+    """Create many assessment results from a JSON array or NDJSON body in one transaction.
+
+    Every row gets its own status (created, duplicate or error); rows with an
+    ``idempotencyKey`` already stored for the child are not inserted again.
+    """
+    try:
+        items = assessment_ingest.parse_payload(await request.body(), request.headers.get("content-type", ""))
+    except assessment_ingest.PayloadError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return await assessment_ingest.ingest(session, guardian.id, items)
+
+
 @router.get("/child/{child_id}/report")
 async def generate_progress_report(child_id: str, days: int = 7, session: Session = Depends(get_db_session)):
-    """Generate progress report for guardian."""
-    child = session.get(Child, child_id)
+    """Get progress report for guardian.
+
+    ``days=7`` and ``days=30`` get the current calendar week and month (``period``
+    "weekly" and "monthly"), served from rows materialized by the scheduled
+    report builder; other periods ("custom") are computed on demand.
+    """
+    child = await session.get(Child, child_id)
     if not child:
         raise HTTPException(status_code=404, detail="Child not found")
 
-    # Calculate report period
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=days)
-
-    # Get assessments in period
-    assessments = session.exec(
-        select(AssessmentResult)
-        .where(AssessmentResult.child_id == child_id)
-        .where(AssessmentResult.created_at >= start_date)
-        .where(AssessmentResult.created_at <= end_date)
-    ).all()
-
-    # Group by subject
-    subject_stats = {}
-    for assessment in assessments:
-        subject = assessment.subject
-        if subject not in subject_stats:
-            subject_stats[subject] = {"sessionsCompleted": 0, "totalScore": 0, "averageScore": 0}
-
-        subject_stats[subject]["sessionsCompleted"] += 1
-        subject_stats[subject]["totalScore"] += assessment.overall_score
-
-    # Calculate averages
-    for subject, stats in subject_stats.items():
-        if stats["sessionsCompleted"] > 0:
-            stats["averageScore"] = round(stats["totalScore"] / stats["sessionsCompleted"], 1)
+    today = daily_stats.local_today(await daily_stats.guardian_zone(session, child.id))
+    report, report_meta = await progress_reports.get_report(session, child, days, today)
 
+    # Weekly and monthly reports cover the calendar period so far: on a Monday, one day
+    end_date = min(report.end_date, today)
+    calendar_period = report.report_period in progress_reports.REPORT_PERIODS
     return {
         "childId": child_id,
         "childName": child.first_name,
         "reportPeriod": {
-            "startDate": start_date.date().isoformat(),
-            "endDate": end_date.date().isoformat(),
-            "days": days,
+            "period": report.report_period,
+            "startDate": report.start_date.isoformat(),
+            "endDate": end_date.isoformat(),
+            "days": (end_date - report.start_date).days + 1 if calendar_period else days,
         },
-        "totalSessions": len(assessments),
-        "overallAverage": round(sum(a.overall_score for a in assessments) / max(len(assessments), 1), 1),
-        "subjectBreakdown": subject_stats,
-        "parentRecommendations": [
-            "استمر في تشجيع طفلك على التعلم اليومي",
-            "احتفل بالإنجازات الصغيرة",
-            "خصص وقتاً للمراجعة معاً",
-        ],
-        "celebrateAchievements": [f"{child.first_name} أظهر تحسناً رائعاً في التعلم", "الالتزام بالوقت المحدد ممتاز"],
+        "totalSessions": report.total_sessions,
+        "overallAverage": report.average_score,
+        "subjectBreakdown": report.subject_progress_dict,
+        "parentRecommendations": report.parent_recommendations_list,
+        "celebrateAchievements": report.celebrate_achievements_list,
+        "reportMeta": report_meta,
     }
@@ -11,7 +11,13 @@ from app.core.security import (
     verify_token,
 )
 from app.models.guardian import Guardian
-from app.schemas.auth import LoginRequest, RefreshTokenRequest, RegisterRequest, TokenResponse
+from app.schemas.auth import (
+    LoginRequest,
+    RefreshTokenRequest,
+    RegisterRequest,
+    TokenResponse,
+)
+from app.services import entity_cache
 
 router = APIRouter()
 security = HTTPBearer()
@@ -100,7 +106,7 @@ async def get_current_guardian(token: str = Depends(security), session: Session
     payload = verify_token(token.credentials)
     guardian_id = payload.get("sub")
 
-    guardian = session.get(Guardian, guardian_id)
+    guardian = await entity_cache.get_guardian_principal(session, guardian_id)
     if not guardian:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Guardian not found")
 
@@ -1,56 +1,45 @@
-import json
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer
-from sqlmodel import Session, select
+from sqlmodel import Session
 
 from app.core.database import get_db_session
 from app.core.security import verify_token
 from app.models.child import Child
-from app.models.guardian import Guardian
+from app.services import entity_cache
+from app.services.entity_cache import GuardianPrincipal
 
 router = APIRouter()
 security = HTTPBearer()
 
 
-async def get_current_guardian(token: str = Depends(security), session: Session = Depends(get_db_session)) -> Guardian:
+async def get_current_guardian(
+    token: str = Depends(security), session: Session = Depends(get_db_session)
+) -> GuardianPrincipal:
     """Get current authenticated guardian."""
     payload = verify_token(token.credentials)
     guardian_id = payload.get("sub")
 
-    guardian = session.get(Guardian, guardian_id)
+    guardian = await entity_cache.get_guardian_principal(session, guardian_id)
     if not guardian:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Guardian not found")
     return guardian
 
 
 @router.get("/", response_model=list[dict])
-async def get_children(guardian: Guardian = Depends(get_current_guardian), session: Session = Depends(get_db_session)):
+async def get_children(
+    guardian: GuardianPrincipal = Depends(get_current_guardian), session: Session = Depends(get_db_session)
+):
     """Get all children for current guardian."""
-    children = session.exec(select(Child).where(Child.guardian_id == guardian.id)).all()
-
-    return [
-        {
-            "id": child.id,
-            "firstName": child.first_name,
-            "ageGroup": child.age_group,
-            "preferredLanguage": child.preferred_language,
-            "avatar": child.avatar,
-            "totalPoints": child.total_points,
-            "currentStreak": child.current_streak,
-            "enabledSubjects": child.enabled_subjects_list,
-            "dailyTimeLimit": child.daily_time_limit,
-            "voiceEnabled": child.voice_enabled,
-            "chatEnabled": child.chat_enabled,
-        }
-        for child in children
-    ]
+    return await entity_cache.get_children(session, guardian.id)
 
 
 @router.post("/", response_model=dict)
 async def create_child(
-    child_data: dict, guardian: Guardian = Depends(get_current_guardian), session: Session = Depends(get_db_session)
+    child_data: dict,
+    guardian: GuardianPrincipal = Depends(get_current_guardian),
+    session: Session = Depends(get_db_session),
 ):
     """Create a new child for current guardian."""
     child = Child(
@@ -62,8 +51,9 @@ async def create_child(
     )
 
     session.add(child)
-    session.commit()
-    session.refresh(child)
+    await session.commit()
+    await session.refresh(child)
+    await entity_cache.invalidate_child(child.id, guardian.id)
 
     return {
         "id": child.id,
@@ -76,41 +66,28 @@ async def create_child(
 
 @router.get("/{child_id}")
 async def get_child(
-    child_id: UUID, guardian: Guardian = Depends(get_current_guardian), session: Session = Depends(get_db_session)
+    child_id: UUID,
+    guardian: GuardianPrincipal = Depends(get_current_guardian),
+    session: Session = Depends(get_db_session),
 ):
     """Get specific child details."""
-    child = session.get(Child, child_id)
+    cached = await entity_cache.get_child(session, child_id)
 
-    if not child or child.guardian_id != guardian.id:
+    if not cached or cached["guardianId"] != str(guardian.id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Child not found")
 
-    return {
-        "id": child.id,
-        "firstName": child.first_name,
-        "ageGroup": child.age_group,
-        "preferredLanguage": child.preferred_language,
-        "avatar": child.avatar,
-        "totalPoints": child.total_points,
-        "currentStreak": child.current_streak,
-        "enabledSubjects": child.enabled_subjects_list,
-        "dailyTimeLimit": child.daily_time_limit,
-        "voiceEnabled": child.voice_enabled,
-        "chatEnabled": child.chat_enabled,
-        "voiceRecordingAllowed": child.voice_recording_allowed,
-        "dataRetentionDays": child.data_retention_days,
-        "lastActivity": child.last_activity,
-    }
+    return cached["child"]
 
 
 @router.put("/{child_id}")
 async def update_child(
     child_id: UUID,
     child_data: dict,
-    guardian: Guardian = Depends(get_current_guardian),
+    guardian: GuardianPrincipal = Depends(get_current_guardian),
     session: Session = Depends(get_db_session),
 ):
     """Update child information."""
-    child = session.get(Child, child_id)
+    child = await session.get(Child, child_id)
 
     if not child or child.guardian_id != guardian.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Child not found")
@@ -144,27 +121,31 @@ async def update_child(
             elif field == "dataRetentionDays":
                 child.data_retention_days = value
             elif field == "enabledSubjects":
-                child.enabled_subjects = json.dumps(value)
+                child.enabled_subjects = list(value)
 
     session.add(child)
-    session.commit()
-    session.refresh(child)
+    await session.commit()
+    await session.refresh(child)
+    await entity_cache.invalidate_child(child.id, guardian.id)
 
     return {"id": child.id, "firstName": child.first_name, "message": "Child updated successfully"}
 
 
 @router.delete("/{child_id}")
 async def delete_child(
-    child_id: UUID, guardian: Guardian = Depends(get_current_guardian), session: Session = Depends(get_db_session)
+    child_id: UUID,
+    guardian: GuardianPrincipal = Depends(get_current_guardian),
+    session: Session = Depends(get_db_session),
 ):
     """Delete child (soft delete by deactivating)."""
-    child = session.get(Child, child_id)
+    child = await session.get(Child, child_id)
 
     if not child or child.guardian_id != guardian.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Child not found")
 
     # Soft delete - just remove from active children
-    session.delete(child)
-    session.commit()
+    await session.delete(child)
+    await session.commit()
+    await entity_cache.invalidate_child(child_id, guardian.id)
 
     return {"message": "Child deleted successfully"}
@@ -7,20 +7,23 @@ from sqlmodel import Session, func, select
 
 from app.core.database import get_db_session
 from app.core.security import verify_token
+from app.models.analytics import ChildDailyStats
 from app.models.child import Child
-from app.models.guardian import Guardian
-from app.models.session import Session as LearningSession
+from app.services import daily_stats, entity_cache, progress_queries
+from app.services.entity_cache import GuardianPrincipal
 
 router = APIRouter()
 security = HTTPBearer()
 
 
-async def get_current_guardian(token: str = Depends(security), session: Session = Depends(get_db_session)) -> Guardian:
+async def get_current_guardian(
+    token: str = Depends(security), session: Session = Depends(get_db_session)
+) -> GuardianPrincipal:
     """Get current authenticated guardian."""
     payload = verify_token(token.credentials)
     guardian_id = payload.get("sub")
 
-    guardian = session.get(Guardian, guardian_id)
+    guardian = await entity_cache.get_guardian_principal(session, guardian_id)
     if not guardian:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Guardian not found")
     return guardian
@@ -28,56 +31,50 @@ async def get_current_guardian(token: str = Depends(security), session: Session
 
 @router.get("/overview")
 async def get_dashboard_overview(
-    guardian: Guardian = Depends(get_current_guardian), session: Session = Depends(get_db_session)
+    guardian: GuardianPrincipal = Depends(get_current_guardian), session: Session = Depends(get_db_session)
 ):
     """Get dashboard overview with key metrics."""
     # Get all children for this guardian
-    children = session.exec(select(Child).where(Child.guardian_id == guardian.id)).all()
+    children = (await session.execute(select(Child).where(Child.guardian_id == guardian.id))).scalars().all()
 
     if not children:
         return {"totalChildren": 0, "totalSessions": 0, "totalPoints": 0, "averageEngagement": 0, "children": []}
 
     child_ids = [child.id for child in children]
-
-    # Get session statistics
-    total_sessions = (
-        session.exec(select(func.count(LearningSession.id)).where(LearningSession.child_id.in_(child_ids))).first() or 0
-    )
-
-    completed_sessions = (
-        session.exec(
-            select(func.count(LearningSession.id)).where(
-                LearningSession.child_id.in_(child_ids), LearningSession.status == "completed"
+    recent_start = daily_stats.local_today(guardian.timezone) - timedelta(days=7)
+    is_recent = ChildDailyStats.day >= recent_start
+
+    # Session statistics per child, read from the daily rollup
+    rows = (
+        await session.execute(
+            select(
+                ChildDailyStats.child_id,
+                func.sum(ChildDailyStats.sessions_started).label("sessions"),
+                func.sum(ChildDailyStats.sessions_completed).label("completed"),
+                func.sum(ChildDailyStats.engagement_total).filter(is_recent).label("engagement_total"),
+                func.sum(ChildDailyStats.engagement_count).filter(is_recent).label("engagement_count"),
             )
-        ).first()
-        or 0
-    )
+            .where(ChildDailyStats.child_id.in_(child_ids))
+            .group_by(ChildDailyStats.child_id)
+        )
+    ).all()
+    stats_by_child = {row.child_id: row for row in rows}
+
+    total_sessions = sum(row.sessions for row in rows)
+    completed_sessions = sum(row.completed for row in rows)
 
     # Calculate total points across all children
     total_points = sum(child.total_points for child in children)
 
-    # Get recent sessions for engagement calculation
-    recent_sessions = session.exec(
-        select(LearningSession).where(
-            LearningSession.child_id.in_(child_ids), LearningSession.created_at >= datetime.utcnow() - timedelta(days=7)
-        )
-    ).all()
-
-    # Calculate average engagement
-    engagement_scores = [s.engagement_level for s in recent_sessions if s.engagement_level]
-    engagement_map = {"low": 1, "medium": 2, "high": 3}
-    avg_engagement = 0
-    if engagement_scores:
-        numeric_scores = [engagement_map.get(score, 0) for score in engagement_scores]
-        avg_engagement = sum(numeric_scores) / len(numeric_scores)
+    # Calculate average engagement over the last 7 days
+    engagement_count = sum(row.engagement_count or 0 for row in rows)
+    engagement_total = sum(row.engagement_total or 0 for row in rows)
+    avg_engagement = engagement_total / engagement_count if engagement_count else 0
 
     # Get children summary
     children_summary = []
     for child in children:
-        child_sessions = (
-            session.exec(select(func.count(LearningSession.id)).where(LearningSession.child_id == child.id)).first()
-            or 0
-        )
+        child_stats = stats_by_child.get(child.id)
 
         children_summary.append(
             {
@@ -86,7 +83,7 @@ async def get_dashboard_overview(
                 "ageGroup": child.age_group,
                 "totalPoints": child.total_points,
                 "currentStreak": child.current_streak,
-                "totalSessions": child_sessions,
+                "totalSessions": child_stats.sessions if child_stats else 0,
                 "lastActivity": child.last_activity.isoformat() if child.last_activity else None,
                 "avatar": child.avatar,
             }
@@ -104,102 +101,79 @@ async def get_dashboard_overview(
 
 @router.get("/analytics")
 async def get_dashboard_analytics(
-    guardian: Guardian = Depends(get_current_guardian), session: Session = Depends(get_db_session), days: int = 30
+    guardian: GuardianPrincipal = Depends(get_current_guardian),
+    session: Session = Depends(get_db_session),
+    days: int = 30,
 ):
-    """Get detailed analytics for dashboard."""
-    children = session.exec(select(Child).where(Child.guardian_id == guardian.id)).all()
+    """Get detailed analytics for dashboard.
 
-    if not children:
-        return {"sessionTrends": [], "subjectBreakdown": {}, "engagementTrends": [], "pointsEarned": []}
+    Reads the per-day, per-subject ``child_daily_stats`` rollup, whose days are
+    already local to the guardian's timezone, so cost grows with the number of
+    days rather than the number of sessions.
+    """
+    start_day = daily_stats.local_today(guardian.timezone) - timedelta(days=days)
+    buckets = (await session.execute(progress_queries.guardian_daily_buckets_query(guardian.id, start_day))).all()
 
-    child_ids = [child.id for child in children]
-    start_date = datetime.utcnow() - timedelta(days=days)
-
-    # Get sessions within date range
-    sessions = session.exec(
-        select(LearningSession).where(LearningSession.child_id.in_(child_ids), LearningSession.created_at >= start_date)
-    ).all()
-
-    # Session trends by day
+    # Fold the (day, subject) buckets into per-day and per-subject series
     session_trends = {}
-    for s in sessions:
-        date_key = s.created_at.date().isoformat()
-        session_trends[date_key] = session_trends.get(date_key, 0) + 1
-
-    # Subject breakdown
     subject_breakdown = {}
-    for s in sessions:
-        subject_breakdown[s.subject] = subject_breakdown.get(s.subject, 0) + 1
-
-    # Engagement trends
-    engagement_trends = {}
-    for s in sessions:
-        if s.engagement_level:
-            date_key = s.created_at.date().isoformat()
-            if date_key not in engagement_trends:
-                engagement_trends[date_key] = []
-            engagement_trends[date_key].append(s.engagement_level)
-
-    # Calculate average engagement per day
-    engagement_averages = {}
-    engagement_map = {"low": 1, "medium": 2, "high": 3}
-    for date, levels in engagement_trends.items():
-        numeric_levels = [engagement_map.get(level, 0) for level in levels]
-        engagement_averages[date] = sum(numeric_levels) / len(numeric_levels)
-
-    # Points earned over time
+    engagement_totals = {}
     points_earned = {}
-    for s in sessions:
-        date_key = s.created_at.date().isoformat()
-        points_earned[date_key] = points_earned.get(date_key, 0) + s.points_earned
+    for bucket in buckets:
+        date_key = bucket.day.isoformat()
+        if bucket.sessions:
+            session_trends[date_key] = session_trends.get(date_key, 0) + bucket.sessions
+            subject_breakdown[bucket.subject] = subject_breakdown.get(bucket.subject, 0) + bucket.sessions
+        if bucket.points:
+            points_earned[date_key] = points_earned.get(date_key, 0) + bucket.points
+        if bucket.engagement_count:
+            total, count = engagement_totals.get(date_key, (0, 0))
+            engagement_totals[date_key] = (total + bucket.engagement_total, count + bucket.engagement_count)
 
     return {
-        "sessionTrends": [{"date": date, "sessions": count} for date, count in sorted(session_trends.items())],
+        "sessionTrends": [{"date": date, "sessions": count} for date, count in session_trends.items()],
         "subjectBreakdown": subject_breakdown,
         "engagementTrends": [
-            {"date": date, "engagement": round(avg, 2)} for date, avg in sorted(engagement_averages.items())
+            {"date": date, "engagement": round(total / count, 2)} for date, (total, count) in engagement_totals.items()
         ],
-        "pointsEarned": [{"date": date, "points": points} for date, points in sorted(points_earned.items())],
+        "pointsEarned": [{"date": date, "points": points} for date, points in points_earned.items()],
     }
 
 
 @router.get("/child/{child_id}/progress")
 async def get_child_progress(
-    child_id: UUID, guardian: Guardian = Depends(get_current_guardian), session: Session = Depends(get_db_session)
+    child_id: UUID,
+    guardian: GuardianPrincipal = Depends(get_current_guardian),
+    session: Session = Depends(get_db_session),
 ):
     """Get detailed progress for a specific child."""
     # Verify child belongs to guardian
-    child = session.get(Child, child_id)
+    child = await session.get(Child, child_id)
     if not child or child.guardian_id != guardian.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Child not found")
 
-    # Get child's sessions
-    child_sessions = session.exec(
-        select(LearningSession).where(LearningSession.child_id == child_id).order_by(LearningSession.created_at.desc())
-    ).all()
+    # Per-subject totals from the daily rollup
+    subject_rows = (await session.execute(progress_queries.child_subject_totals_query(child_id))).all()
 
     # Calculate progress metrics
-    total_sessions = len(child_sessions)
-    completed_sessions = len([s for s in child_sessions if s.status == "completed"])
-    total_time_spent = sum(s.time_spent for s in child_sessions)
+    total_sessions = sum(row.sessions for row in subject_rows)
+    completed_sessions = sum(row.completed for row in subject_rows)
+    total_time_spent = sum(row.minutes for row in subject_rows)
 
     # Subject progress
-    subject_progress = {}
-    for s in child_sessions:
-        if s.subject not in subject_progress:
-            subject_progress[s.subject] = {"sessions": 0, "totalScore": 0, "averageScore": 0, "timeSpent": 0}
-
-        subject_progress[s.subject]["sessions"] += 1
-        subject_progress[s.subject]["totalScore"] += s.final_score or 0
-        subject_progress[s.subject]["timeSpent"] += s.time_spent
-
-    # Calculate averages
-    for subject_data in subject_progress.values():
-        if subject_data["sessions"] > 0:
-            subject_data["averageScore"] = subject_data["totalScore"] / subject_data["sessions"]
-
-    # Recent activity
-    recent_sessions = child_sessions[:10]  # Last 10 sessions
+    subject_progress = {
+        row.subject: {
+            "sessions": row.sessions,
+            "totalScore": row.total_score,
+            "averageScore": row.total_score / row.sessions if row.sessions else 0,
+            "timeSpent": row.minutes,
+        }
+        for row in subject_rows
+        if row.sessions
+    }
+
+    # Recent activity (last 10 sessions)
+    recent_sessions = (await session.execute(progress_queries.recent_sessions_query(child_id, limit=10))).all()
     recent_activity = [
         {
             "id": s.id,
@@ -236,10 +210,10 @@ async def get_child_progress(
 
 @router.get("/notifications")
 async def get_notifications(
-    guardian: Guardian = Depends(get_current_guardian), session: Session = Depends(get_db_session)
+    guardian: GuardianPrincipal = Depends(get_current_guardian), session: Session = Depends(get_db_session)
 ):
     """Get notifications for guardian dashboard."""
-    children = session.exec(select(Child).where(Child.guardian_id == guardian.id)).all()
+    children = (await session.execute(select(Child).where(Child.guardian_id == guardian.id))).scalars().all()
 
     notifications = []
 
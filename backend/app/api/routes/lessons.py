@@ -3,21 +3,33 @@ from sqlmodel import Session, select
 
 from app.core.database import get_db_session
 from app.models.lesson import Lesson
+from app.services import entity_cache
 
 router = APIRouter()
 
 
 @router.get("/", response_model=list[dict])
-async def get_lessons(subject: str = None, age_group: str = None, session: Session = Depends(get_db_session)):
-    """Get available lessons, optionally filtered by subject and age group."""
+async def get_lessons(
+    subject: str = None,
+    age_group: str = None,
+    tag: str = None,
+    keyword: str = None,
+    session: Session = Depends(get_db_session),
+):
+    """Get available lessons, optionally filtered by subject, age group, tag and keyword."""
     query = select(Lesson).where(Lesson.is_published)
 
     if subject:
         query = query.where(Lesson.subject == subject)
     if age_group:
         query = query.where(Lesson.age_group == age_group)
+    # JSONB containment, served by the GIN indexes on tags and keywords
+    if tag:
+        query = query.where(Lesson.tags.contains([tag]))
+    if keyword:
+        query = query.where(Lesson.keywords.contains([keyword]))
 
-    lessons = session.exec(query).all()
+    lessons = (await session.execute(query)).scalars().all()
 
     return [
         {
@@ -38,33 +50,11 @@ async def get_lessons(subject: str = None, age_group: str = None, session: Sessi
 @router.get("/{lesson_id}")
 async def get_lesson_details(lesson_id: str, session: Session = Depends(get_db_session)):
     """Get detailed lesson information including activities."""
-    lesson = session.get(Lesson, lesson_id)
+    lesson = await entity_cache.get_lesson_details(session, lesson_id)
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
 
-    return {
-        "id": lesson.id,
-        "title": lesson.title,
-        "description": lesson.description,
-        "subject": lesson.subject,
-        "ageGroup": lesson.age_group,
-        "difficulty": lesson.difficulty,
-        "estimatedDuration": lesson.estimated_duration,
-        "objectives": lesson.objectives_list,
-        "keywords": lesson.keywords_list,
-        "activities": [
-            {
-                "id": activity.activity_id,
-                "type": activity.type,
-                "title": activity.title,
-                "description": activity.description,
-                "expectedDuration": activity.expected_duration,
-                "points": activity.points,
-                "required": activity.required_for_completion,
-            }
-            for activity in lesson.activities
-        ],
-    }
+    return lesson
 
 
 @router.post("/seed")
@@ -78,8 +68,8 @@ async def seed_sample_lessons(session: Session = Depends(get_db_session)):
         age_group="4-6",
         difficulty="beginner",
         estimated_duration=15,
-        objectives='["تعلم 5 حروف أساسية", "النطق الصحيح", "التمييز البصري"]',
-        keywords='["حروف", "ألف", "باء", "تاء", "ثاء", "جيم"]',
+        objectives=["تعلم 5 حروف أساسية", "النطق الصحيح", "التمييز البصري"],
+        keywords=["حروف", "ألف", "باء", "تاء", "ثاء", "جيم"],
         is_published=True,
     )
 
@@ -91,8 +81,8 @@ async def seed_sample_lessons(session: Session = Depends(get_db_session)):
         age_group="4-6",
         difficulty="beginner",
         estimated_duration=20,
-        objectives='["Learn 5 basic colors", "Count 1-10", "Simple pronunciation"]',
-        keywords='["red", "blue", "green", "one", "two", "three"]',
+        objectives=["Learn 5 basic colors", "Count 1-10", "Simple pronunciation"],
+        keywords=["red", "blue", "green", "one", "two", "three"],
         is_published=True,
     )
 
@@ -104,8 +94,8 @@ async def seed_sample_lessons(session: Session = Depends(get_db_session)):
         age_group="4-6",
         difficulty="beginner",
         estimated_duration=10,
-        objectives='["فهم معنى الصدق", "أمثلة من السيرة", "التطبيق العملي"]',
-        keywords='["صدق", "أمانة", "خلق", "قيم"]',
+        objectives=["فهم معنى الصدق", "أمثلة من السيرة", "التطبيق العملي"],
+        keywords=["صدق", "أمانة", "خلق", "قيم"],
         is_published=True,
     )
 
@@ -1,34 +1,91 @@
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from typing import Any
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer
-from sqlmodel import Session, select
+from sqlmodel import Session
 
-from app.core.database import get_db_session
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_db_session
 from app.core.security import verify_token
 from app.models.child import Child
-from app.models.guardian import Guardian
 from app.models.session import ChatMessage
 from app.models.session import Session as LearningSession
+from app.schemas.agent import AgentConfig
+from app.services import (
+    chat_context,
+    chat_history,
+    chat_streaming,
+    chat_write_behind,
+    child_progress,
+    daily_stats,
+    entity_cache,
+    reply_cache,
+    tutor_chat,
+)
+from app.services.agent_registry import agent_registry
+from app.services.entity_cache import GuardianPrincipal
+from app.services.llm_providers import Completion, LLMError, LLMUnavailableError
+from app.services.reply_cache import AgentReply
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 security = HTTPBearer()
 
 
-async def get_current_guardian(token: str = Depends(security), session: Session = Depends(get_db_session)) -> Guardian:
+async def get_current_guardian(
+    token: str = Depends(security), session: Session = Depends(get_db_session)
+) -> GuardianPrincipal:
     """Get current authenticated guardian."""
     payload = verify_token(token.credentials)
     guardian_id = payload.get("sub")
 
-    guardian = session.get(Guardian, guardian_id)
+    guardian = await entity_cache.get_guardian_principal(session, guardian_id)
     if not guardian:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Guardian not found")
     return guardian
 
 
+async def _reply(agent: AgentConfig, user_message: str, **kwargs) -> AgentReply:
+    """Agent reply, with provider failures mapped to HTTP errors."""
+    try:
+        return await reply_cache.get_reply(agent, user_message, **kwargs)
+    except LLMUnavailableError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="AI tutor is not available")
+    except LLMError:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="AI tutor failed to respond")
+
+
+async def _context_window(
+    db: Session, learning_session: LearningSession, agent: AgentConfig, child: Child, user_message: str
+) -> chat_context.ContextWindow:
+    """Conversation history and context for a turn, within the agent's token budget."""
+    lesson = await entity_cache.get_lesson_details(db, learning_session.lesson_id)
+    messages = await chat_context.recent_messages(db, learning_session)
+    return chat_context.fit(
+        agent, user_message, messages, learning_session.context_summary, lesson, child.first_name, child.age_group
+    )
+
+
 @router.post("/start")
 async def start_session(
-    session_data: dict, guardian: Guardian = Depends(get_current_guardian), session: Session = Depends(get_db_session)
+    session_data: dict,
+    guardian: GuardianPrincipal = Depends(get_current_guardian),
+    session: Session = Depends(get_db_session),
 ):
     """Start a new learning session."""
     child_id = session_data["childId"]
@@ -36,7 +93,7 @@ async def start_session(
     agent_id = session_data["agentId"]
 
     # Verify child belongs to guardian
-    child = session.get(Child, child_id)
+    child = await session.get(Child, child_id)
     if not child or child.guardian_id != guardian.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Child not found")
 
@@ -50,8 +107,8 @@ async def start_session(
     )
 
     session.add(learning_session)
-    session.commit()
-    session.refresh(learning_session)
+    await daily_stats.record_session_started(session, learning_session)
+    await session.commit()
 
     return {
         "sessionId": learning_session.id,
@@ -65,17 +122,17 @@ async def start_session(
 async def send_message(
     session_id: UUID,
     message_data: dict,
-    guardian: Guardian = Depends(get_current_guardian),
+    guardian: GuardianPrincipal = Depends(get_current_guardian),
     session: Session = Depends(get_db_session),
 ):
     """Send message in session."""
     # Get session and verify ownership
-    learning_session = session.get(LearningSession, session_id)
+    learning_session = await session.get(LearningSession, session_id)
     if not learning_session:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
 
     # Verify child belongs to guardian
-    child = session.get(Child, learning_session.child_id)
+    child = await session.get(Child, learning_session.child_id)
     if not child or child.guardian_id != guardian.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
@@ -87,18 +144,44 @@ async def send_message(
         content_type=message_data.get("contentType", "text"),
     )
 
-    session.add(child_message)
+    agent = agent_registry.get(learning_session.agent_id)
+    if agent is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
 
-    # Generate AI response (placeholder for now)
+    window = await _context_window(session, learning_session, agent, child, message_data["content"])
+    reply = await _reply(
+        agent,
+        message_data["content"],
+        lesson_id=learning_session.lesson_id,
+        age_group=child.age_group,
+        history=window.history,
+        child_name=child.first_name,
+        context=window.context,
+        fair_key=str(child.id),
+    )
     agent_response = ChatMessage(
         session_id=session_id,
         role="agent",
-        content=f"مرحباً! أنا الأستاذ فصيح وسأساعدك في تعلم اللغة العربية. شكراً لك على رسالتك: '{message_data['content']}'",
+        content=reply.completion.text,
         content_type="text",
+        is_flagged=not reply.safety.passed,
+        flagged_reason=None if reply.safety.passed else reply.safety.reason,
+        message_metadata={
+            **chat_streaming.completion_metadata(reply.completion),
+            "cached": reply.cached,
+            "coalesced": reply.shared,
+            "contextTokens": window.prompt_tokens,
+            "safety": reply.safety.to_dict(),
+        },
     )
 
-    session.add(agent_response)
-    session.commit()
+    # With write-behind the turn is acknowledged once durably queued
+    if settings.CHAT_WRITE_BEHIND_ENABLED:
+        await chat_write_behind.enqueue([child_message, agent_response])
+    else:
+        session.add_all([child_message, agent_response])
+        await session.commit()
+    chat_context.schedule_compaction(learning_session, window.compactable)
 
     return {
         "childMessage": {
@@ -114,58 +197,209 @@ async def send_message(
     }
 
 
+def _stream_turn(
+    learning_session: LearningSession,
+    child: Child,
+    agent: AgentConfig,
+    message_data: dict,
+    window: chat_context.ContextWindow,
+) -> AsyncIterator[dict[str, Any]]:
+    """Client events of one streamed chat turn, persisting it once the reply is complete."""
+    child_message = ChatMessage(
+        session_id=learning_session.id,
+        role="child",
+        content=message_data["content"],
+        content_type=message_data.get("contentType", "text"),
+    )
+
+    async def persist(completion: Completion) -> dict[str, Any]:
+        reply = reply_cache.checked(agent, completion, child.age_group)
+        agent_response = ChatMessage(
+            session_id=learning_session.id,
+            role="agent",
+            content=reply.completion.text,
+            content_type="text",
+            is_flagged=not reply.safety.passed,
+            flagged_reason=None if reply.safety.passed else reply.safety.reason,
+            message_metadata={
+                **chat_streaming.completion_metadata(completion),
+                "contextTokens": window.prompt_tokens,
+                "safety": reply.safety.to_dict(),
+            },
+        )
+        await chat_streaming.save_messages([child_message, agent_response])
+        chat_context.schedule_compaction(learning_session, window.compactable)
+        return {
+            **chat_streaming.safety_fields(reply),
+            "childMessage": {"id": child_message.id, "timestamp": child_message.timestamp.isoformat()},
+            "agentResponse": {"id": agent_response.id, "timestamp": agent_response.timestamp.isoformat()},
+        }
+
+    events = tutor_chat.stream_reply(
+        agent,
+        message_data["content"],
+        window.history,
+        child_name=child.first_name,
+        context=window.context,
+        age_group=child.age_group,
+        fair_key=str(child.id),
+    )
+    return chat_streaming.relay(events, on_complete=persist)
+
+
+@router.post("/{session_id}/message/stream")
+async def stream_message(
+    session_id: UUID,
+    message_data: dict,
+    request: Request,
+    guardian: GuardianPrincipal = Depends(get_current_guardian),
+    session: Session = Depends(get_db_session),
+):
+    """Send message in session and stream the agent's reply as server-sent events."""
+    learning_session = await session.get(LearningSession, session_id)
+    if not learning_session:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+
+    child = await session.get(Child, learning_session.child_id)
+    if not child or child.guardian_id != guardian.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+
+    agent = agent_registry.get(learning_session.agent_id)
+    if agent is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
+
+    window = await _context_window(session, learning_session, agent, child, message_data["content"])
+    events = _stream_turn(learning_session, child, agent, message_data, window)
+    return StreamingResponse(
+        chat_streaming.until_disconnected(request, chat_streaming.to_sse(events)),
+        media_type="text/event-stream",
+        headers=chat_streaming.SSE_HEADERS,
+    )
+
+
+@router.websocket("/{session_id}/stream")
+async def session_stream(websocket: WebSocket, session_id: UUID, token: str):
+    """Chat over a WebSocket.
+
+    Authenticated with the access token in the ``token`` query parameter.
+    The client sends ``{"type": "message", "content": ...}`` and receives
+    ``token`` events followed by ``done`` (or ``error``); ``{"type": "cancel"}``
+    aborts the reply in progress. Disconnecting cancels it as well.
+    """
+    try:
+        guardian_id = verify_token(token).get("sub")
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    async with AsyncSessionLocal() as db:
+        guardian = await entity_cache.get_guardian_principal(db, guardian_id)
+        learning_session = await db.get(LearningSession, session_id)
+        child = await db.get(Child, learning_session.child_id) if learning_session else None
+    if not guardian or not child or child.guardian_id != guardian.id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    agent = agent_registry.get(learning_session.agent_id)
+    if agent is None:
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        return
+
+    async def run_turn(message_data: dict) -> None:
+        # The session's summary moves on as the conversation is compacted
+        async with AsyncSessionLocal() as db:
+            current = await db.get(LearningSession, session_id)
+            window = await _context_window(db, current, agent, child, message_data["content"])
+        events = _stream_turn(current, child, agent, message_data, window)
+        try:
+            async for event in events:
+                await websocket.send_json(jsonable_encoder(event))
+        finally:
+            await events.aclose()
+
+    await websocket.accept()
+    turn: asyncio.Task | None = None
+    try:
+        while True:
+            data = await websocket.receive_json()
+            kind = data.get("type")
+            if kind == "cancel":
+                if turn is not None and not turn.done():
+                    turn.cancel()
+                    await websocket.send_json({"type": "cancelled"})
+            elif kind == "message" and data.get("content"):
+                if turn is not None and not turn.done():
+                    await websocket.send_json({"type": "error", "status": 409, "detail": "A reply is in progress"})
+                    continue
+                turn = asyncio.create_task(run_turn(data))
+            else:
+                await websocket.send_json({"type": "error", "status": 400, "detail": "Unknown message type"})
+    except WebSocketDisconnect:
+        logger.debug(f"Chat stream for session {session_id} disconnected")
+    finally:
+        if turn is not None and not turn.done():
+            turn.cancel()
+
+
 @router.get("/{session_id}/messages")
 async def get_session_messages(
-    session_id: UUID, guardian: Guardian = Depends(get_current_guardian), session: Session = Depends(get_db_session)
+    session_id: UUID,
+    cursor: str | None = None,
+    limit: int = chat_history.DEFAULT_PAGE_SIZE,
+    format: str = "json",
+    guardian: GuardianPrincipal = Depends(get_current_guardian),
+    session: Session = Depends(get_db_session),
 ):
-    """Get all messages from a session."""
+    """Get session messages a page at a time, or the full transcript as NDJSON with ``format=ndjson``."""
     # Verify session ownership
-    learning_session = session.get(LearningSession, session_id)
+    learning_session = await session.get(LearningSession, session_id)
     if not learning_session:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
 
-    child = session.get(Child, learning_session.child_id)
+    child = await session.get(Child, learning_session.child_id)
     if not child or child.guardian_id != guardian.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
-    messages = session.exec(select(ChatMessage).where(ChatMessage.session_id == session_id)).all()
+    if format == "ndjson":
+        return StreamingResponse(chat_history.stream_ndjson(session_id), media_type="application/x-ndjson")
+
+    try:
+        messages, next_cursor = await chat_history.get_page(session, session_id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
     return {
         "sessionId": session_id,
-        "messages": [
-            {
-                "id": msg.id,
-                "role": msg.role,
-                "content": msg.content,
-                "contentType": msg.content_type,
-                "timestamp": msg.timestamp.isoformat(),
-            }
-            for msg in messages
-        ],
+        "messages": messages,
+        "nextCursor": next_cursor,
     }
 
 
 @router.post("/{session_id}/end")
 async def end_session(
-    session_id: UUID, guardian: Guardian = Depends(get_current_guardian), session: Session = Depends(get_db_session)
+    session_id: UUID,
+    guardian: GuardianPrincipal = Depends(get_current_guardian),
+    session: Session = Depends(get_db_session),
 ):
     """End a learning session."""
-    learning_session = session.get(LearningSession, session_id)
+    learning_session = await session.get(LearningSession, session_id)
     if not learning_session:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
 
     # Verify ownership
-    child = session.get(Child, learning_session.child_id)
+    child = await session.get(Child, learning_session.child_id)
     if not child or child.guardian_id != guardian.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
-    # Update session status
-    learning_session.status = "completed"
-    learning_session.final_score = 85  # Placeholder score
-    learning_session.points_earned = 10
-
-    session.add(learning_session)
-    session.commit()
+    # Completion and the child's points and streak are updated atomically in SQL;
+    # ending an already completed session does not count it again
+    completed = await child_progress.complete_session(session, session_id, final_score=85, points=10)  # Placeholder
+    await session.commit()
+    if completed is None:
+        await session.refresh(learning_session)
+    else:
+        # Points and streak shown on the child's cached profile changed
+        await entity_cache.invalidate_child(child.id, guardian.id)
 
     return {
         "sessionId": session_id,
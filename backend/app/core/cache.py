@@ -0,0 +1,348 @@
+"""Two-tier cache for rarely changing entities.
+
+Lookups go through an in-process LRU (short TTL) and then Redis (longer
+TTL) before falling back to the loader, usually a Postgres query:
+
+    @cached("child", tags=lambda child_id: [f"child:{child_id}"])
+    async def load_child(db, child_id):
+        ...
+
+    await load_child(db, child_id)       # cached by (child_id)
+    await invalidate(f"child:{child_id}")  # after the write commits
+
+Entries are tagged by the entities they were built from. Invalidating a
+tag evicts matching local entries, replaces the tag's token in Redis and
+broadcasts the tag over ``app.core.invalidation_bus`` so other workers
+evict their local copies too. Redis entries remember the tokens of their
+tags when their load started, so an entry built from data read before an
+invalidation is never served after it. Invalidate after committing the
+write.
+
+Stampede protection: concurrent misses for one key share a single load in
+each worker, and workers coordinate through a short Redis lock so only
+one of them queries Postgres while the others wait for its result.
+
+Values must be JSON serializable. Redis failures degrade to the local
+tier plus the loader and Redis is skipped for a while afterwards.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any
+from uuid import uuid4
+
+from app.core import invalidation_bus
+from app.core.config import settings
+from app.core.database import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "cache"
+
+# Redis lock release that only deletes the lock if it is still ours
+_RELEASE_LOCK = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+_caches: dict[str, "TwoTierCache"] = {}
+
+# Local invalidation bookkeeping: a load that started before its tag was
+# invalidated must not store its (possibly stale) result
+_epoch = 0
+_tag_epochs: dict[str, int] = {}
+_epoch_floor = 0
+
+_redis_retry_at = 0.0
+
+
+def _tag_key(tag: str) -> str:
+    return f"{KEY_PREFIX}:tag:{tag}"
+
+
+async def _redis():
+    """Redis client, or None while Redis is considered down."""
+    if time.monotonic() < _redis_retry_at:
+        return None
+    return await get_redis()
+
+
+def _redis_failed(e: Exception) -> None:
+    global _redis_retry_at
+    _redis_retry_at = time.monotonic() + settings.ENTITY_CACHE_REDIS_RETRY_SECONDS
+    logger.warning(f"Entity cache Redis unavailable, using local tier only: {e}")
+
+
+def _invalidated_since(tags: list[str], epoch: int) -> bool:
+    return epoch < _epoch_floor or any(_tag_epochs.get(tag, 0) > epoch for tag in tags)
+
+
+class TwoTierCache:
+    """One named cache: a local LRU in front of Redis, filled by a loader on miss."""
+
+    def __init__(
+        self, name: str, ttl: int | None = None, local_ttl: int | None = None, max_entries: int | None = None
+    ):
+        self.name = name
+        self._ttl = ttl
+        self._local_ttl = local_ttl
+        self._max_entries = max_entries
+        self._local: OrderedDict[str, tuple[float, Any, list[str]]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.counters = dict.fromkeys(
+            ("local_hits", "redis_hits", "misses", "loads", "coalesced", "lock_waits", "redis_errors"), 0
+        )
+        _caches[name] = self
+
+    @property
+    def ttl(self) -> int:
+        return self._ttl or settings.ENTITY_CACHE_TTL_SECONDS
+
+    @property
+    def local_ttl(self) -> int:
+        return self._local_ttl or settings.ENTITY_CACHE_LOCAL_TTL_SECONDS
+
+    @property
+    def max_entries(self) -> int:
+        return self._max_entries or settings.ENTITY_CACHE_LOCAL_MAX_ENTRIES
+
+    def _redis_key(self, key: str) -> str:
+        return f"{KEY_PREFIX}:{self.name}:{key}"
+
+    def _get_local(self, key: str) -> tuple[bool, Any]:
+        entry = self._local.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value, _ = entry
+        if expires_at < time.monotonic():
+            del self._local[key]
+            return False, None
+        self._local.move_to_end(key)
+        return True, value
+
+    def _set_local(self, key: str, value: Any, tags: list[str], ttl: int | None = None) -> None:
+        self._local[key] = (time.monotonic() + min(self.local_ttl, ttl or self.local_ttl), value, tags)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    def evict_local(self, tags: set[str] | None = None) -> None:
+        """Drop local entries carrying any of ``tags`` (all entries when None)."""
+        if tags is None:
+            self._local.clear()
+            return
+        for key in [key for key, (_, _, entry_tags) in self._local.items() if tags.intersection(entry_tags)]:
+            del self._local[key]
+
+    async def _get_redis(self, redis, key: str, tags: list[str]) -> tuple[bool, Any, list[str | None]]:
+        """Look ``key`` up in Redis, also returning the current tokens of ``tags``."""
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.get(self._redis_key(key))
+            for tag in tags:
+                pipe.get(_tag_key(tag))
+            raw, *raw_tokens = await pipe.execute()
+
+        tokens = [token.decode() if token is not None else None for token in raw_tokens]
+        if raw is not None:
+            entry = json.loads(raw)
+            if entry["tokens"] == tokens:
+                return True, entry["value"], tokens
+        return False, None, tokens
+
+    async def _set_redis(
+        self, redis, key: str, value: Any, tokens: list[str | None], ttl: int | None = None
+    ) -> None:
+        entry = json.dumps({"value": value, "tokens": tokens}, ensure_ascii=False)
+        await redis.set(self._redis_key(key), entry, px=(ttl or self.ttl) * 1000)
+
+    async def get_or_load(
+        self,
+        key: str,
+        tags: list[str],
+        loader: Callable[[], Awaitable[Any]],
+        ttl_of: Callable[[Any], int | None] | None = None,
+    ) -> Any:
+        """Cached value for ``key``, calling ``loader`` on a miss. None results are not cached.
+
+        ``ttl_of(value)`` may shorten the lifetime of a loaded value (None keeps the cache's TTLs).
+        """
+        if not settings.ENTITY_CACHE_ENABLED:
+            return await loader()
+
+        hit, value = self._get_local(key)
+        if hit:
+            self.counters["local_hits"] += 1
+            return value
+
+        # Concurrent misses in this worker share one fill
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.counters["coalesced"] += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                # The filling request was cancelled, fill for ourselves
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._fill(key, tags, loader, ttl_of)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Followers re-raise it; mark it retrieved for when there are none
+                future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _fill(
+        self,
+        key: str,
+        tags: list[str],
+        loader: Callable[[], Awaitable[Any]],
+        ttl_of: Callable[[Any], int | None] | None = None,
+    ) -> Any:
+        started_epoch = _epoch
+        redis = await _redis()
+        tokens: list[str | None] | None = None
+        lock_token = None
+
+        if redis is not None:
+            try:
+                hit, value, tokens = await self._get_redis(redis, key, tags)
+                if hit:
+                    self.counters["redis_hits"] += 1
+                    if not _invalidated_since(tags, started_epoch):
+                        self._set_local(key, value, tags)
+                    return value
+
+                # Let one worker load while the others wait for its result
+                lock_key = f"{self._redis_key(key)}:lock"
+                lock_token = uuid4().hex
+                if not await redis.set(lock_key, lock_token, nx=True, px=settings.ENTITY_CACHE_LOCK_MS):
+                    lock_token = None
+                    self.counters["lock_waits"] += 1
+                    deadline = time.monotonic() + settings.ENTITY_CACHE_LOCK_MS / 1000
+                    while time.monotonic() < deadline:
+                        await asyncio.sleep(0.025)
+                        hit, value, tokens = await self._get_redis(redis, key, tags)
+                        if hit:
+                            self.counters["redis_hits"] += 1
+                            if not _invalidated_since(tags, started_epoch):
+                                self._set_local(key, value, tags)
+                            return value
+                        if not await redis.exists(lock_key):
+                            break
+            except Exception as e:
+                self.counters["redis_errors"] += 1
+                _redis_failed(e)
+                redis = None
+
+        self.counters["misses"] += 1
+        try:
+            self.counters["loads"] += 1
+            value = await loader()
+            if value is None:
+                return None
+
+            ttl = ttl_of(value) if ttl_of else None
+            if not _invalidated_since(tags, started_epoch):
+                self._set_local(key, value, tags, ttl)
+            if redis is not None and tokens is not None:
+                try:
+                    await self._set_redis(redis, key, value, tokens, ttl)
+                except Exception as e:
+                    self.counters["redis_errors"] += 1
+                    _redis_failed(e)
+            return value
+        finally:
+            if lock_token is not None:
+                try:
+                    await redis.eval(_RELEASE_LOCK, 1, f"{self._redis_key(key)}:lock", lock_token)
+                except Exception as e:
+                    logger.debug(f"Entity cache lock release failed: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        hits = self.counters["local_hits"] + self.counters["redis_hits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "local_entries": len(self._local),
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "local_hit_rate": round(self.counters["local_hits"] / lookups, 4) if lookups else None,
+        }
+
+
+def cached(name: str, tags: Callable[..., Iterable[str]], ttl: int | None = None, local_ttl: int | None = None):
+    """Cache an ``async def loader(db, *args)`` by ``args``, tagging entries with ``tags(*args)``.
+
+    The database session is not part of the key. The wrapped function gets a
+    ``cache`` attribute exposing the underlying ``TwoTierCache``.
+    """
+    cache = TwoTierCache(name, ttl=ttl, local_ttl=local_ttl)
+
+    def decorator(fn: Callable[..., Awaitable[Any]]):
+        @functools.wraps(fn)
+        async def wrapper(db, *args):
+            key = ":".join(str(arg) for arg in args)
+            return await cache.get_or_load(key, list(tags(*args)), lambda: fn(db, *args))
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def _invalidate_local(tags: set[str] | None) -> None:
+    """Evict ``tags`` (everything when None) from this worker's caches and void loads in progress."""
+    global _epoch, _epoch_floor
+    _epoch += 1
+    if tags is None or len(_tag_epochs) > 100_000:
+        _tag_epochs.clear()
+        _epoch_floor = _epoch
+    else:
+        for tag in tags:
+            _tag_epochs[tag] = _epoch
+
+    for cache in _caches.values():
+        cache.evict_local(tags)
+
+
+# Invalidations published by other workers
+invalidation_bus.add_listener(_invalidate_local)
+
+
+async def invalidate(*tags: str) -> None:
+    """Invalidate every cached entry carrying any of ``tags``, locally, in Redis and on other workers."""
+    _invalidate_local(set(tags))
+
+    redis = await _redis()
+    if redis is None:
+        return
+    # Tokens outlive every entry that could carry them, then expire
+    token_ttl = 2 * max((cache.ttl for cache in _caches.values()), default=settings.ENTITY_CACHE_TTL_SECONDS)
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.set(_tag_key(tag), uuid4().hex, ex=token_ttl)
+            await pipe.execute()
+    except Exception as e:
+        _redis_failed(e)
+        return
+    await invalidation_bus.publish(tags)
+
+
+def cache_stats() -> dict[str, dict[str, Any]]:
+    """Hit-rate metrics of every cache in this worker."""
+    return {name: cache.stats() for name, cache in _caches.items()}
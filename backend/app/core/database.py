@@ -1,4 +1,9 @@
+import re
+from pathlib import Path
+
 import redis.asyncio as redis
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlmodel import SQLModel
@@ -29,8 +34,48 @@ async def get_redis():
     return redis_client
 
 
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "database" / "migrations"
+
+_REVISION = re.compile(r'^revision\s*=\s*"([^"]+)"', re.MULTILINE)
+_DOWN_REVISION = re.compile(r'^down_revision\s*=\s*"([^"]+)"', re.MULTILINE)
+
+
+def migration_head(migrations_dir: Path = MIGRATIONS_DIR) -> str:
+    """Revision no other migration builds on, read from the files without importing them."""
+    revisions, parents = set(), set()
+    for path in migrations_dir.glob("*.py"):
+        source = path.read_text(encoding="utf-8")
+        if revision := _REVISION.search(source):
+            revisions.add(revision.group(1))
+        if down_revision := _DOWN_REVISION.search(source):
+            parents.add(down_revision.group(1))
+
+    heads = revisions - parents
+    if len(heads) != 1:
+        raise RuntimeError(f"Expected exactly one migration head in {migrations_dir}, found {sorted(heads)}")
+    return heads.pop()
+
+
+async def verify_schema_revision() -> str:
+    """Fail fast unless the database is at the expected Alembic revision (one query, no DDL)."""
+    expected = settings.DB_EXPECTED_REVISION or migration_head()
+    async with engine.connect() as conn:
+        try:
+            current = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+        except DBAPIError as e:
+            raise RuntimeError("Database has no alembic_version table, run the migrations first") from e
+
+    if current != expected:
+        raise RuntimeError(f"Database schema is at revision {current}, expected {expected}; run the migrations")
+    return current
+
+
 async def init_db():
-    """Initialize database tables."""
+    """Initialize database tables, or only verify the schema revision when DB_STARTUP_MODE is "verify"."""
+    if settings.DB_STARTUP_MODE == "verify":
+        await verify_schema_revision()
+        return
+
     async with engine.begin() as conn:
         # Import all models to ensure they are registered
         await conn.run_sync(SQLModel.metadata.create_all)
@@ -0,0 +1,161 @@
+"""Cross-worker invalidation of in-process caches over Redis pub/sub.
+
+Write paths publish the tags they invalidated; every worker runs
+``run_subscriber`` and evicts matching entries from its local caches
+through the listeners registered with ``add_listener``.
+
+Pub/sub is fire-and-forget, so every message carries a global sequence
+number (a Redis counter incremented in the same script that publishes).
+A worker that sees a gap in the sequence, reconnects after missing
+messages, or finds the counter ahead of what it received for longer than
+one check interval flushes all its local caches instead of guessing what
+it missed. Listeners are called with ``None`` for such a flush.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+from collections.abc import Callable, Iterable
+
+from app.core.config import settings
+from app.core.database import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "cache:invalidations"
+SEQUENCE_KEY = "cache:invalidations:seq"
+
+# Numbering and publishing in one script keeps channel order equal to sequence order
+_PUBLISH = "local seq = redis.call('INCR', KEYS[1]) redis.call('PUBLISH', ARGV[1], seq .. '|' .. ARGV[2]) return seq"
+
+ORIGIN = f"{socket.gethostname()}-{os.getpid()}"
+
+_listeners: list[Callable[[set[str] | None], None]] = []
+
+
+def add_listener(listener: Callable[[set[str] | None], None]) -> None:
+    """Call ``listener(tags)`` for invalidations from other workers, or ``listener(None)`` to flush everything."""
+    _listeners.append(listener)
+
+
+def _notify(tags: set[str] | None) -> None:
+    for listener in _listeners:
+        try:
+            listener(tags)
+        except Exception as e:
+            logger.error(f"Cache invalidation listener failed: {e}")
+
+
+async def publish(tags: Iterable[str]) -> int | None:
+    """Broadcast invalidated ``tags`` to every worker, returning the message's sequence number."""
+    if not settings.CACHE_INVALIDATION_BUS_ENABLED:
+        return None
+    payload = json.dumps({"origin": ORIGIN, "tags": sorted(tags)}, ensure_ascii=False)
+    try:
+        redis = await get_redis()
+        return int(await redis.eval(_PUBLISH, 1, SEQUENCE_KEY, CHANNEL, payload))
+    except Exception as e:
+        # Other workers fall back to their local TTL
+        logger.warning(f"Could not publish cache invalidation: {e}")
+        return None
+
+
+class SequenceTracker:
+    """Detects missed bus messages from sequence numbers."""
+
+    def __init__(self):
+        self.last_seq: int | None = None
+        self._behind_since_check: int | None = None
+
+    def resync(self, current: int) -> bool:
+        """Adopt the counter after (re)subscribing; True when messages were missed meanwhile."""
+        missed = self.last_seq is not None and current != self.last_seq
+        self.last_seq = current
+        self._behind_since_check = None
+        return missed
+
+    def observe(self, seq: int) -> str:
+        """Classify a received message as "apply", "skip" (already covered) or "gap" (some were missed)."""
+        if self.last_seq is None:
+            self.last_seq = seq
+            return "apply"
+        if seq <= self.last_seq:
+            return "skip"
+        gap = seq != self.last_seq + 1
+        self.last_seq = seq
+        return "gap" if gap else "apply"
+
+    def check(self, current: int) -> bool:
+        """Periodic comparison with the counter; True when messages were lost.
+
+        The counter is ahead of what was received while messages are in
+        flight, so it only counts as lost if still behind at the next check.
+        """
+        if self.last_seq is None:
+            return self.resync(current)
+        # The counter went backwards: Redis lost its data
+        if current < self.last_seq:
+            self.resync(current)
+            return True
+        if self._behind_since_check is not None and self.last_seq < self._behind_since_check:
+            self.resync(current)
+            return True
+        self._behind_since_check = current if current > self.last_seq else None
+        return False
+
+
+async def _current_sequence(redis) -> int:
+    return int(await redis.get(SEQUENCE_KEY) or 0)
+
+
+async def run_subscriber() -> None:
+    """Apply invalidations published by other workers until cancelled."""
+    tracker = SequenceTracker()
+    check_interval = settings.CACHE_INVALIDATION_CHECK_SECONDS
+    failures = 0
+
+    while True:
+        pubsub = None
+        try:
+            redis = await get_redis()
+            pubsub = redis.pubsub()
+            await pubsub.subscribe(CHANNEL)
+            if tracker.resync(await _current_sequence(redis)):
+                logger.warning("Missed cache invalidations while disconnected, flushing local caches")
+                _notify(None)
+            failures = 0
+
+            loop = asyncio.get_running_loop()
+            next_check = loop.time() + check_interval
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None and message["type"] == "message":
+                    seq, _, body = message["data"].decode().partition("|")
+                    payload = json.loads(body)
+                    verdict = tracker.observe(int(seq))
+                    if verdict == "gap":
+                        logger.warning("Gap in cache invalidation sequence, flushing local caches")
+                        _notify(None)
+                    elif verdict == "apply" and payload["origin"] != ORIGIN:
+                        _notify(set(payload["tags"]))
+
+                if loop.time() >= next_check:
+                    next_check = loop.time() + check_interval
+                    if tracker.check(await _current_sequence(redis)):
+                        logger.warning("Cache invalidations were lost, flushing local caches")
+                        _notify(None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Nothing is heard while disconnected; the resync after reconnecting flushes
+            failures += 1
+            logger.error(f"Cache invalidation subscriber failed (attempt {failures}): {e}")
+            await asyncio.sleep(min(2**failures, 30))
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
@@ -0,0 +1,72 @@
+"""Lazy access to heavy optional dependencies.
+
+Audio processing, LLM SDKs, the task queue, imaging libraries and NumPy add
+seconds of import time and tens of MB of memory to every worker that
+imports them, even workers that never use them. Import them through the
+shims here instead of at module level:
+
+    from app.core.lazy_imports import librosa
+
+    def duration(path):
+        return librosa.get_duration(path=path)
+
+The real module is imported on first attribute access. When it is not
+installed, that access raises an ``ImportError`` naming the package to
+install. ``tests/test_import_budget.py`` fails if any module in
+``HEAVY_MODULES`` gets imported by ``app.main``.
+"""
+
+import importlib
+import threading
+from types import ModuleType
+from typing import Any
+
+# Top-level packages that must only be imported on first use
+HEAVY_MODULES = ("librosa", "soundfile", "openai", "anthropic", "celery", "PIL", "numpy")
+
+_lock = threading.Lock()
+
+
+class LazyModule(ModuleType):
+    """Placeholder that imports the named module when an attribute is first accessed."""
+
+    def __init__(self, name: str, package: str | None = None):
+        super().__init__(name)
+        self._package = package or name.split(".")[0]
+        self._module: ModuleType | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def load(self) -> ModuleType:
+        """Import (once) and return the real module."""
+        if self._module is None:
+            with _lock:
+                if self._module is None:
+                    try:
+                        self._module = importlib.import_module(self.__name__)
+                    except ImportError as e:
+                        raise ImportError(
+                            f"{self.__name__} is required for this feature, install the '{self._package}' package"
+                        ) from e
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.load(), attr)
+
+    def __dir__(self) -> list[str]:
+        return dir(self.load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module {self.__name__!r} ({state})>"
+
+
+librosa = LazyModule("librosa")
+soundfile = LazyModule("soundfile")
+openai = LazyModule("openai")
+anthropic = LazyModule("anthropic")
+celery = LazyModule("celery")
+pil_image = LazyModule("PIL.Image", package="pillow")
+numpy = LazyModule("numpy")
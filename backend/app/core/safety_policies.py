@@ -1,8 +1,35 @@
 """Child Safety and Data Protection Policies."""
 
-from dataclasses import dataclass
+import re
+from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
 from enum import Enum
+from typing import Any
+
+# Bump when the agent response checks change, so cached verdicts from older checks are not trusted
+SAFETY_POLICY_VERSION = 1
+
+URL_PATTERN = re.compile(r"(https?://|www\.)\S+", re.IGNORECASE)
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+# Seven or more digits, optionally dash separated (\d also matches Arabic-Indic digits); spaced
+# digits are left alone because counting exercises ("1 2 3 4 5 6 7") look the same
+PHONE_PATTERN = re.compile(r"\+?\d(?:-?\d){6,}")
+
+# Agent response checks, in the order they run, with the reason reported for each
+AGENT_RESPONSE_FLAGS = {
+    "empty": "Empty response",
+    "external_link": "Links to an external site",
+    "contact_details": "Contains contact details",
+    "not_educational": "Not educationally relevant",
+    "safety_guidelines": "Violates safety guidelines",
+    "not_age_appropriate": "Not age appropriate",
+}
+
+# Shown to the child instead of an agent response that fails validation, by agent language
+FALLBACK_AGENT_RESPONSES = {
+    "ar": "عذرًا، لا أستطيع الإجابة عن هذا. هيا نكمل درسنا!",
+    "en": "Sorry, I can't help with that. Let's get back to our lesson!",
+}
 
 
 class DataRetentionPolicy(Enum):
@@ -168,6 +195,26 @@ class DataMinimizationPolicy:
         return DataRetentionPolicy[data_type.upper()].value
 
 
+@dataclass(frozen=True)
+class SafetyVerdict:
+    """Outcome of validating an agent response; stored with the chat message and cached replies."""
+
+    passed: bool
+    flags: tuple[str, ...] = ()
+    policy_version: int = SAFETY_POLICY_VERSION
+
+    @property
+    def reason(self) -> str:
+        return "; ".join(AGENT_RESPONSE_FLAGS[flag] for flag in self.flags) or "Valid"
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**asdict(self), "flags": list(self.flags)}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "SafetyVerdict":
+        return cls(passed=data["passed"], flags=tuple(data["flags"]), policy_version=data["policy_version"])
+
+
 class SafetyValidator:
     """Validate content and interactions for child safety."""
 
@@ -192,24 +239,32 @@ class SafetyValidator:
 
     def validate_agent_response(self, response: str, subject: str, age_group: str) -> tuple[bool, str]:
         """Validate response from AI agent."""
-        # Check educational relevance
-        if not self._is_educational(response, subject):
-            return False, "Not educationally relevant"
-
-        # Check safety guidelines
-        if not self._meets_safety_guidelines(response):
-            return False, "Violates safety guidelines"
-
-        # Check age appropriateness
-        if not self._is_age_appropriate(response, age_group):
-            return False, "Not age appropriate"
+        verdict = self.check_agent_response(response, subject, age_group)
+        return verdict.passed, verdict.reason
+
+    def check_agent_response(self, response: str, subject: str, age_group: str | None) -> SafetyVerdict:
+        """Run every agent response check, reporting all that fail."""
+        failed = {
+            "empty": not response.strip(),
+            # Links and contact details could lead a child off the platform
+            "external_link": bool(URL_PATTERN.search(response)),
+            "contact_details": self._contains_personal_info(response),
+            "not_educational": not self._is_educational(response, subject),
+            "safety_guidelines": not self._meets_safety_guidelines(response),
+            "not_age_appropriate": not self._is_age_appropriate(response, age_group),
+        }
+        flags = tuple(flag for flag in AGENT_RESPONSE_FLAGS if failed[flag])
+        return SafetyVerdict(passed=not flags, flags=flags)
 
-        return True, "Valid"
+    @staticmethod
+    def fallback_response(language: str) -> str:
+        """What the child is shown instead of a response that failed validation."""
+        return FALLBACK_AGENT_RESPONSES.get(language, FALLBACK_AGENT_RESPONSES["ar"])
 
     def _contains_personal_info(self, text: str) -> bool:
         """Check if text contains personal information."""
-        # Implement PII detection
-        return False
+        # E-mail addresses and phone numbers; names and addresses are not detected yet
+        return bool(EMAIL_PATTERN.search(text) or PHONE_PATTERN.search(text))
 
     def _is_age_appropriate(self, text: str, age_group: str) -> bool:
         """Check if content is age appropriate."""
@@ -0,0 +1,227 @@
+"""Single-flight execution of identical concurrent calls.
+
+``await flight.run(key, fn)`` returns ``(result, shared)``; concurrent
+calls with the same key share one execution of ``fn``:
+
+* Within a worker the execution is a task of its own rather than part of
+  the request that started it. It runs while anyone is waiting for it, so
+  the first caller disconnecting does not fail the others, and it is
+  cancelled (aborting the upstream call) once every waiter has gone.
+* Across workers the first worker to take the key's Redis lock executes
+  ``fn``. The others subscribe to the key's result channel and get the
+  result when it is published; it is also stored for a few seconds for
+  waiters that subscribe just too late. If the executing worker fails,
+  gives up (all its waiters left) or dies (its lock expires), a waiting
+  worker takes the lock and executes ``fn`` itself.
+
+Results must be JSON serializable. Without Redis, calls are coalesced
+within each worker only.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import Any
+from uuid import uuid4
+
+from app.core.config import settings
+from app.core.database import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "flight"
+
+# Lock release and renewal that only touch the lock if it is still ours
+_RELEASE_LOCK = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+_RENEW_LOCK = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) end return 0"
+)
+
+# How often waiting workers check that the executing worker still holds its lock
+LOCK_CHECK_SECONDS = 1.0
+
+_flights: dict[str, "SingleFlight"] = {}
+
+_redis_retry_at = 0.0
+
+
+async def _redis():
+    """Redis client, or None while Redis is considered down."""
+    if time.monotonic() < _redis_retry_at:
+        return None
+    return await get_redis()
+
+
+def _redis_failed(e: Exception) -> None:
+    global _redis_retry_at
+    _redis_retry_at = time.monotonic() + settings.SINGLE_FLIGHT_REDIS_RETRY_SECONDS
+    logger.warning(f"Single-flight Redis unavailable, coalescing within this worker only: {e}")
+
+
+class _Abandoned(Exception):
+    """The executing worker gave up or failed; another one should take over."""
+
+
+class _FnError(Exception):
+    """Wraps an exception raised by ``fn`` so it is not mistaken for a Redis failure."""
+
+    def __init__(self, error: Exception):
+        super().__init__(str(error))
+        self.error = error
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls by key, within and across workers."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: dict[str, _Flight] = {}
+        self.counters = dict.fromkeys(
+            ("executions", "local_shared", "remote_shared", "takeovers", "abandoned", "redis_errors"), 0
+        )
+        _flights[name] = self
+
+    def _key(self, key: str) -> str:
+        return f"{KEY_PREFIX}:{self.name}:{key}"
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """Result of ``fn()``, shared with concurrent calls for ``key``; True when another call produced it."""
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight(asyncio.create_task(self._execute(key, fn)))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._finished(key, flight))
+        else:
+            self.counters["local_shared"] += 1
+
+        flight.waiters += 1
+        try:
+            result, remote = await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Everyone left: stop the upstream call, later callers start afresh
+                self.counters["abandoned"] += 1
+                flight.task.cancel()
+                self._finished(key, flight)
+        return result, shared or remote
+
+    def _finished(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if flight.task.done() and not flight.task.cancelled():
+            # Waiters re-raise it; mark it retrieved for when there are none
+            flight.task.exception()
+
+    async def _execute(self, key: str, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        redis = await _redis() if settings.SINGLE_FLIGHT_REDIS_ENABLED else None
+        if redis is None:
+            self.counters["executions"] += 1
+            return await fn(), False
+
+        channel = self._key(key)
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            while True:
+                raw = await redis.get(f"{channel}:result")
+                if raw is not None:
+                    self.counters["remote_shared"] += 1
+                    return json.loads(raw), True
+
+                token = uuid4().hex
+                if await redis.set(f"{channel}:lock", token, nx=True, px=settings.SINGLE_FLIGHT_LOCK_MS):
+                    return await self._lead(redis, channel, token, fn), False
+
+                try:
+                    result = await self._follow(redis, pubsub, channel)
+                except _Abandoned:
+                    self.counters["takeovers"] += 1
+                    continue
+                self.counters["remote_shared"] += 1
+                return result, True
+        except _FnError as e:
+            raise e.error from None
+        except Exception as e:
+            self.counters["redis_errors"] += 1
+            _redis_failed(e)
+            self.counters["executions"] += 1
+            return await fn(), False
+        finally:
+            with suppress(Exception):
+                await pubsub.aclose()
+
+    async def _lead(self, redis, channel: str, token: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Execute ``fn`` holding the lock, then publish its result, or that we gave up."""
+        renewer = asyncio.create_task(self._renew(redis, f"{channel}:lock", token))
+        self.counters["executions"] += 1
+        try:
+            result = await fn()
+        except BaseException as e:
+            renewer.cancel()
+            await asyncio.shield(self._release(redis, channel, token, {"status": "abandoned"}))
+            if isinstance(e, Exception):
+                raise _FnError(e) from e
+            raise
+        renewer.cancel()
+        await asyncio.shield(self._release(redis, channel, token, {"status": "done", "result": result}))
+        return result
+
+    async def _release(self, redis, channel: str, token: str, message: dict[str, Any]) -> None:
+        """Store and publish ``message``, then drop the lock."""
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                if message["status"] == "done":
+                    raw = json.dumps(message["result"], ensure_ascii=False)
+                    pipe.set(f"{channel}:result", raw, px=settings.SINGLE_FLIGHT_RESULT_TTL_MS)
+                pipe.publish(channel, json.dumps(message, ensure_ascii=False))
+                pipe.eval(_RELEASE_LOCK, 1, f"{channel}:lock", token)
+                await pipe.execute()
+        except Exception as e:
+            # Waiting workers take over once the lock expires
+            self.counters["redis_errors"] += 1
+            logger.warning(f"Could not publish single-flight result for {channel}: {e}")
+
+    async def _renew(self, redis, lock_key: str, token: str) -> None:
+        """Keep the lock while ``fn`` runs longer than its TTL."""
+        while True:
+            await asyncio.sleep(settings.SINGLE_FLIGHT_LOCK_MS / 3000)
+            try:
+                await redis.eval(_RENEW_LOCK, 1, lock_key, token, settings.SINGLE_FLIGHT_LOCK_MS)
+            except Exception as e:
+                logger.debug(f"Single-flight lock renewal failed: {e}")
+
+    async def _follow(self, redis, pubsub, channel: str) -> Any:
+        """Wait for the executing worker's result, raising ``_Abandoned`` if it gives up or dies."""
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=LOCK_CHECK_SECONDS)
+            if message is not None:
+                payload = json.loads(message["data"])
+                if payload["status"] == "done":
+                    return payload["result"]
+                raise _Abandoned()
+            if not await redis.exists(f"{channel}:lock"):
+                # Finished between our checks, or died without publishing
+                raw = await redis.get(f"{channel}:result")
+                if raw is not None:
+                    return json.loads(raw)
+                raise _Abandoned()
+
+    def stats(self) -> dict[str, Any]:
+        return {**self.counters, "in_flight": len(self._flights)}
+
+
+def flight_stats() -> dict[str, dict[str, Any]]:
+    """Coalescing metrics of every single-flight group in this worker."""
+    return {name: flight.stats() for name, flight in _flights.items()}
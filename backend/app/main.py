@@ -3,7 +3,8 @@
 FastAPI application with rate limiting, monitoring, and comprehensive middleware.
 """
 
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -12,8 +13,15 @@ from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from app.api.router import api_router
 from app.core.config import settings
 from app.core.database import init_db
+from app.core.invalidation_bus import run_subscriber as run_invalidation_subscriber
 from app.middleware.monitoring import metrics_collector, monitoring_middleware
 from app.middleware.rate_limiting import rate_limit_middleware, rate_limiter
+from app.services.agent_registry import agent_registry
+from app.services.chat_partitions import run_partition_scheduler
+from app.services.chat_write_behind import run_flusher
+from app.services.llm_providers import close_providers
+from app.services.progress_reports import run_report_scheduler
+from app.services.retention import run_retention_scheduler
 
 
 @asynccontextmanager
@@ -23,10 +31,27 @@ async def lifespan(app: FastAPI):
     await init_db()
     await rate_limiter.init_redis()
     await metrics_collector.init_redis()
+    await asyncio.to_thread(agent_registry.load)
+    background_tasks = [asyncio.create_task(agent_registry.run_watcher())]
+    if settings.REPORT_BUILDER_ENABLED:
+        background_tasks.append(asyncio.create_task(run_report_scheduler()))
+    if settings.CHAT_PARTITION_MAINTENANCE_ENABLED:
+        background_tasks.append(asyncio.create_task(run_partition_scheduler()))
+    if settings.RETENTION_ENABLED:
+        background_tasks.append(asyncio.create_task(run_retention_scheduler()))
+    if settings.CHAT_WRITE_BEHIND_ENABLED:
+        background_tasks.append(asyncio.create_task(run_flusher()))
+    if settings.CACHE_INVALIDATION_BUS_ENABLED:
+        background_tasks.append(asyncio.create_task(run_invalidation_subscriber()))
     yield
     # Shutdown - cleanup if needed
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
     await rate_limiter.close_redis()
     await metrics_collector.close_redis()
+    await close_providers()
 
 
 app = FastAPI(
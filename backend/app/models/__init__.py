@@ -1,8 +1,21 @@
 # SQLModel imports for database initialization
+from .analytics import ChildDailyStats
 from .assessment import AssessmentResult, ProgressReport
 from .child import Child
 from .guardian import Guardian
 from .lesson import Activity, Lesson
+from .retention import RetentionCheckpoint
 from .session import ChatMessage, Session
 
-__all__ = ["Guardian", "Child", "Lesson", "Activity", "Session", "ChatMessage", "AssessmentResult", "ProgressReport"]
+__all__ = [
+    "Guardian",
+    "Child",
+    "Lesson",
+    "Activity",
+    "Session",
+    "ChatMessage",
+    "AssessmentResult",
+    "ProgressReport",
+    "ChildDailyStats",
+    "RetentionCheckpoint",
+]
@@ -0,0 +1,43 @@
+from datetime import date, datetime
+from uuid import UUID
+
+from sqlmodel import Field, SQLModel
+
+
+class ChildDailyStats(SQLModel, table=True):
+    """Per child, per local day and per subject activity rollup.
+
+    Rows are maintained incrementally by ``app.services.daily_stats`` so that
+    dashboard and report queries read O(days) rows instead of raw sessions.
+    """
+
+    __tablename__ = "child_daily_stats"
+
+    child_id: UUID = Field(foreign_key="children.id", primary_key=True)
+    day: date = Field(primary_key=True)  # Local day in the guardian's timezone
+    subject: str = Field(primary_key=True)  # "arabic", "english", "islamic"
+
+    # Session activity
+    sessions_started: int = Field(default=0)
+    sessions_completed: int = Field(default=0)
+    minutes: int = Field(default=0)
+    points: int = Field(default=0)
+    session_score_total: int = Field(default=0)  # Sum of final session scores
+
+    # Assessment activity
+    assessments_count: int = Field(default=0)
+    assessment_score_total: int = Field(default=0)
+
+    # Engagement ("low" = 1, "medium" = 2, "high" = 3)
+    engagement_total: int = Field(default=0)
+    engagement_count: int = Field(default=0)
+
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    @property
+    def average_score(self) -> float:
+        return self.assessment_score_total / self.assessments_count if self.assessments_count else 0.0
+
+    @property
+    def average_engagement(self) -> float:
+        return self.engagement_total / self.engagement_count if self.engagement_count else 0.0
@@ -1,30 +1,50 @@
-import json
-from datetime import datetime
+from datetime import date, datetime
+from typing import Any
 from uuid import UUID, uuid4
 
+from sqlalchemy import Index, UniqueConstraint, text
 from sqlmodel import Field, SQLModel
 
+from .json_fields import json_dict_field, json_list_field
+
 
 class AssessmentResult(SQLModel, table=True):
     __tablename__ = "assessment_results"
+    __table_args__ = (
+        # Newest-first assessment history per child, answered from the index alone
+        Index(
+            "idx_assessment_results_child_created_cover",
+            "child_id",
+            "created_at",
+            postgresql_include=["id", "subject", "overall_score"],
+        ),
+        # Replayed bulk uploads are deduplicated per child on the client's key
+        Index(
+            "idx_assessment_results_idempotency_key",
+            "child_id",
+            "idempotency_key",
+            unique=True,
+            postgresql_where=text("idempotency_key IS NOT NULL"),
+        ),
+    )
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     session_id: UUID = Field(foreign_key="sessions.id", index=True)
     child_id: UUID = Field(foreign_key="children.id", index=True)
     subject: str  # "arabic", "english", "islamic"
 
-    # Scores by skill (JSON object)
-    skill_scores: str = Field(default="{}")  # {"pronunciation": 85, "comprehension": 90}
+    # Scores by skill
+    skill_scores: dict[str, int] = json_dict_field()  # {"pronunciation": 85, "comprehension": 90}
     overall_score: int = Field(default=0)
 
-    # Detailed feedback (JSON arrays)
-    strengths: str = Field(default="[]")
-    areas_for_improvement: str = Field(default="[]")
-    recommendations: str = Field(default="[]")
+    # Detailed feedback
+    strengths: list[str] = json_list_field()
+    areas_for_improvement: list[str] = json_list_field()
+    recommendations: list[str] = json_list_field()
 
-    # Progress tracking (JSON arrays)
-    mastered_skills: str = Field(default="[]")
-    struggling_skills: str = Field(default="[]")
+    # Progress tracking
+    mastered_skills: list[str] = json_list_field()
+    struggling_skills: list[str] = json_list_field()
 
     # AI confidence and metadata
     assessment_confidence: float | None = Field(default=None)
@@ -34,54 +54,63 @@ class AssessmentResult(SQLModel, table=True):
     response_time: int | None = Field(default=None)  # milliseconds
     time_to_complete: int | None = Field(default=None)  # minutes
 
+    # Client supplied key making bulk uploads safe to retry
+    idempotency_key: str | None = Field(default=None)
+
     # Timestamps
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime | None = Field(default=None)
 
     @property
     def skill_scores_dict(self) -> dict:
-        return json.loads(self.skill_scores)
+        return self.skill_scores
 
     @property
     def strengths_list(self) -> list[str]:
-        return json.loads(self.strengths)
+        return self.strengths
 
     @property
     def areas_for_improvement_list(self) -> list[str]:
-        return json.loads(self.areas_for_improvement)
+        return self.areas_for_improvement
 
     @property
     def recommendations_list(self) -> list[str]:
-        return json.loads(self.recommendations)
+        return self.recommendations
 
 
 class ProgressReport(SQLModel, table=True):
     __tablename__ = "progress_reports"
+    __table_args__ = (
+        UniqueConstraint("child_id", "report_period", "start_date", "end_date"),
+        # Latest report of a period per child
+        Index("idx_progress_reports_period_date", "child_id", "report_period", "end_date"),
+    )
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     child_id: UUID = Field(foreign_key="children.id", index=True)
     guardian_id: UUID = Field(foreign_key="guardians.id", index=True)
 
     # Report period
-    start_date: datetime
-    end_date: datetime
+    report_period: str = Field(default="weekly")  # "weekly", "monthly", "custom"
+    start_date: date
+    end_date: date
 
     # Overall statistics
     total_sessions: int = Field(default=0)
     total_time_spent: int = Field(default=0)  # minutes
     average_score: float = Field(default=0.0)
 
-    # Subject-wise breakdown (JSON)
-    subject_progress: str = Field(default="{}")
+    # Subject-wise breakdown
+    subject_progress: dict[str, Any] = json_dict_field()
 
-    # Achievements and rewards (JSON)
-    badges_earned: str = Field(default="[]")
+    # Achievements and rewards
+    badges_earned: list[dict] = json_list_field()
     points_earned: int = Field(default=0)
 
-    # Parent insights (JSON arrays)
-    parent_recommendations: str = Field(default="[]")
-    celebrate_achievements: str = Field(default="[]")
-    concern_areas: str = Field(default="[]")
+    # Parent insights
+    parent_recommendations: list[str] = json_list_field()
+    celebrate_achievements: list[str] = json_list_field()
+    concern_areas: list[str] = json_list_field()
 
     # Timestamps
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -89,15 +118,19 @@ class ProgressReport(SQLModel, table=True):
 
     @property
     def subject_progress_dict(self) -> dict:
-        return json.loads(self.subject_progress)
+        return self.subject_progress
 
     @property
     def badges_earned_list(self) -> list[dict]:
-        return json.loads(self.badges_earned)
+        return self.badges_earned
 
     @property
     def parent_recommendations_list(self) -> list[str]:
-        return json.loads(self.parent_recommendations)
+        return self.parent_recommendations
+
+    @property
+    def celebrate_achievements_list(self) -> list[str]:
+        return self.celebrate_achievements
 
     class Config:
         validate_assignment = True
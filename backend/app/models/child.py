@@ -1,10 +1,11 @@
-import json
 from datetime import date, datetime
 from typing import TYPE_CHECKING
 from uuid import UUID, uuid4
 
 from sqlmodel import Field, Relationship, SQLModel
 
+from .json_fields import json_list_field
+
 if TYPE_CHECKING:
     from .guardian import Guardian
     from .session import Session
@@ -23,7 +24,7 @@ class Child(SQLModel, table=True):
 
     # Parental controls
     daily_time_limit: int = Field(default=30)  # minutes
-    enabled_subjects: str = Field(default='["arabic"]')  # JSON array
+    enabled_subjects: list[str] = json_list_field(["arabic"])
     voice_enabled: bool = Field(default=True)
     chat_enabled: bool = Field(default=True)
 
@@ -47,11 +48,11 @@ class Child(SQLModel, table=True):
 
     @property
     def enabled_subjects_list(self) -> list[str]:
-        return json.loads(self.enabled_subjects)
+        return self.enabled_subjects
 
     @enabled_subjects_list.setter
     def enabled_subjects_list(self, subjects: list[str]):
-        self.enabled_subjects = json.dumps(subjects)
+        self.enabled_subjects = list(subjects)
 
     class Config:
         validate_assignment = True
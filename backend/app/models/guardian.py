@@ -1,12 +1,23 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 from uuid import UUID, uuid4
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
+from sqlalchemy.orm import validates
 from sqlmodel import Field, Relationship, SQLModel
 
 if TYPE_CHECKING:
     from .child import Child
 
+
+def is_known_timezone(name: str | None) -> bool:
+    """Whether ``name`` is an IANA timezone, as used for the guardian's local days."""
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        return False
+    return True
+
 class Guardian(SQLModel, table=True):
     __tablename__ = "guardians"
 
@@ -28,5 +39,11 @@ class Guardian(SQLModel, table=True):
     # Relationships
     children: list["Child"] = Relationship(back_populates="guardian")
 
+    @validates("timezone")
+    def validate_timezone(self, key: str, value: str) -> str:
+        if not is_known_timezone(value):
+            raise ValueError(f"Unknown timezone: {value!r}")
+        return value
+
     class Config:
         validate_assignment = True
@@ -0,0 +1,36 @@
+"""Native JSONB column helpers for SQLModel models.
+
+Values are decoded once by the database driver when a row is loaded and kept
+on the instance as plain lists and dicts. Mutable wrappers make in-place
+changes (``child.enabled_subjects.append(...)``) mark the row dirty.
+"""
+
+import json
+from typing import Any
+
+from sqlalchemy import Column, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.mutable import MutableDict, MutableList
+from sqlmodel import Field
+
+
+def _server_default(value: Any):
+    return text(f"'{json.dumps(value, ensure_ascii=False)}'::jsonb")
+
+
+def json_list_field(default: list | None = None) -> Any:
+    """JSONB array column defaulting to a copy of ``default`` (empty list when omitted)."""
+    default = default or []
+    return Field(
+        default_factory=lambda: list(default),
+        sa_column=Column(MutableList.as_mutable(JSONB), nullable=False, server_default=_server_default(default)),
+    )
+
+
+def json_dict_field(default: dict | None = None) -> Any:
+    """JSONB object column defaulting to a copy of ``default`` (empty dict when omitted)."""
+    default = default or {}
+    return Field(
+        default_factory=lambda: dict(default),
+        sa_column=Column(MutableDict.as_mutable(JSONB), nullable=False, server_default=_server_default(default)),
+    )
@@ -1,10 +1,12 @@
-import json
 from datetime import datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 from uuid import UUID, uuid4
 
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
+from .json_fields import json_dict_field, json_list_field
+
 if TYPE_CHECKING:
     from .session import Session
 
@@ -17,7 +19,7 @@ class Activity(SQLModel, table=True):
     type: str  # "reading", "listening", "speaking", "writing", "quiz", "game"
     title: str
     description: str
-    content: str  # JSON content
+    content: dict[str, Any] = json_dict_field()
     expected_duration: int  # minutes
     points: int = Field(default=10)
     required_for_completion: bool = Field(default=True)
@@ -29,6 +31,21 @@ class Activity(SQLModel, table=True):
 
 class Lesson(SQLModel, table=True):
     __tablename__ = "lessons"
+    __table_args__ = (
+        # Containment filters (tags @> '["..."]') on the lesson catalogue
+        Index(
+            "idx_lessons_tags_gin",
+            "tags",
+            postgresql_using="gin",
+            postgresql_ops={"tags": "jsonb_path_ops"},
+        ),
+        Index(
+            "idx_lessons_keywords_gin",
+            "keywords",
+            postgresql_using="gin",
+            postgresql_ops={"keywords": "jsonb_path_ops"},
+        ),
+    )
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     title: str
@@ -39,16 +56,16 @@ class Lesson(SQLModel, table=True):
 
     # Content
     estimated_duration: int  # total minutes
-    objectives: str  # JSON array
-    keywords: str = Field(default="[]")  # JSON array
+    objectives: list[str] = json_list_field()
+    keywords: list[str] = json_list_field()
 
     # Prerequisites and progression
-    prerequisites: str = Field(default="[]")  # JSON array of lesson IDs
-    unlocks: str = Field(default="[]")  # JSON array of lesson IDs
+    prerequisites: list[str] = json_list_field()  # Lesson IDs
+    unlocks: list[str] = json_list_field()  # Lesson IDs
 
     # Metadata
     is_published: bool = Field(default=False)
-    tags: str = Field(default="[]")  # JSON array
+    tags: list[str] = json_list_field()
 
     # Timestamps
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -60,23 +77,23 @@ class Lesson(SQLModel, table=True):
 
     @property
     def objectives_list(self) -> list[str]:
-        return json.loads(self.objectives)
+        return self.objectives
 
     @property
     def keywords_list(self) -> list[str]:
-        return json.loads(self.keywords)
+        return self.keywords
 
     @property
     def prerequisites_list(self) -> list[str]:
-        return json.loads(self.prerequisites)
+        return self.prerequisites
 
     @property
     def unlocks_list(self) -> list[str]:
-        return json.loads(self.unlocks)
+        return self.unlocks
 
     @property
     def tags_list(self) -> list[str]:
-        return json.loads(self.tags)
+        return self.tags
 
     class Config:
         validate_assignment = True
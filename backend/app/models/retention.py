@@ -0,0 +1,25 @@
+from datetime import datetime
+from uuid import UUID
+
+from sqlmodel import Field, SQLModel
+
+
+class RetentionCheckpoint(SQLModel, table=True):
+    """Progress of the retention engine through one data type.
+
+    Updated in the same transaction as each purged batch, so an interrupted
+    pass resumes after the last committed batch with the same cutoff.
+    """
+
+    __tablename__ = "retention_checkpoints"
+
+    target: str = Field(primary_key=True)  # "audio_recordings", "chat_messages", ...
+    last_id: UUID | None = Field(default=None)  # None once a pass has completed
+    reference_time: datetime | None = Field(default=None)  # Cutoffs of the current pass are relative to this
+
+    rows_purged: int = Field(default=0)  # In the current (or last) pass
+    files_purged: int = Field(default=0)
+
+    started_at: datetime | None = Field(default=None)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    completed_at: datetime | None = Field(default=None)
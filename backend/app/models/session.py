@@ -1,11 +1,13 @@
 """Session models for the AI Education Platform."""
-import json
 from datetime import datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 from uuid import UUID, uuid4
 
+from sqlalchemy import DDL, Index, event
 from sqlmodel import Field, Relationship, SQLModel
 
+from .json_fields import json_dict_field, json_list_field
+
 if TYPE_CHECKING:
     from .child import Child
     from .lesson import Lesson
@@ -19,6 +21,12 @@ class ChatMessage(SQLModel, table=True):
     """Chat message model for session conversations."""
 
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Keyset pagination over a session's transcript
+        Index("idx_chat_messages_session_timestamp_id", "session_id", "timestamp", "id"),
+        # Daily partitions managed by app.services.chat_partitions
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     session_id: UUID = Field(foreign_key="sessions.id", index=True)
@@ -26,8 +34,9 @@ class ChatMessage(SQLModel, table=True):
     content: str
     content_type: str = Field(default="text")  # "text", "audio"
     audio_url: str | None = Field(default=None)
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
-    message_metadata: str = Field(default="{}")  # JSON metadata
+    # Partition key, so it has to be part of the primary key
+    timestamp: datetime = Field(default_factory=datetime.utcnow, primary_key=True)
+    message_metadata: dict[str, Any] = json_dict_field()
 
     # Content safety
     is_flagged: bool = Field(default=False)
@@ -37,10 +46,37 @@ class ChatMessage(SQLModel, table=True):
     session: "Session" = Relationship(back_populates="messages")
 
 
+# Rows outside every daily partition (see app.services.chat_partitions); migrated databases get it from 012
+event.listen(
+    ChatMessage.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS chat_messages_default PARTITION OF chat_messages DEFAULT").execute_if(
+        dialect="postgresql"
+    ),
+)
+
+
 class Session(SQLModel, table=True):
     """Learning session model for tracking child-lesson interactions."""
 
     __tablename__ = "sessions"
+    __table_args__ = (
+        # Newest-first session history per child, answered from the index alone
+        Index(
+            "idx_sessions_child_created_cover",
+            "child_id",
+            "created_at",
+            postgresql_include=[
+                "id",
+                "subject",
+                "status",
+                "final_score",
+                "points_earned",
+                "time_spent",
+                "engagement_level",
+            ],
+        ),
+    )
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     child_id: UUID = Field(foreign_key="children.id", index=True)
@@ -54,7 +90,7 @@ class Session(SQLModel, table=True):
     end_time: datetime | None = Field(default=None)
 
     # Progress tracking
-    activities_completed: str = Field(default="[]")  # JSON array
+    activities_completed: list[str] = json_list_field()
     current_activity: str | None = Field(default=None)
     score: int = Field(default=0)
     time_spent: int = Field(default=0)  # minutes
@@ -64,10 +100,15 @@ class Session(SQLModel, table=True):
     # Assessment
     final_score: int | None = Field(default=None)
     points_earned: int = Field(default=0)
-    badges_earned: str = Field(default="[]")  # JSON array
+    badges_earned: list[str] = json_list_field()
 
     # Metadata
-    device_info: str = Field(default="{}")  # JSON
+    device_info: dict[str, Any] = json_dict_field()
+
+    # Conversation context: older turns compacted into a running summary (app.services.chat_context)
+    context_summary: str | None = Field(default=None)
+    summary_through: datetime | None = Field(default=None)  # (timestamp, id) of the last summarized message
+    summary_through_id: UUID | None = Field(default=None)
 
     # Timestamps
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -80,13 +121,13 @@ class Session(SQLModel, table=True):
 
     @property
     def activities_completed_list(self) -> list[str]:
-        """Parse activities_completed JSON field into a list."""
-        return json.loads(self.activities_completed)
+        """Activities completed in this session."""
+        return self.activities_completed
 
     @property
     def badges_earned_list(self) -> list[str]:
-        """Parse badges_earned JSON field into a list."""
-        return json.loads(self.badges_earned)
+        """Badges earned in this session."""
+        return self.badges_earned
 
     class Config:
         """SQLModel configuration."""
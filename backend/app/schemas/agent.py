@@ -0,0 +1,53 @@
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class AgentExample(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    input: str
+    output: str
+    # Age groups the example is written for (all when empty)
+    ageGroups: tuple[str, ...] = ()
+
+
+class AgentConfig(BaseModel):
+    """A tutor agent as defined by one ``app/agents/*.yaml`` file (keys as written in the YAML)."""
+
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
+    id: str = Field(pattern=r"^[a-z0-9_-]+$")
+    name: str = Field(min_length=1)
+    subject: str = Field(min_length=1)
+    style: str = "neutral"
+    voice: str = "default"
+    avatar: str = "/avatars/default.png"
+    language: str = "ar"
+
+    # Model configuration
+    modelTier: Literal["basic", "standard", "premium"] = "standard"
+    temperature: float = Field(default=0.7, ge=0, le=2)
+    maxTokens: int = Field(default=500, gt=0, le=4096)
+
+    # Voice settings
+    speechRate: float = Field(default=1.0, gt=0)
+    speechPitch: float = Field(default=1.0, gt=0)
+
+    # Behaviour and safety
+    rules: tuple[str, ...] = ()
+    contentGuardrails: tuple[str, ...] = ()
+    religiousGuidelines: tuple[str, ...] = ()
+    ageAppropriate: bool = True
+    profanityFilter: bool = True
+    educationalFocus: bool = True
+
+    # Prompting
+    systemPrompt: str = ""
+    userPrefix: str = ""
+    contextTemplate: str = ""
+    examples: tuple[AgentExample, ...] = ()
+    focusAreas: tuple[str, ...] = ()
+
+    # Share answers to identical first-turn prompts (same lesson and age group) between children
+    cacheReplies: bool = True
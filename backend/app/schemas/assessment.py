@@ -0,0 +1,19 @@
+from datetime import datetime
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+
+class AssessmentRecord(BaseModel):
+    """One assessment result uploaded by an offline or classroom sync client."""
+
+    childId: UUID
+    sessionId: UUID
+    subject: str = Field(min_length=1, max_length=50)
+    overallScore: int = Field(default=0, ge=0, le=100)
+    skillScores: dict[str, int] = Field(default_factory=dict)
+    strengths: list[str] = Field(default_factory=list)
+    areasForImprovement: list[str] = Field(default_factory=list)
+    recommendations: list[str] = Field(default_factory=list)
+    createdAt: datetime | None = None  # When the assessment happened on the client
+    idempotencyKey: str | None = Field(default=None, min_length=1, max_length=100)
@@ -0,0 +1,168 @@
+"""Registry of the tutor agents defined in ``app/agents/*.yaml``.
+
+Every YAML file is parsed and validated into an immutable ``AgentConfig``
+once, when the registry loads, and the list and detail API responses are
+rendered to JSON bytes at the same time, so requests never touch the disk
+or re-serialize. A background watcher polls the files' modification times
+and reloads when one is added, changed or removed. A file that fails to
+parse or validate is logged and its previous version (if any) stays
+served. Agents' few-shot example indexes (``example_index``) are built at
+load time too.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import yaml
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.schemas.agent import AgentConfig
+from app.services import example_index
+
+logger = logging.getLogger(__name__)
+
+AGENTS_DIR = Path(__file__).resolve().parents[1] / "agents"
+
+
+@dataclass(frozen=True)
+class RenderedResponse:
+    body: bytes
+    etag: str
+
+
+def _render(payload: Any) -> RenderedResponse:
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+    return RenderedResponse(body=body, etag=f'"{hashlib.sha1(body).hexdigest()}"')
+
+
+def _summary(agent: AgentConfig) -> dict[str, Any]:
+    return {
+        "id": agent.id,
+        "name": agent.name,
+        "subject": agent.subject,
+        "style": agent.style,
+        "voice": agent.voice,
+        "avatar": agent.avatar,
+        "language": agent.language,
+        "focusAreas": list(agent.focusAreas),
+    }
+
+
+def _details(agent: AgentConfig) -> dict[str, Any]:
+    return {
+        "id": agent.id,
+        "name": agent.name,
+        "subject": agent.subject,
+        "style": agent.style,
+        "voice": agent.voice,
+        "avatar": agent.avatar,
+        "language": agent.language,
+        "rules": list(agent.rules),
+        "contentGuardrails": list(agent.contentGuardrails),
+        "focusAreas": list(agent.focusAreas),
+        "examples": [example.model_dump() for example in agent.examples],
+        "systemPrompt": agent.systemPrompt,
+    }
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    agents: dict[str, AgentConfig] = field(default_factory=dict)
+    listing: RenderedResponse = field(default_factory=lambda: _render([]))
+    details: dict[str, RenderedResponse] = field(default_factory=dict)
+    # (mtime_ns, size) per file, to detect changes
+    stamps: dict[str, tuple[int, int]] = field(default_factory=dict)
+
+
+class AgentRegistry:
+    """Agent configs and their pre-rendered API responses, swapped atomically on reload."""
+
+    def __init__(self, directory: Path = AGENTS_DIR):
+        self.directory = Path(directory)
+        self._snapshot: _Snapshot | None = None
+
+    def _stamps(self) -> dict[str, tuple[int, int]]:
+        stamps = {}
+        for path in self.directory.glob("*.yaml"):
+            stat = path.stat()
+            stamps[path.name] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+
+    def _parse(self, path: Path) -> AgentConfig:
+        with open(path, encoding="utf-8") as f:
+            raw = yaml.safe_load(f)
+        if not isinstance(raw, dict):
+            raise ValueError("top level must be a mapping")
+        return AgentConfig.model_validate({**raw, "id": path.stem})
+
+    def load(self) -> None:
+        """(Re)load every agent file. Blocking; use ``reload_if_changed`` from async code."""
+        previous = self._snapshot or _Snapshot()
+        stamps = self._stamps()
+        agents = {}
+        for name in sorted(stamps):
+            agent_id = Path(name).stem
+            if previous.stamps.get(name) == stamps[name] and agent_id in previous.agents:
+                agents[agent_id] = previous.agents[agent_id]
+                continue
+            try:
+                agents[agent_id] = self._parse(self.directory / name)
+                example_index.index_for(agents[agent_id])
+            except (OSError, yaml.YAMLError, ValueError, ValidationError) as e:
+                logger.error(f"Invalid agent config {name}, keeping the previous version: {e}")
+                if agent_id in previous.agents:
+                    agents[agent_id] = previous.agents[agent_id]
+
+        self._snapshot = _Snapshot(
+            agents=agents,
+            listing=_render([_summary(agent) for agent in agents.values()]),
+            details={agent_id: _render(_details(agent)) for agent_id, agent in agents.items()},
+            stamps=stamps,
+        )
+        logger.info(f"Loaded {len(agents)} agents from {self.directory}")
+
+    @property
+    def snapshot(self) -> _Snapshot:
+        if self._snapshot is None:
+            self.load()
+        return self._snapshot
+
+    def get(self, agent_id: str) -> AgentConfig | None:
+        return self.snapshot.agents.get(agent_id)
+
+    def all(self) -> list[AgentConfig]:
+        return list(self.snapshot.agents.values())
+
+    def listing(self) -> RenderedResponse:
+        """Rendered ``GET /agents`` body."""
+        return self.snapshot.listing
+
+    def details(self, agent_id: str) -> RenderedResponse | None:
+        """Rendered ``GET /agents/{id}`` body, or None for an unknown agent."""
+        return self.snapshot.details.get(agent_id)
+
+    async def reload_if_changed(self) -> bool:
+        """Reload (off the event loop) when any agent file was added, changed or removed."""
+        stamps = await asyncio.to_thread(self._stamps)
+        if self._snapshot is not None and stamps == self._snapshot.stamps:
+            return False
+        await asyncio.to_thread(self.load)
+        return True
+
+    async def run_watcher(self) -> None:
+        """Poll for changed agent files until cancelled."""
+        while True:
+            await asyncio.sleep(settings.AGENT_REGISTRY_RELOAD_SECONDS)
+            try:
+                await self.reload_if_changed()
+            except Exception as e:
+                logger.error(f"Agent registry reload failed: {e}")
+
+
+agent_registry = AgentRegistry()
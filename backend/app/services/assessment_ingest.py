@@ -0,0 +1,204 @@
+"""Bulk assessment result ingestion for offline and classroom sync clients.
+
+A payload (JSON array or NDJSON) is validated in one pass, ownership of
+every referenced child and session is checked with one query each, and all
+valid rows are written with multi-row ``INSERT ... ON CONFLICT DO NOTHING``
+statements plus one grouped rollup upsert, all in a single transaction.
+Rows carrying an ``idempotencyKey`` that was already ingested for the same
+child are reported as duplicates with the original assessment id, so a
+client can safely retry an upload.
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import Any
+from uuid import UUID, uuid4
+
+from pydantic import ValidationError
+from sqlalchemy import text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.core.config import settings
+from app.models.assessment import AssessmentResult
+from app.models.child import Child
+from app.models.session import Session as LearningSession
+from app.schemas.assessment import AssessmentRecord
+from app.services import daily_stats
+
+
+class PayloadError(ValueError):
+    """The payload as a whole cannot be processed."""
+
+
+def parse_payload(body: bytes, content_type: str) -> list[Any]:
+    """Split a JSON array or NDJSON body into raw items.
+
+    NDJSON lines that are not valid JSON are returned as ``PayloadError``
+    instances so they are reported against their own row.
+    """
+    if "ndjson" in content_type or "jsonl" in content_type:
+        items: list[Any] = []
+        for number, line in enumerate(body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                items.append(PayloadError(f"Line {number} is not valid JSON: {e.msg}"))
+    else:
+        try:
+            items = json.loads(body or b"null")
+        except json.JSONDecodeError as e:
+            raise PayloadError(f"Body is not valid JSON: {e.msg}") from e
+        if not isinstance(items, list):
+            raise PayloadError("Body must be a JSON array or NDJSON")
+
+    if len(items) > settings.ASSESSMENT_BULK_MAX_ROWS:
+        raise PayloadError(f"At most {settings.ASSESSMENT_BULK_MAX_ROWS} assessments per request")
+    return items
+
+
+def _validate(items: list[Any]) -> tuple[dict[int, AssessmentRecord], dict[int, list[str]]]:
+    """Validate every item, returning valid records and per-row errors by index."""
+    records: dict[int, AssessmentRecord] = {}
+    errors: dict[int, list[str]] = {}
+    seen_keys: dict[tuple[UUID, str], int] = {}
+
+    for index, item in enumerate(items):
+        if isinstance(item, PayloadError):
+            errors[index] = [str(item)]
+            continue
+        try:
+            record = AssessmentRecord.model_validate(item)
+        except ValidationError as e:
+            errors[index] = [f"{'.'.join(map(str, err['loc'])) or 'row'}: {err['msg']}" for err in e.errors()]
+            continue
+
+        if record.idempotencyKey is not None:
+            key = (record.childId, record.idempotencyKey)
+            if key in seen_keys:
+                errors[index] = [f"idempotencyKey repeats row {seen_keys[key]}"]
+                continue
+            seen_keys[key] = index
+        records[index] = record
+
+    return records, errors
+
+
+async def _check_ownership(
+    db: AsyncSession, guardian_id: UUID, records: dict[int, AssessmentRecord], errors: dict[int, list[str]]
+) -> None:
+    """Reject rows whose child is not the guardian's or whose session is not the child's."""
+    child_ids = {record.childId for record in records.values()}
+    session_ids = {record.sessionId for record in records.values()}
+
+    owned_children = set(
+        (await db.execute(select(Child.id).where(Child.id.in_(child_ids), Child.guardian_id == guardian_id)))
+        .scalars()
+        .all()
+    )
+    session_children = dict(
+        (
+            await db.execute(
+                select(LearningSession.id, LearningSession.child_id).where(LearningSession.id.in_(session_ids))
+            )
+        ).all()
+    )
+
+    for index, record in list(records.items()):
+        if record.childId not in owned_children:
+            errors[index] = ["Child not found"]
+        elif session_children.get(record.sessionId) != record.childId:
+            errors[index] = ["Session not found for child"]
+        else:
+            continue
+        del records[index]
+
+
+def _row(record: AssessmentRecord, now: datetime) -> dict[str, Any]:
+    created_at = record.createdAt or now
+    if created_at.tzinfo is not None:
+        # Naive UTC like every other timestamp column
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return {
+        # Generated here so inserted rows can be told apart from skipped duplicates
+        "id": uuid4(),
+        "child_id": record.childId,
+        "session_id": record.sessionId,
+        "subject": record.subject,
+        "overall_score": record.overallScore,
+        "skill_scores": record.skillScores,
+        "strengths": record.strengths,
+        "areas_for_improvement": record.areasForImprovement,
+        "recommendations": record.recommendations,
+        "idempotency_key": record.idempotencyKey,
+        "created_at": created_at,
+    }
+
+
+async def ingest(db: AsyncSession, guardian_id: UUID, items: list[Any]) -> dict[str, Any]:
+    """Validate and store ``items`` in one transaction, returning a per-row report."""
+    records, errors = _validate(items)
+    if records:
+        await _check_ownership(db, guardian_id, records, errors)
+
+    now = datetime.utcnow()
+    created: dict[int, UUID] = {}
+    duplicates: dict[int, UUID | None] = {}
+    indexes = list(records)
+
+    chunk_size = settings.ASSESSMENT_BULK_INSERT_CHUNK
+    for start in range(0, len(indexes), chunk_size):
+        chunk = indexes[start : start + chunk_size]
+        rows = [_row(records[index], now) for index in chunk]
+        stmt = (
+            insert(AssessmentResult)
+            .values(rows)
+            .on_conflict_do_nothing(
+                index_elements=["child_id", "idempotency_key"], index_where=text("idempotency_key IS NOT NULL")
+            )
+            .returning(AssessmentResult.id)
+        )
+        inserted = set((await db.execute(stmt)).scalars().all())
+
+        for index, row in zip(chunk, rows):
+            if row["id"] in inserted:
+                created[index] = row["id"]
+            else:
+                duplicates[index] = None
+
+    if duplicates:
+        keys = [(records[index].childId, records[index].idempotencyKey) for index in duplicates]
+        key_columns = tuple_(AssessmentResult.child_id, AssessmentResult.idempotency_key)
+        existing = {
+            (row.child_id, row.idempotency_key): row.id
+            for row in await db.execute(
+                select(AssessmentResult.child_id, AssessmentResult.idempotency_key, AssessmentResult.id).where(
+                    key_columns.in_(keys)
+                )
+            )
+        }
+        for index in duplicates:
+            duplicates[index] = existing.get((records[index].childId, records[index].idempotencyKey))
+
+    await daily_stats.record_assessments(db, list(created.values()))
+    await db.commit()
+
+    results = []
+    for index in range(len(items)):
+        if index in created:
+            results.append({"index": index, "status": "created", "assessmentId": str(created[index])})
+        elif index in duplicates:
+            results.append({"index": index, "status": "duplicate", "assessmentId": str(duplicates[index])})
+        else:
+            results.append({"index": index, "status": "error", "errors": errors[index]})
+
+    return {
+        "created": len(created),
+        "duplicates": len(duplicates),
+        "errors": len(errors),
+        "results": results,
+    }
@@ -0,0 +1,194 @@
+"""Conversation context sent to the model on each chat turn.
+
+A session can last ``MAX_SESSION_DURATION_MINUTES``; sending its whole
+transcript every turn would make prompts, latency and cost grow with its
+length. ``fit`` assembles the agent's system prompt, its
+``contextTemplate`` filled in for the lesson, the session's running
+summary and as many recent messages as fit in a token budget of
+``CHAT_CONTEXT_BUDGET_FACTOR`` times the agent's ``maxTokens``.
+
+When older messages no longer fit, the oldest ones (all but the newest
+half of the history budget) are compacted: after the reply has been sent,
+a small model folds them into the running summary stored on the session,
+and later turns read only the messages after it. Prompt size stays bounded
+either way; compaction only decides whether old turns are remembered as a
+summary or dropped.
+
+Token counts are estimates (``prompt_text.estimate_tokens``).
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.session import ChatMessage
+from app.models.session import Session as LearningSession
+from app.schemas.agent import AgentConfig
+from app.services import example_index, llm_providers, tutor_chat
+from app.services.chat_history import messages_query
+from app.services.llm_providers import ChatRequest
+from app.services.llm_scheduler import Priority
+from app.services.prompt_text import estimate_tokens, message_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_HEADING = "Summary of the conversation so far:"
+
+SUMMARY_PROMPT = (
+    "You keep notes on a tutoring conversation with a young child. Merge the previous summary and the new "
+    "messages into one short summary: what was taught, what the child understood or struggled with, and "
+    "anything the tutor promised to come back to. Write in the language of the conversation, in at most "
+    "a few sentences, without greetings."
+)
+
+# Sessions being compacted by this worker, and the tasks doing it
+_compacting: set[UUID] = set()
+_tasks: set[asyncio.Task] = set()
+
+
+@dataclass
+class ContextWindow:
+    context: str  # Lesson context and running summary, appended to the system prompt
+    history: list[dict[str, str]]
+    prompt_tokens: int
+    # Oldest messages to fold into the summary (empty while everything fits)
+    compactable: list[Any] = field(default_factory=list)
+
+
+def prompt_budget(agent: AgentConfig) -> int:
+    return agent.maxTokens * settings.CHAT_CONTEXT_BUDGET_FACTOR
+
+
+def lesson_context(agent: AgentConfig, lesson: dict[str, Any] | None) -> str:
+    """The agent's ``contextTemplate`` filled in for ``lesson`` (a ``get_lesson_details`` body)."""
+    if not agent.contextTemplate or lesson is None:
+        return ""
+    values = {"topic": "، ".join(lesson.get("keywords") or []) or lesson["subject"], "lesson_title": lesson["title"]}
+    return agent.contextTemplate.format_map(defaultdict(str, values))
+
+
+def fit(
+    agent: AgentConfig,
+    user_message: str,
+    messages: list[Any],
+    summary: str | None = None,
+    lesson: dict[str, Any] | None = None,
+    child_name: str | None = None,
+    age_group: str | None = None,
+) -> ContextWindow:
+    """Context for a turn, given the ``messages`` after the summary (oldest first)."""
+    parts = (lesson_context(agent, lesson), f"{SUMMARY_HEADING}\n{summary}" if summary else "")
+    context = "\n\n".join(part for part in parts if part)
+    fixed = estimate_tokens(tutor_chat.system_prompt(agent, child_name, context)) + message_tokens(user_message)
+    examples = example_index.select(agent, user_message, age_group)
+    fixed += sum(example_index.example_tokens(example) for example in examples)
+    available = max(0, prompt_budget(agent) - fixed)
+
+    # Newest first: everything that fits is sent, the part beyond the newest half is compacted on overflow
+    start = keep_from = len(messages)
+    used = 0
+    for index in range(len(messages) - 1, -1, -1):
+        used += message_tokens(messages[index].content)
+        if used > available:
+            break
+        start = index
+        if used <= available // 2:
+            keep_from = index
+
+    kept = messages[start:]
+    return ContextWindow(
+        context=context,
+        history=[
+            {"role": "user" if message.role == "child" else "assistant", "content": message.content}
+            for message in kept
+        ],
+        prompt_tokens=fixed + sum(message_tokens(message.content) for message in kept),
+        compactable=messages[:keep_from] if start > 0 else [],
+    )
+
+
+async def recent_messages(db, learning_session: LearningSession) -> list[Any]:
+    """Up to ``CHAT_CONTEXT_MAX_MESSAGES`` latest messages after the session's summary, oldest first."""
+    after = None
+    if learning_session.summary_through is not None:
+        after = (learning_session.summary_through, learning_session.summary_through_id)
+    query = (
+        messages_query(learning_session.id, after)
+        .order_by(None)
+        .order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
+        .limit(settings.CHAT_CONTEXT_MAX_MESSAGES)
+    )
+    rows = (await db.execute(query)).all()
+    return rows[::-1]
+
+
+async def summarize(summary: str | None, messages: list[Any], fair_key: str | None = None) -> str:
+    """``summary`` extended with ``messages``, as background work."""
+    transcript = "\n".join(f"{'Child' if m.role == 'child' else 'Tutor'}: {m.content}" for m in messages)
+    provider, model = llm_providers.route_tier(settings.CHAT_CONTEXT_SUMMARY_TIER)
+    completion = await provider.complete(
+        ChatRequest(
+            model=model,
+            messages=[
+                {"role": "user", "content": f"Previous summary:\n{summary or '-'}\n\nNew messages:\n{transcript}"}
+            ],
+            system=SUMMARY_PROMPT,
+            temperature=0.2,
+            max_tokens=settings.CHAT_CONTEXT_SUMMARY_MAX_TOKENS,
+            priority=Priority.BACKGROUND,
+            fair_key=fair_key,
+        )
+    )
+    return completion.text.strip()
+
+
+async def compact(
+    session_id: UUID, summary: str | None, summary_through: datetime | None, messages: list[Any]
+) -> bool:
+    """Fold ``messages`` into the session's summary; False if another compaction got there first."""
+    new_summary = await summarize(summary, messages, fair_key=str(session_id))
+    last = messages[-1]
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(LearningSession)
+            .where(
+                LearningSession.id == session_id,
+                LearningSession.summary_through.is_not_distinct_from(summary_through),
+            )
+            .values(context_summary=new_summary, summary_through=last.timestamp, summary_through_id=last.id)
+        )
+        await db.commit()
+    return result.rowcount == 1
+
+
+def schedule_compaction(learning_session: LearningSession, messages: list[Any]) -> None:
+    """Compact ``messages`` in the background, unless this session is already being compacted."""
+    session_id, summary, summary_through = (
+        learning_session.id,
+        learning_session.context_summary,
+        learning_session.summary_through,
+    )
+    if not messages or session_id in _compacting:
+        return
+
+    async def run():
+        try:
+            await compact(session_id, summary, summary_through, messages)
+        except Exception as e:
+            # The history window stays bounded; these turns are just not summarized yet
+            logger.warning(f"Context compaction of session {session_id} failed: {e}")
+        finally:
+            _compacting.discard(session_id)
+
+    _compacting.add(session_id)
+    task = asyncio.create_task(run())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
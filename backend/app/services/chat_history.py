@@ -0,0 +1,109 @@
+"""Paginated and streamed access to a session's chat transcript.
+
+Pages are keyset-ordered on ``(timestamp, id)`` and addressed by an opaque
+cursor, so fetching page N costs the same as fetching page 1. The full
+transcript can also be streamed as NDJSON from a server-side cursor, holding
+at most one fetch batch in memory regardless of session length.
+"""
+
+import base64
+import json
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import tuple_
+from sqlmodel import select
+
+from app.core.database import AsyncSessionLocal
+from app.models.session import ChatMessage
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Rows fetched per round trip when streaming a transcript
+STREAM_BATCH_SIZE = 500
+
+MESSAGE_COLUMNS = (
+    ChatMessage.id,
+    ChatMessage.role,
+    ChatMessage.content,
+    ChatMessage.content_type,
+    ChatMessage.timestamp,
+)
+
+
+def encode_cursor(timestamp: datetime, message_id: UUID) -> str:
+    """Encode the position after a message as an opaque URL-safe cursor."""
+    raw = f"{timestamp.isoformat()}|{message_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Decode a cursor from :func:`encode_cursor`, raising ``ValueError`` when malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, message_id = raw.split("|")
+        return datetime.fromisoformat(timestamp), UUID(message_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def serialize_message(message: Any) -> dict[str, Any]:
+    """API representation of a chat message row."""
+    return {
+        "id": str(message.id),
+        "role": message.role,
+        "content": message.content,
+        "contentType": message.content_type,
+        "timestamp": message.timestamp.isoformat(),
+    }
+
+
+def messages_query(session_id: UUID, after: tuple[datetime, UUID] | None = None):
+    """Transcript of a session in ``(timestamp, id)`` order, optionally after a cursor position."""
+    query = (
+        select(*MESSAGE_COLUMNS)
+        .where(ChatMessage.session_id == session_id)
+        .order_by(ChatMessage.timestamp, ChatMessage.id)
+    )
+    if after is not None:
+        # The plain timestamp bound is redundant but lets the planner prune older partitions
+        query = query.where(
+            ChatMessage.timestamp >= after[0],
+            tuple_(ChatMessage.timestamp, ChatMessage.id) > tuple_(*after),
+        )
+    return query
+
+
+async def get_page(
+    db, session_id: UUID, cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE
+) -> tuple[list[dict[str, Any]], str | None]:
+    """Return one page of messages and the cursor of the next page (``None`` on the last page)."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = decode_cursor(cursor) if cursor else None
+
+    # Fetch one extra row to learn whether another page follows
+    rows = (await db.execute(messages_query(session_id, after).limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id) if has_more else None
+    return [serialize_message(row) for row in rows], next_cursor
+
+
+async def stream_ndjson(session_id: UUID) -> AsyncIterator[bytes]:
+    """Yield the full transcript as NDJSON lines from a server-side cursor.
+
+    Uses its own database session because the response body is produced after
+    the request's dependencies have been torn down.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(
+            messages_query(session_id).execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        async for partition in result.partitions():
+            yield "".join(
+                json.dumps(serialize_message(row), ensure_ascii=False) + "\n" for row in partition
+            ).encode()
@@ -0,0 +1,223 @@
+"""Daily range partitions of ``chat_messages``.
+
+``chat_messages`` is partitioned by ``timestamp`` (UTC days). A maintenance
+job keeps ``CHAT_PARTITION_PREMAKE_DAYS`` future partitions ahead of the
+clock and enforces ``CHAT_RETENTION_DAYS`` by detaching and dropping whole
+partitions, which avoids row-by-row deletes and the vacuum debt they leave.
+
+A default partition (``chat_messages_default``) takes the rows no daily
+partition covers: clock skew, back-dated write-behind replays, and every
+insert on a fresh database before the first maintenance run. Creating a
+day's partition moves that day's rows out of it. Expired rows left in it are
+purged by the retention engine like those of live partitions.
+
+Run maintenance manually with:
+
+    python -m app.services.chat_partitions maintain [--dry-run]
+"""
+
+import argparse
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import settings
+from app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "chat_messages"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+
+# Arbitrary constant identifying the maintenance job's Postgres advisory lock
+MAINTENANCE_LOCK_KEY = 728_002
+
+_UPPER_BOUND = re.compile(r"TO \('(\d{4}-\d{2}-\d{2})")
+
+
+def partition_name(day: date) -> str:
+    """Name of the partition holding messages sent on ``day``."""
+    return f"{PARENT_TABLE}_p{day:%Y%m%d}"
+
+
+def create_default_partition_sql() -> str:
+    """DDL creating the default partition if it does not exist yet."""
+    return f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"
+
+
+def create_partition_sql(day: date) -> str:
+    """DDL creating the partition for ``day`` if it does not exist yet.
+
+    Rows of that day already in the default partition are moved into the new
+    partition before it is attached, in the same statement.
+    """
+    name, start, end = partition_name(day), day.isoformat(), (day + timedelta(days=1)).isoformat()
+    return f"""
+    DO $$
+    BEGIN
+        IF to_regclass('{name}') IS NOT NULL THEN
+            RETURN;
+        END IF;
+        CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS);
+        IF to_regclass('{DEFAULT_PARTITION}') IS NOT NULL THEN
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION} WHERE timestamp >= '{start}' AND timestamp < '{end}' RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved;
+        END IF;
+        ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}');
+    END $$
+    """
+
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    """Whether ``chat_messages`` is a partitioned table (it is not before migration 007)."""
+    relkind = await conn.scalar(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": PARENT_TABLE}
+    )
+    return relkind == "p"
+
+
+async def list_partitions(conn: AsyncConnection) -> list[tuple[str, date | None]]:
+    """Return ``(name, upper bound day)`` of every attached partition; the bound is None for the default."""
+    rows = await conn.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table) ORDER BY c.relname"
+        ),
+        {"table": PARENT_TABLE},
+    )
+    partitions = []
+    for name, bound in rows:
+        match = _UPPER_BOUND.search(bound or "")
+        partitions.append((name, date.fromisoformat(match.group(1)) if match else None))
+    return partitions
+
+
+async def missing_partitions(conn: AsyncConnection, today: date | None = None, days: int | None = None) -> list[date]:
+    """Days from ``today`` through ``days`` days ahead that have no partition yet."""
+    today = today or datetime.utcnow().date()
+    days = settings.CHAT_PARTITION_PREMAKE_DAYS if days is None else days
+
+    existing = {name for name, _ in await list_partitions(conn)}
+    upcoming = (today + timedelta(days=offset) for offset in range(days + 1))
+    return [day for day in upcoming if partition_name(day) not in existing]
+
+
+async def ensure_partitions(conn: AsyncConnection, today: date | None = None, days: int | None = None) -> list[str]:
+    """Create the partitions for ``today`` and the following ``days`` days, returning the new ones."""
+    created = []
+    for day in await missing_partitions(conn, today, days):
+        await conn.execute(text(create_partition_sql(day)))
+        created.append(partition_name(day))
+    return created
+
+
+async def expired_partitions(
+    conn: AsyncConnection, today: date | None = None, retention_days: int | None = None
+) -> list[str]:
+    """Partitions whose every row is older than the retention window."""
+    today = today or datetime.utcnow().date()
+    retention_days = settings.CHAT_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = today - timedelta(days=retention_days)
+    return [name for name, upper in await list_partitions(conn) if upper is not None and upper <= cutoff]
+
+
+async def drop_partition(conn: AsyncConnection, name: str) -> None:
+    """Detach a partition, then drop it (``conn`` in autocommit mode).
+
+    ``DETACH ... CONCURRENTLY`` is not allowed next to a default partition,
+    so the detach briefly locks the parent table. It gives up after
+    ``CHAT_PARTITION_LOCK_TIMEOUT_MS`` rather than queue writers behind it;
+    the partition is then dropped by a later run.
+    """
+    await conn.execute(text(f"SET lock_timeout = {int(settings.CHAT_PARTITION_LOCK_TIMEOUT_MS)}"))
+    try:
+        await conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+    finally:
+        await conn.execute(text("RESET lock_timeout"))
+    await conn.execute(text(f"DROP TABLE {name}"))
+
+
+async def run_maintenance(today: date | None = None, dry_run: bool = False) -> dict[str, Any]:
+    """Pre-create future partitions and drop expired ones.
+
+    Returns a summary of the partitions created and dropped (or that would
+    be, with ``dry_run``). Does nothing when another worker holds the
+    maintenance lock or the table is not partitioned yet.
+    """
+    summary: dict[str, Any] = {"created": [], "dropped": [], "skipped": None}
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if not await is_partitioned(conn):
+            logger.warning("chat_messages is not partitioned, run migration 007 to enable partition maintenance")
+            summary["skipped"] = "not_partitioned"
+            return summary
+
+        acquired = await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY})
+        if not acquired:
+            logger.info("Chat partition maintenance already running elsewhere, skipping")
+            summary["skipped"] = "locked"
+            return summary
+
+        try:
+            if dry_run:
+                summary["created"] = [partition_name(day) for day in await missing_partitions(conn, today)]
+                summary["dropped"] = await expired_partitions(conn, today)
+                return summary
+
+            await conn.execute(text(create_default_partition_sql()))
+            summary["created"] = await ensure_partitions(conn, today)
+            for name in await expired_partitions(conn, today):
+                try:
+                    await drop_partition(conn, name)
+                except DBAPIError as e:
+                    logger.warning(f"Could not detach chat partition {name}, retrying next run: {e}")
+                    continue
+                summary["dropped"].append(name)
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MAINTENANCE_LOCK_KEY})
+
+    logger.info(
+        "Chat partition maintenance created %d and dropped %d partitions",
+        len(summary["created"]),
+        len(summary["dropped"]),
+    )
+    return summary
+
+
+async def run_partition_scheduler() -> None:
+    """Run partition maintenance on a fixed interval until cancelled."""
+    interval = settings.CHAT_PARTITION_MAINTENANCE_INTERVAL_MINUTES * 60
+    while True:
+        try:
+            await run_maintenance()
+        except Exception as e:
+            logger.error(f"Chat partition maintenance failed: {e}")
+        await asyncio.sleep(interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain chat_messages partitions")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    maintain_parser = subparsers.add_parser("maintain", help="Create future partitions and drop expired ones")
+    maintain_parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    summary = asyncio.run(run_maintenance(dry_run=args.dry_run))
+    verb = "Would" if args.dry_run else "Did"
+    print(f"{verb} create: {', '.join(summary['created']) or '-'}")
+    print(f"{verb} drop: {', '.join(summary['dropped']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Token streaming of tutor replies to the client.
+
+``relay`` turns a provider stream (text deltas, then the final
+``Completion``) into client events:
+
+* ``{"type": "token", "text": ...}`` for every delta,
+* ``{"type": "done", ...}`` once the reply is complete, after the optional
+  ``on_complete`` callback (which checks and persists the turn) has finished;
+  a reply failing the safety checks is ``"flagged": true`` and its
+  ``response`` is the fallback the client shows in place of the tokens,
+* ``{"type": "error", "status": ..., "detail": ...}`` when the provider fails.
+
+The same events are sent as server-sent events (``to_sse``) or as WebSocket
+JSON messages. When the client goes away the consumer is cancelled or
+closed, and closing the relay closes the provider stream, which aborts the
+upstream generation instead of paying for tokens nobody reads. Persistence
+in ``on_complete`` is shielded from that cancellation, so a reply that was
+fully generated is saved even if the client disconnects at the last moment;
+an abandoned turn is not persisted.
+
+Server-sent event bodies are wrapped in ``until_disconnected``: ASGI 2.4
+servers silently drop writes to a closed connection, so without watching
+for ``http.disconnect`` the stream would run to the end.
+"""
+
+import asyncio
+import json
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import suppress
+from typing import Any
+
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.session import ChatMessage
+from app.services import chat_write_behind
+from app.services.llm_providers import Completion, LLMError, LLMUnavailableError
+from app.services.reply_cache import AgentReply
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def completion_metadata(completion: Completion) -> dict[str, Any]:
+    """``message_metadata`` recorded on the agent's ``ChatMessage``."""
+    metadata = {
+        "provider": completion.provider,
+        "model": completion.model,
+        "inputTokens": completion.input_tokens,
+        "cachedInputTokens": completion.cached_input_tokens,
+        "outputTokens": completion.output_tokens,
+        "latencyMs": round(completion.latency_ms),
+        "queueMs": round(completion.queue_ms),
+    }
+    if completion.first_token_ms is not None:
+        metadata["firstTokenMs"] = round(completion.first_token_ms)
+    if completion.hedged:
+        metadata["hedged"] = True
+    return metadata
+
+
+def safety_fields(reply: AgentReply) -> dict[str, Any]:
+    """``done`` event fields replacing the streamed text of a reply that failed the safety checks."""
+    if reply.safety.passed:
+        return {}
+    return {"response": reply.completion.text, "flagged": True}
+
+
+async def relay(
+    events: AsyncIterator[str | Completion],
+    on_complete: Callable[[Completion], Awaitable[dict[str, Any]]] | None = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """Client events for a provider stream; closing this closes ``events``."""
+    try:
+        async for event in events:
+            if not isinstance(event, Completion):
+                yield {"type": "token", "text": event}
+                continue
+            done = {"type": "done", "response": event.text, **completion_metadata(event)}
+            if on_complete is not None:
+                done.update(await asyncio.shield(on_complete(event)))
+            yield done
+    except LLMUnavailableError:
+        yield {"type": "error", "status": 503, "detail": "AI tutor is not available"}
+    except LLMError:
+        yield {"type": "error", "status": 502, "detail": "AI tutor failed to respond"}
+    finally:
+        await events.aclose()
+
+
+async def to_sse(events: AsyncIterator[dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Encode client events as server-sent events named after their type."""
+    try:
+        async for event in events:
+            data = json.dumps(event, ensure_ascii=False, default=str)
+            yield f"event: {event['type']}\ndata: {data}\n\n".encode()
+    finally:
+        await events.aclose()
+
+
+async def _disconnected(request: Request) -> None:
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def until_disconnected(request: Request, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Relay ``chunks`` until the client disconnects, then close them."""
+    watcher = asyncio.ensure_future(_disconnected(request))
+    try:
+        while True:
+            chunk = asyncio.ensure_future(anext(chunks))
+            await asyncio.wait({chunk, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if not chunk.done():
+                chunk.cancel()
+                with suppress(asyncio.CancelledError, StopAsyncIteration):
+                    await chunk
+                return
+            try:
+                data = chunk.result()
+            except StopAsyncIteration:
+                return
+            yield data
+    finally:
+        watcher.cancel()
+        await chunks.aclose()
+
+
+async def save_messages(messages: list[ChatMessage]) -> None:
+    """Persist a streamed turn outside the request's database session.
+
+    Streamed bodies are produced after the request's dependencies have been
+    torn down, so this opens its own session (or uses write-behind).
+    """
+    if settings.CHAT_WRITE_BEHIND_ENABLED:
+        await chat_write_behind.enqueue(messages)
+        return
+    async with AsyncSessionLocal() as db:
+        db.add_all(messages)
+        await db.commit()
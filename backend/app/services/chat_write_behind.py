@@ -0,0 +1,271 @@
+"""Write-behind persistence for chat messages.
+
+With ``CHAT_WRITE_BEHIND_ENABLED`` the message endpoint acknowledges a chat
+turn once its messages are in a durable queue instead of after a Postgres
+commit. A background flusher drains the queue into ``chat_messages`` with
+batched multi-row inserts.
+
+Guarantees:
+
+* Ordering per session: ids and timestamps are assigned at enqueue time and
+  timestamps are strictly increasing per session, so transcripts read in
+  ``(timestamp, id)`` order match the order messages were sent, whatever
+  order batches land in.
+* Crash recovery: entries are acknowledged only after their batch commits.
+  Unacknowledged entries are replayed on restart (and stale entries of dead
+  Redis consumers are claimed), and inserts ignore rows that already exist,
+  so replaying an already committed batch is harmless.
+
+Messages become visible to transcript reads once flushed, normally within
+``CHAT_WRITE_BEHIND_FLUSH_INTERVAL_MS``.
+
+Two queues are available: a Redis stream with a consumer group (production)
+and a local append-only log with an fsynced offset file (tests and
+single-process deployments).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Protocol
+from uuid import UUID
+
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_redis
+from app.models.session import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+CONSUMER_GROUP = "chat-writers"
+
+# Redis entries pending this long with a consumer are assumed orphaned by a crash
+CLAIM_IDLE_MS = 60_000
+
+
+def serialize(message: ChatMessage) -> dict[str, Any]:
+    """Queue representation of a chat message."""
+    return {
+        "id": str(message.id),
+        "session_id": str(message.session_id),
+        "role": message.role,
+        "content": message.content,
+        "content_type": message.content_type,
+        "audio_url": message.audio_url,
+        "timestamp": message.timestamp.isoformat(),
+        "message_metadata": message.message_metadata,
+        "is_flagged": message.is_flagged,
+        "flagged_reason": message.flagged_reason,
+    }
+
+
+def deserialize(entry: dict[str, Any]) -> dict[str, Any]:
+    """Insert row for a queued chat message."""
+    return {
+        # Entries queued before flags were recorded
+        "is_flagged": False,
+        "flagged_reason": None,
+        **entry,
+        "id": UUID(entry["id"]),
+        "session_id": UUID(entry["session_id"]),
+        "timestamp": datetime.fromisoformat(entry["timestamp"]),
+    }
+
+
+class MessageQueue(Protocol):
+    async def append(self, entries: list[dict[str, Any]]) -> None:
+        """Durably enqueue ``entries`` in order."""
+
+    async def read(self, count: int, block_ms: int) -> list[tuple[Any, dict[str, Any]]]:
+        """Return up to ``count`` unacknowledged ``(position, entry)`` pairs, oldest first."""
+
+    async def ack(self, positions: list[Any]) -> None:
+        """Mark entries as persisted."""
+
+
+class RedisStreamQueue:
+    """Redis stream drained through a consumer group."""
+
+    def __init__(self, stream: str, consumer: str):
+        self.stream = stream
+        self.consumer = consumer
+        self._group_ready = False
+        self._replaying = True
+
+    async def _redis(self):
+        redis = await get_redis()
+        if not self._group_ready:
+            try:
+                await redis.xgroup_create(self.stream, CONSUMER_GROUP, id="0", mkstream=True)
+            except Exception as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+            self._group_ready = True
+        return redis
+
+    async def append(self, entries: list[dict[str, Any]]) -> None:
+        redis = await self._redis()
+        async with redis.pipeline(transaction=True) as pipe:
+            for entry in entries:
+                pipe.xadd(self.stream, {"data": json.dumps(entry, ensure_ascii=False)})
+            await pipe.execute()
+
+    async def read(self, count: int, block_ms: int) -> list[tuple[Any, dict[str, Any]]]:
+        redis = await self._redis()
+
+        # Take over entries left pending by consumers that died mid-batch
+        claimed = await redis.xautoclaim(
+            self.stream, CONSUMER_GROUP, self.consumer, CLAIM_IDLE_MS, "0-0", count=count
+        )
+        if claimed[1]:
+            return [(entry_id, json.loads(fields[b"data"])) for entry_id, fields in claimed[1] if fields]
+
+        # Replay our own unacknowledged entries first, then wait for new ones
+        start = "0" if self._replaying else ">"
+        block = None if self._replaying else block_ms
+        response = await redis.xreadgroup(CONSUMER_GROUP, self.consumer, {self.stream: start}, count=count, block=block)
+        entries = [
+            (entry_id, json.loads(fields[b"data"])) for _, batch in response for entry_id, fields in batch if fields
+        ]
+        if self._replaying and not entries:
+            self._replaying = False
+        return entries
+
+    async def ack(self, positions: list[Any]) -> None:
+        redis = await self._redis()
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.xack(self.stream, CONSUMER_GROUP, *positions)
+            pipe.xdel(self.stream, *positions)
+            await pipe.execute()
+
+
+class AppendOnlyLogQueue:
+    """Local JSON-lines log with an fsynced offset file marking what has been flushed."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.offset_path = self.path.with_name(self.path.name + ".offset")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+        self._lock = asyncio.Lock()
+
+    def _flushed_offset(self) -> int:
+        try:
+            offset = int(self.offset_path.read_text() or 0)
+        except FileNotFoundError:
+            return 0
+        return offset if offset <= self.path.stat().st_size else 0
+
+    def _append(self, entries: list[dict[str, Any]]) -> None:
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries).encode()
+        with open(self.path, "ab") as log:
+            log.write(data)
+            log.flush()
+            os.fsync(log.fileno())
+
+    def _read(self, count: int) -> list[tuple[int, dict[str, Any]]]:
+        entries = []
+        with open(self.path, "rb") as log:
+            log.seek(self._flushed_offset())
+            while len(entries) < count:
+                line = log.readline()
+                # A torn final line (crash mid-append) is left for the next read
+                if not line.endswith(b"\n"):
+                    break
+                entries.append((log.tell(), json.loads(line)))
+        return entries
+
+    def _ack(self, offset: int) -> None:
+        tmp_path = self.offset_path.with_suffix(".tmp")
+        tmp_path.write_text(str(offset))
+        with open(tmp_path, "rb+") as tmp:
+            os.fsync(tmp.fileno())
+        os.replace(tmp_path, self.offset_path)
+
+        # Start a fresh log once everything in it has been flushed. Resetting the
+        # offset first means a crash in between only replays already inserted rows.
+        if offset == self.path.stat().st_size:
+            self.offset_path.write_text("0")
+            self.path.write_bytes(b"")
+
+    async def append(self, entries: list[dict[str, Any]]) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._append, entries)
+
+    async def read(self, count: int, block_ms: int) -> list[tuple[Any, dict[str, Any]]]:
+        async with self._lock:
+            entries = await asyncio.to_thread(self._read, count)
+        if not entries:
+            await asyncio.sleep(block_ms / 1000)
+        return entries
+
+    async def ack(self, positions: list[Any]) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._ack, max(positions))
+
+
+_queue: MessageQueue | None = None
+
+# Last timestamp handed out per session, to keep per-session order strict
+_last_timestamps: dict[UUID, datetime] = {}
+
+
+def get_queue() -> MessageQueue:
+    """Queue selected by ``CHAT_WRITE_BEHIND_BACKEND``."""
+    global _queue
+    if _queue is None:
+        if settings.CHAT_WRITE_BEHIND_BACKEND == "log":
+            _queue = AppendOnlyLogQueue(settings.CHAT_WRITE_BEHIND_LOG_PATH)
+        else:
+            _queue = RedisStreamQueue(settings.CHAT_WRITE_BEHIND_STREAM, f"{socket.gethostname()}-{os.getpid()}")
+    return _queue
+
+
+async def enqueue(messages: list[ChatMessage], queue: MessageQueue | None = None) -> None:
+    """Durably queue ``messages`` (in order) for persistence."""
+    for message in messages:
+        # Equal timestamps would fall back to random id order within a session
+        last = _last_timestamps.get(message.session_id)
+        if last is not None and message.timestamp <= last:
+            message.timestamp = last + timedelta(microseconds=1)
+        _last_timestamps[message.session_id] = message.timestamp
+    if len(_last_timestamps) > 10_000:
+        _last_timestamps.clear()
+
+    await (queue or get_queue()).append([serialize(message) for message in messages])
+
+
+async def flush_once(queue: MessageQueue | None = None, batch_size: int | None = None, block_ms: int = 0) -> int:
+    """Persist one batch of queued messages, returning how many were written."""
+    queue = queue or get_queue()
+    entries = await queue.read(batch_size or settings.CHAT_WRITE_BEHIND_BATCH_SIZE, block_ms)
+    if not entries:
+        return 0
+
+    rows = [deserialize(entry) for _, entry in entries]
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(ChatMessage).values(rows).on_conflict_do_nothing(index_elements=["id", "timestamp"]))
+        await db.commit()
+
+    await queue.ack([position for position, _ in entries])
+    return len(rows)
+
+
+async def run_flusher(queue: MessageQueue | None = None) -> None:
+    """Drain the queue into ``chat_messages`` until cancelled."""
+    block_ms = settings.CHAT_WRITE_BEHIND_FLUSH_INTERVAL_MS
+    failures = 0
+    while True:
+        try:
+            await flush_once(queue, block_ms=block_ms)
+            failures = 0
+        except Exception as e:
+            # Entries stay unacknowledged and are retried after a backoff
+            failures += 1
+            logger.error(f"Chat write-behind flush failed (attempt {failures}): {e}")
+            await asyncio.sleep(min(2**failures, 30))
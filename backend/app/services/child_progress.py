@@ -0,0 +1,92 @@
+"""Atomic updates of child progress counters.
+
+Completing a session and crediting the child are single ``UPDATE``
+statements whose new values are computed by Postgres from the current row,
+so concurrent completions never lose points or streak days and row locks
+are held only for the duration of the statement. Streaks count consecutive
+local days (in the guardian's timezone) with at least one completed session.
+"""
+
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import DateTime, Integer, case, cast, func, literal, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.child import Child
+from app.models.session import Session as LearningSession
+from app.services import daily_stats
+
+
+async def credit_activity(db: AsyncSession, child_id: UUID, points: int, activity_at: datetime) -> tuple | None:
+    """Add ``points`` and extend the child's streak for activity at ``activity_at`` (naive UTC).
+
+    Returns the new ``(total_points, current_streak, longest_streak)``, or None
+    when the child does not exist.
+    """
+    zone = await daily_stats.guardian_zone(db, child_id)
+    if zone is None:
+        return None
+
+    at = literal(activity_at, DateTime)
+    activity_day = daily_stats.local_day(at, zone)
+    last_day = daily_stats.local_day(Child.last_activity, zone)
+
+    # SET expressions see the row as it was before the update
+    new_streak = case(
+        (Child.last_activity.is_(None), 1),
+        (activity_day == last_day, func.greatest(Child.current_streak, 1)),
+        (activity_day == last_day + 1, Child.current_streak + 1),
+        # Late-arriving activity from an earlier day leaves the streak alone
+        (activity_day < last_day, Child.current_streak),
+        else_=1,
+    )
+
+    stmt = (
+        update(Child)
+        .where(Child.id == child_id)
+        .values(
+            total_points=Child.total_points + points,
+            current_streak=new_streak,
+            longest_streak=func.greatest(Child.longest_streak, new_streak),
+            last_activity=func.greatest(func.coalesce(Child.last_activity, at), at),
+            updated_at=datetime.utcnow(),
+        )
+        .returning(Child.total_points, Child.current_streak, Child.longest_streak)
+        .execution_options(synchronize_session=False)
+    )
+    return (await db.execute(stmt)).one_or_none()
+
+
+async def complete_session(
+    db: AsyncSession, session_id: UUID, final_score: int, points: int
+) -> LearningSession | None:
+    """Mark a session completed and credit its child, without committing.
+
+    The status transition is guarded in SQL, so when several requests end the
+    same session concurrently exactly one of them gets the session back and
+    counts it; the others get None.
+    """
+    now = datetime.utcnow()
+    end_time = func.coalesce(LearningSession.end_time, now)
+    stmt = (
+        update(LearningSession)
+        .where(LearningSession.id == session_id, LearningSession.status != "completed")
+        .values(
+            status="completed",
+            end_time=end_time,
+            time_spent=cast(func.floor(func.extract("epoch", end_time - LearningSession.start_time) / 60), Integer),
+            final_score=final_score,
+            points_earned=points,
+            updated_at=now,
+        )
+        .returning(LearningSession)
+        .execution_options(populate_existing=True, synchronize_session=False)
+    )
+    learning_session = (await db.execute(stmt)).scalar_one_or_none()
+    if learning_session is None:
+        return None
+
+    await daily_stats.record_session_completed(db, learning_session)
+    await credit_activity(db, learning_session.child_id, points, learning_session.end_time)
+    return learning_session
@@ -0,0 +1,271 @@
+"""Incrementally maintained ``child_daily_stats`` rollup.
+
+Write paths call the ``record_*`` helpers inside their own transaction, right
+before committing, so the rollup is updated atomically with the raw row. The
+``backfill`` command rebuilds the rollup from raw ``sessions`` and
+``assessment_results`` rows:
+
+    python -m app.services.daily_stats backfill --days 90
+
+Days are local to the guardian's timezone. A zone that is not known (set
+before timezones were validated) counts as UTC, as in ``local_today``,
+instead of making Postgres fail the write.
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import UTC, date, datetime, timedelta
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import ColumnElement, Date, Select, case, cast, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import func, select
+
+from app.core.database import AsyncSessionLocal
+from app.models.analytics import ChildDailyStats
+from app.models.assessment import AssessmentResult
+from app.models.child import Child
+from app.models.guardian import Guardian, is_known_timezone
+from app.models.session import Session as LearningSession
+
+logger = logging.getLogger(__name__)
+
+# Numeric weights used when averaging session engagement levels
+ENGAGEMENT_SCORES = {"low": 1, "medium": 2, "high": 3}
+
+
+def zone_name(timezone: str | None) -> str:
+    """``timezone``, or UTC when it is not a known zone."""
+    return timezone if is_known_timezone(timezone) else "UTC"
+
+
+def local_day(timestamp, timezone):
+    """Convert a naive UTC timestamp (column or value) to the local date in ``timezone``.
+
+    Postgres rejects unknown zones: pass a zone checked with ``zone_name`` or,
+    for ``Guardian.timezone``, ``known_zone``.
+    """
+    return cast(func.timezone(timezone, func.timezone("UTC", timestamp)), Date)
+
+
+def local_today(timezone: str) -> date:
+    """Today's date in ``timezone``, falling back to UTC for unknown zones."""
+    return datetime.now(ZoneInfo(zone_name(timezone))).date()
+
+
+def local_date(timestamp: datetime, timezone: str) -> date:
+    """Local date in ``timezone`` (UTC for unknown zones) of a naive UTC ``timestamp``."""
+    return timestamp.replace(tzinfo=UTC).astimezone(ZoneInfo(zone_name(timezone))).date()
+
+
+async def guardian_zone(db: AsyncSession, child_id: UUID) -> str | None:
+    """Timezone of the child's guardian (UTC when unknown), or None when the child does not exist."""
+    query = select(Guardian.timezone).join(Child, Child.guardian_id == Guardian.id).where(Child.id == child_id)
+    row = (await db.execute(query)).one_or_none()
+    return None if row is None else zone_name(row.timezone)
+
+
+async def known_zone(db: AsyncSession, guardians: Select) -> ColumnElement[str]:
+    """``Guardian.timezone``, or UTC for guardians selected by ``guardians`` whose zone is not known."""
+    zones = (await db.execute(guardians.with_only_columns(Guardian.timezone).distinct())).scalars()
+    known = [zone for zone in zones if is_known_timezone(zone)]
+    return case((Guardian.timezone.in_(known), Guardian.timezone), else_="UTC")
+
+
+async def _increment(
+    db: AsyncSession, child_id: UUID, subject: str, timestamp: datetime, counters: dict[str, int]
+) -> None:
+    """Add ``counters`` to the child's bucket for the local day of ``timestamp``."""
+    zone = await guardian_zone(db, child_id)
+    if zone is None:
+        return
+
+    stmt = insert(ChildDailyStats).values(
+        child_id=child_id, day=local_date(timestamp, zone), subject=subject, **counters
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["child_id", "day", "subject"],
+        set_={
+            **{name: getattr(ChildDailyStats, name) + stmt.excluded[name] for name in counters},
+            "updated_at": datetime.utcnow(),
+        },
+    )
+    await db.execute(stmt)
+
+
+async def record_session_started(db: AsyncSession, learning_session: LearningSession) -> None:
+    """Count a newly started session."""
+    await _increment(
+        db, learning_session.child_id, learning_session.subject, learning_session.created_at, {"sessions_started": 1}
+    )
+
+
+async def record_session_completed(db: AsyncSession, learning_session: LearningSession) -> None:
+    """Add a completed session's minutes, points, score and engagement."""
+    counters = {
+        "sessions_completed": 1,
+        "minutes": learning_session.time_spent,
+        "points": learning_session.points_earned,
+        "session_score_total": learning_session.final_score or 0,
+    }
+    if learning_session.engagement_level:
+        counters["engagement_total"] = ENGAGEMENT_SCORES.get(learning_session.engagement_level, 0)
+        counters["engagement_count"] = 1
+
+    await _increment(db, learning_session.child_id, learning_session.subject, learning_session.created_at, counters)
+
+
+async def record_assessment(db: AsyncSession, assessment: AssessmentResult) -> None:
+    """Add an assessment result's score."""
+    await _increment(
+        db,
+        assessment.child_id,
+        assessment.subject,
+        assessment.created_at,
+        {"assessments_count": 1, "assessment_score_total": assessment.overall_score},
+    )
+
+
+async def record_assessments(db: AsyncSession, assessment_ids: list[UUID]) -> None:
+    """Add the scores of many new assessment results with one grouped upsert."""
+    if not assessment_ids:
+        return
+
+    assessments = (
+        select(AssessmentResult.id)
+        .join(Child, Child.id == AssessmentResult.child_id)
+        .join(Guardian, Guardian.id == Child.guardian_id)
+        .where(AssessmentResult.id.in_(assessment_ids))
+    )
+    day = local_day(AssessmentResult.created_at, await known_zone(db, assessments)).label("day")
+    rows = (
+        select(
+            AssessmentResult.child_id,
+            day,
+            AssessmentResult.subject,
+            func.count(AssessmentResult.id),
+            func.coalesce(func.sum(AssessmentResult.overall_score), 0),
+        )
+        .join(Child, Child.id == AssessmentResult.child_id)
+        .join(Guardian, Guardian.id == Child.guardian_id)
+        .where(AssessmentResult.id.in_(assessment_ids))
+        .group_by(AssessmentResult.child_id, day, AssessmentResult.subject)
+    )
+
+    counters = ["assessments_count", "assessment_score_total"]
+    stmt = insert(ChildDailyStats).from_select(["child_id", "day", "subject", *counters], rows)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["child_id", "day", "subject"],
+            set_={
+                **{name: getattr(ChildDailyStats, name) + stmt.excluded[name] for name in counters},
+                "updated_at": datetime.utcnow(),
+            },
+        )
+    )
+
+
+async def backfill(db: AsyncSession, since: date | None = None) -> None:
+    """Rebuild rollup rows from raw sessions and assessments.
+
+    Rows on or after ``since`` (every row when ``None``) are replaced in a
+    single transaction, so readers never observe a partially rebuilt range.
+    """
+    completed = LearningSession.status == "completed"
+    engagement_score = case(ENGAGEMENT_SCORES, value=LearningSession.engagement_level, else_=0)
+
+    zone = await known_zone(db, select(Guardian.id))
+    session_day = local_day(LearningSession.created_at, zone).label("day")
+    session_rows = (
+        select(
+            LearningSession.child_id,
+            session_day,
+            LearningSession.subject,
+            func.count(LearningSession.id),
+            func.count(LearningSession.id).filter(completed),
+            func.coalesce(func.sum(LearningSession.time_spent).filter(completed), 0),
+            func.coalesce(func.sum(LearningSession.points_earned).filter(completed), 0),
+            func.coalesce(func.sum(LearningSession.final_score).filter(completed), 0),
+            func.coalesce(func.sum(engagement_score).filter(completed), 0),
+            func.count(LearningSession.engagement_level).filter(completed),
+        )
+        .join(Child, Child.id == LearningSession.child_id)
+        .join(Guardian, Guardian.id == Child.guardian_id)
+        .group_by(LearningSession.child_id, session_day, LearningSession.subject)
+    )
+
+    assessment_day = local_day(AssessmentResult.created_at, zone).label("day")
+    assessment_rows = (
+        select(
+            AssessmentResult.child_id,
+            assessment_day,
+            AssessmentResult.subject,
+            func.count(AssessmentResult.id),
+            func.coalesce(func.sum(AssessmentResult.overall_score), 0),
+        )
+        .join(Child, Child.id == AssessmentResult.child_id)
+        .join(Guardian, Guardian.id == Child.guardian_id)
+        .group_by(AssessmentResult.child_id, assessment_day, AssessmentResult.subject)
+    )
+
+    clear = delete(ChildDailyStats)
+    if since is not None:
+        # Filter on the raw timestamp a day early so every local day >= since is covered
+        since_utc = datetime.combine(since - timedelta(days=1), datetime.min.time())
+        session_rows = session_rows.where(LearningSession.created_at >= since_utc).having(session_day >= since)
+        assessment_rows = assessment_rows.where(AssessmentResult.created_at >= since_utc).having(
+            assessment_day >= since
+        )
+        clear = clear.where(ChildDailyStats.day >= since)
+
+    session_columns = [
+        "child_id",
+        "day",
+        "subject",
+        "sessions_started",
+        "sessions_completed",
+        "minutes",
+        "points",
+        "session_score_total",
+        "engagement_total",
+        "engagement_count",
+    ]
+    assessment_columns = ["child_id", "day", "subject", "assessments_count", "assessment_score_total"]
+
+    await db.execute(clear)
+    await db.execute(insert(ChildDailyStats).from_select(session_columns, session_rows))
+
+    stmt = insert(ChildDailyStats).from_select(assessment_columns, assessment_rows)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["child_id", "day", "subject"],
+            set_={name: stmt.excluded[name] for name in assessment_columns[3:]},
+        )
+    )
+    await db.commit()
+
+
+async def _run_backfill(days: int | None) -> None:
+    since = date.today() - timedelta(days=days) if days is not None else None
+    async with AsyncSessionLocal() as db:
+        await backfill(db, since)
+    logger.info("child_daily_stats backfill complete (since=%s)", since or "beginning")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the child_daily_stats rollup")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    backfill_parser = subparsers.add_parser("backfill", help="Rebuild rollup rows from raw data")
+    backfill_parser.add_argument("--days", type=int, default=None, help="Only rebuild the last N days")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "backfill":
+        asyncio.run(_run_backfill(args.days))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Cached guardian, child and lesson lookups used by the API routes.
+
+Entries are tagged ``guardian:<id>``, ``child:<id>`` and ``lesson:<id>``.
+Write paths call the matching ``invalidate_*`` helper after committing.
+"""
+
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+
+from app.core.cache import cached, invalidate
+from app.models.child import Child
+from app.models.guardian import Guardian
+from app.models.lesson import Lesson
+
+
+@dataclass(frozen=True)
+class GuardianPrincipal:
+    """The authenticated guardian, as needed by request handlers (no credentials)."""
+
+    id: UUID
+    email: str
+    first_name: str
+    last_name: str
+    preferred_language: str
+    timezone: str
+    is_email_verified: bool
+    is_active: bool
+
+
+def guardian_tag(guardian_id: UUID | str) -> str:
+    return f"guardian:{guardian_id}"
+
+
+def child_tag(child_id: UUID | str) -> str:
+    return f"child:{child_id}"
+
+
+def lesson_tag(lesson_id: UUID | str) -> str:
+    return f"lesson:{lesson_id}"
+
+
+def _parse_uuid(value: Any) -> UUID | None:
+    try:
+        return value if isinstance(value, UUID) else UUID(str(value))
+    except ValueError:
+        return None
+
+
+@cached("guardian", tags=lambda guardian_id: [guardian_tag(guardian_id)])
+async def _guardian_fields(db: AsyncSession, guardian_id: UUID) -> dict[str, Any] | None:
+    guardian = await db.get(Guardian, guardian_id)
+    if guardian is None:
+        return None
+    return {
+        "email": guardian.email,
+        "first_name": guardian.first_name,
+        "last_name": guardian.last_name,
+        "preferred_language": guardian.preferred_language,
+        "timezone": guardian.timezone,
+        "is_email_verified": guardian.is_email_verified,
+        "is_active": guardian.is_active,
+    }
+
+
+async def get_guardian_principal(db: AsyncSession, guardian_id: Any) -> GuardianPrincipal | None:
+    """Guardian with id ``guardian_id`` (as found in a token), or None."""
+    guardian_id = _parse_uuid(guardian_id)
+    if guardian_id is None:
+        return None
+    fields = await _guardian_fields(db, guardian_id)
+    return GuardianPrincipal(id=guardian_id, **fields) if fields else None
+
+
+@cached("children", tags=lambda guardian_id: [guardian_tag(guardian_id)])
+async def get_children(db: AsyncSession, guardian_id: UUID) -> list[dict[str, Any]]:
+    """Summaries of the guardian's children, as returned by ``GET /children``."""
+    children = (await db.execute(select(Child).where(Child.guardian_id == guardian_id))).scalars().all()
+    return jsonable_encoder(
+        [
+            {
+                "id": child.id,
+                "firstName": child.first_name,
+                "ageGroup": child.age_group,
+                "preferredLanguage": child.preferred_language,
+                "avatar": child.avatar,
+                "totalPoints": child.total_points,
+                "currentStreak": child.current_streak,
+                "enabledSubjects": child.enabled_subjects_list,
+                "dailyTimeLimit": child.daily_time_limit,
+                "voiceEnabled": child.voice_enabled,
+                "chatEnabled": child.chat_enabled,
+            }
+            for child in children
+        ]
+    )
+
+
+@cached("child", tags=lambda child_id: [child_tag(child_id)])
+async def get_child(db: AsyncSession, child_id: UUID) -> dict[str, Any] | None:
+    """``{"guardianId": ..., "child": <GET /children/{id} body>}``, or None."""
+    child = await db.get(Child, child_id)
+    if child is None:
+        return None
+    return jsonable_encoder(
+        {
+            "guardianId": child.guardian_id,
+            "child": {
+                "id": child.id,
+                "firstName": child.first_name,
+                "ageGroup": child.age_group,
+                "preferredLanguage": child.preferred_language,
+                "avatar": child.avatar,
+                "totalPoints": child.total_points,
+                "currentStreak": child.current_streak,
+                "enabledSubjects": child.enabled_subjects_list,
+                "dailyTimeLimit": child.daily_time_limit,
+                "voiceEnabled": child.voice_enabled,
+                "chatEnabled": child.chat_enabled,
+                "voiceRecordingAllowed": child.voice_recording_allowed,
+                "dataRetentionDays": child.data_retention_days,
+                "lastActivity": child.last_activity,
+            },
+        }
+    )
+
+
+@cached("lesson", tags=lambda lesson_id: [lesson_tag(lesson_id)])
+async def _lesson_details(db: AsyncSession, lesson_id: UUID) -> dict[str, Any] | None:
+    lesson = (
+        await db.execute(select(Lesson).options(selectinload(Lesson.activities)).where(Lesson.id == lesson_id))
+    ).scalar_one_or_none()
+    if lesson is None:
+        return None
+    return jsonable_encoder(
+        {
+            "id": lesson.id,
+            "title": lesson.title,
+            "description": lesson.description,
+            "subject": lesson.subject,
+            "ageGroup": lesson.age_group,
+            "difficulty": lesson.difficulty,
+            "estimatedDuration": lesson.estimated_duration,
+            "objectives": lesson.objectives_list,
+            "keywords": lesson.keywords_list,
+            "activities": [
+                {
+                    "id": activity.activity_id,
+                    "type": activity.type,
+                    "title": activity.title,
+                    "description": activity.description,
+                    "expectedDuration": activity.expected_duration,
+                    "points": activity.points,
+                    "required": activity.required_for_completion,
+                }
+                for activity in lesson.activities
+            ],
+        }
+    )
+
+
+async def get_lesson_details(db: AsyncSession, lesson_id: Any) -> dict[str, Any] | None:
+    """Body of ``GET /lessons/{id}``, or None when there is no such lesson."""
+    lesson_id = _parse_uuid(lesson_id)
+    return await _lesson_details(db, lesson_id) if lesson_id else None
+
+
+async def invalidate_child(child_id: UUID, guardian_id: UUID) -> None:
+    """Evict a child and its guardian's child list, after a write to the child commits."""
+    await invalidate(child_tag(child_id), guardian_tag(guardian_id))
+
+
+async def invalidate_lesson(lesson_id: UUID) -> None:
+    await invalidate(lesson_tag(lesson_id))
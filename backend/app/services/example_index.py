@@ -0,0 +1,126 @@
+"""Selection of the few-shot examples sent with each chat turn.
+
+Agents list example exchanges under ``examples:`` in their YAML. Sending
+all of them with every turn costs tokens and latency that grow with the
+list, so a turn gets at most ``FEW_SHOT_MAX_EXAMPLES`` of them, within
+``FEW_SHOT_TOKEN_BUDGET`` tokens: the ones whose input is most similar to
+the child's message.
+
+Similarity is the cosine between character n-gram TF-IDF vectors of the
+normalized texts (NumPy), which copes with Arabic affixes and children's
+spelling without a tokenizer or a model. An agent's index is built once,
+when the agent registry loads it. Examples can be limited to
+``ageGroups``: they are never sent to other age groups, and are preferred
+for their own.
+
+Agents whose examples always fit are sent all of them, in YAML order,
+without an index (or NumPy) at all.
+"""
+
+import functools
+from collections import Counter
+from typing import Any
+
+from app.core.config import settings
+from app.core.lazy_imports import numpy as np
+from app.schemas.agent import AgentConfig, AgentExample
+from app.services.prompt_text import message_tokens, normalize_prompt
+
+NGRAM_SIZES = (2, 3, 4)
+
+# Added to the similarity of examples written for the child's age group
+AGE_GROUP_BONUS = 0.1
+
+
+def ngrams(text: str) -> list[str]:
+    """Character n-grams of normalized ``text``, padded so word starts and ends count."""
+    padded = f" {normalize_prompt(text)} "
+    return [padded[start : start + size] for size in NGRAM_SIZES for start in range(len(padded) - size + 1)]
+
+
+def example_tokens(example: AgentExample) -> int:
+    return message_tokens(example.input) + message_tokens(example.output)
+
+
+def _allowed(example: AgentExample, age_group: str | None) -> bool:
+    return not example.ageGroups or age_group is None or age_group in example.ageGroups
+
+
+def _unit_rows(matrix: Any) -> Any:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class ExampleIndex:
+    """TF-IDF vectors of an agent's example inputs."""
+
+    def __init__(self, examples: tuple[AgentExample, ...]):
+        self.examples = examples
+        self.tokens = [example_tokens(example) for example in examples]
+        self.vocabulary: dict[str, int] = {}
+        counts = []
+        for example in examples:
+            grams = Counter(ngrams(example.input))
+            counts.append({self.vocabulary.setdefault(gram, len(self.vocabulary)): n for gram, n in grams.items()})
+
+        frequencies = np.zeros((len(examples), len(self.vocabulary)), dtype=np.float32)
+        for row, columns in enumerate(counts):
+            frequencies[row, list(columns)] = list(columns.values())
+        document_frequency = (frequencies > 0).sum(axis=0)
+        # Smoothed IDF and sublinear TF, as in the usual TF-IDF variants
+        self.idf = (np.log((1 + len(examples)) / (1 + document_frequency)) + 1).astype(np.float32)
+        self.matrix = _unit_rows(np.log1p(frequencies) * self.idf)
+
+    def vector(self, text: str) -> Any:
+        frequencies = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for gram, n in Counter(ngrams(text)).items():
+            column = self.vocabulary.get(gram)
+            if column is not None:
+                frequencies[column] = n
+        return _unit_rows(np.log1p(frequencies) * self.idf)
+
+    def similarities(self, text: str) -> Any:
+        """Cosine similarity of ``text`` to each example input."""
+        return self.matrix @ self.vector(text)
+
+    def select(self, text: str, age_group: str | None, limit: int, budget: int) -> tuple[AgentExample, ...]:
+        """Up to ``limit`` examples most similar to ``text`` within ``budget`` tokens, in YAML order."""
+        scores = self.similarities(text)
+        for row, example in enumerate(self.examples):
+            if not _allowed(example, age_group):
+                scores[row] = -np.inf
+            elif example.ageGroups and age_group is not None:
+                scores[row] += AGE_GROUP_BONUS
+
+        chosen = []
+        used = 0
+        for row in np.argsort(-scores, kind="stable"):
+            if len(chosen) == limit or scores[row] == -np.inf:
+                break
+            if used + self.tokens[row] <= budget:
+                chosen.append(row)
+                used += self.tokens[row]
+        return tuple(self.examples[row] for row in sorted(chosen))
+
+
+def _always_fit(agent: AgentConfig) -> bool:
+    return (
+        len(agent.examples) <= settings.FEW_SHOT_MAX_EXAMPLES
+        and sum(example_tokens(example) for example in agent.examples) <= settings.FEW_SHOT_TOKEN_BUDGET
+    )
+
+
+@functools.lru_cache(maxsize=128)
+def index_for(agent: AgentConfig) -> ExampleIndex | None:
+    """The agent's example index, or None when all of its examples are always sent."""
+    if _always_fit(agent):
+        return None
+    return ExampleIndex(agent.examples)
+
+
+def select(agent: AgentConfig, user_message: str, age_group: str | None = None) -> tuple[AgentExample, ...]:
+    """The agent's examples to send with ``user_message``."""
+    index = index_for(agent) if settings.FEW_SHOT_SELECTION_ENABLED else None
+    if index is None:
+        return tuple(example for example in agent.examples if _allowed(example, age_group))
+    return index.select(user_message, age_group, settings.FEW_SHOT_MAX_EXAMPLES, settings.FEW_SHOT_TOKEN_BUDGET)
@@ -0,0 +1,175 @@
+"""Latency tracking, health scores and circuit breakers of LLM providers.
+
+Providers report every call here: its latency (to the first token for
+streams) per model, and whether it succeeded. From that:
+
+* ``hedge_delay_ms`` is the tracked ``LLM_HEDGE_PERCENTILE`` latency of a
+  model, after which a second, hedged request is worth sending;
+* each provider has a hedge budget: every call to it earns
+  ``LLM_HEDGE_MAX_RATIO`` of a hedge, up to ``LLM_HEDGE_BURST`` saved, so
+  when it slows down across the board hedges stay a small share of calls;
+* each provider gets a health score (recent success rate, lowered when
+  its calls take longer than ``LLM_HEALTH_SLOW_MS``);
+* a provider's circuit opens after ``LLM_CIRCUIT_FAILURE_THRESHOLD``
+  consecutive failures, or when more than ``LLM_CIRCUIT_ERROR_RATE`` of
+  its last ``LLM_HEALTH_WINDOW`` calls failed. While open it is skipped,
+  except for one probe call every ``LLM_CIRCUIT_OPEN_SECONDS`` (half
+  open), whose outcome closes or reopens it.
+
+Client errors (bad requests) and cancelled calls say nothing about a
+provider's health and are not reported. State is per worker.
+"""
+
+import time
+from collections import deque
+from typing import Any
+
+from app.core.config import settings
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Weight of the latest call in the moving average of call latencies
+LATENCY_SMOOTHING = 0.1
+
+_latencies: dict[tuple[str, str, str], deque[float]] = {}
+
+hedge_counters = dict.fromkeys(("hedged", "hedge_won", "failed_over", "losers_cancelled"), 0)
+
+
+def _percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def record_latency(provider: str, model: str, kind: str, latency_ms: float) -> None:
+    """Latency of a successful ``kind`` ("complete" or "first_token") call."""
+    key = (provider, model, kind)
+    if key not in _latencies:
+        _latencies[key] = deque(maxlen=settings.LLM_LATENCY_SAMPLES)
+    _latencies[key].append(latency_ms)
+
+
+def hedge_delay_ms(provider: str, model: str, kind: str) -> float:
+    """How long to wait for ``model`` before hedging: its tracked tail latency, or a default until known."""
+    samples = _latencies.get((provider, model, kind))
+    if not samples or len(samples) < settings.LLM_HEDGE_MIN_SAMPLES:
+        return settings.LLM_HEDGE_DEFAULT_DELAY_MS
+    return max(settings.LLM_HEDGE_MIN_DELAY_MS, _percentile(list(samples), settings.LLM_HEDGE_PERCENTILE))
+
+
+class ProviderHealth:
+    """Recent outcomes and circuit breaker of one provider."""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.state = CLOSED
+        self.opened_at = 0.0  # Or when the last probe was let through
+        self.consecutive_failures = 0
+        self.outcomes: deque[bool] = deque(maxlen=settings.LLM_HEALTH_WINDOW)
+        self.latency_ms: float | None = None
+        self.hedge_budget = float(settings.LLM_HEDGE_BURST)
+        self.counters = dict.fromkeys(
+            ("successes", "failures", "opened", "rejected", "calls", "hedges", "hedges_denied"), 0
+        )
+
+    @property
+    def success_rate(self) -> float:
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 1.0
+
+    @property
+    def score(self) -> float:
+        """Health between 0 (circuit open) and 1 (recent calls all succeeded in good time)."""
+        if self.state != CLOSED:
+            return 0.0
+        slowness = (self.latency_ms or 0) / settings.LLM_HEALTH_SLOW_MS
+        return round(self.success_rate / max(1.0, slowness), 3)
+
+    def available(self) -> bool:
+        """Whether a call may be sent; while the circuit is open, only a probe now and then."""
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        # A probe that never reports back (cancelled, bad request) does not block the next one
+        if now - self.opened_at >= settings.LLM_CIRCUIT_OPEN_SECONDS:
+            self.state, self.opened_at = HALF_OPEN, now
+            return True
+        self.counters["rejected"] += 1
+        return False
+
+    def record_call(self) -> None:
+        """A call was sent to this provider (hedges excluded), adding to its hedge budget."""
+        self.counters["calls"] += 1
+        self.hedge_budget = min(float(settings.LLM_HEDGE_BURST), self.hedge_budget + settings.LLM_HEDGE_MAX_RATIO)
+
+    def take_hedge(self) -> bool:
+        """Whether a slow call to this provider may be hedged, spending one hedge of its budget."""
+        if self.hedge_budget < 1:
+            self.counters["hedges_denied"] += 1
+            return False
+        self.hedge_budget -= 1
+        self.counters["hedges"] += 1
+        return True
+
+    def success(self, latency_ms: float) -> None:
+        self.counters["successes"] += 1
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        if self.latency_ms is None:
+            self.latency_ms = latency_ms
+        else:
+            self.latency_ms += LATENCY_SMOOTHING * (latency_ms - self.latency_ms)
+        if self.state == HALF_OPEN:
+            self.state = CLOSED
+            self.outcomes.clear()
+
+    def failure(self) -> None:
+        self.counters["failures"] += 1
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        error_rate = 1 - self.success_rate
+        if (
+            self.state == HALF_OPEN
+            or self.consecutive_failures >= settings.LLM_CIRCUIT_FAILURE_THRESHOLD
+            or (len(self.outcomes) == self.outcomes.maxlen and error_rate > settings.LLM_CIRCUIT_ERROR_RATE)
+        ):
+            if self.state != OPEN:
+                self.counters["opened"] += 1
+            self.state, self.opened_at = OPEN, time.monotonic()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "score": self.score,
+            "success_rate": round(self.success_rate, 3),
+            "consecutive_failures": self.consecutive_failures,
+            "latency_ms": round(self.latency_ms or 0, 1),
+            "hedge_budget": round(self.hedge_budget, 2),
+            **self.counters,
+        }
+
+
+_health: dict[str, ProviderHealth] = {}
+
+
+def health(provider: str) -> ProviderHealth:
+    if provider not in _health:
+        _health[provider] = ProviderHealth(provider)
+    return _health[provider]
+
+
+def health_stats() -> dict[str, Any]:
+    """Health, circuit state and tail latencies of every provider in this worker, and hedging counts."""
+    latencies = {
+        f"{provider}:{model}:{kind}": {
+            "samples": len(samples),
+            "p50_ms": round(_percentile(list(samples), 0.5), 1),
+            "hedge_after_ms": round(hedge_delay_ms(provider, model, kind), 1),
+        }
+        for (provider, model, kind), samples in _latencies.items()
+        if samples
+    }
+    return {
+        "providers": {name: provider.stats() for name, provider in _health.items()},
+        "latencies": latencies,
+        "hedging": dict(hedge_counters),
+    }
@@ -0,0 +1,751 @@
+"""LLM provider clients and tier-to-model routing.
+
+Each provider keeps one long-lived ``httpx.AsyncClient`` per worker, so
+connections (HTTP/2 where available) are pooled and kept alive across
+chat turns instead of paying a TLS handshake per message. Calls have
+per-provider timeouts and are retried on connection errors, 429 and 5xx
+responses with exponential backoff and full jitter (honouring
+``Retry-After``).
+
+Agents pick a ``modelTier`` in their YAML; ``LLM_TIER_MODELS`` maps each
+tier to a ``provider:model`` pair. With ``LLM_USE_STUB`` every tier is
+routed to the local stub server (``app.services.llm_stub_server``) with
+the same model names, for offline load tests of the whole chat path.
+
+Requests put the static start of the system prompt (``system_prefix``)
+first, ahead of anything that changes between turns, so the provider's
+prompt cache can reuse it: Anthropic gets an explicit cache breakpoint
+after it, OpenAI-compatible APIs and Gemini cache matching prefixes on
+their own. Cache hits are reported as ``Completion.cached_input_tokens``
+and counted per provider (``usage_stats``).
+
+Every call first takes a slot from ``llm_scheduler``, which bounds
+concurrency per provider and model and orders waiting calls by the
+request's ``priority`` and ``fair_key``.
+
+Agent calls (``complete_for_agent``, ``stream_for_agent``) can also go to
+the tier's alternate in ``LLM_HEDGE_TIER_MODELS``: when the first call has
+not answered (or streamed its first token) by that model's tracked tail
+latency, counted from when it got its scheduler slot, the alternate is
+called too and the first answer wins, the other call being cancelled; when
+the first call fails, the alternate takes over (not when the request was
+rejected with a 4xx: the alternate would reject it too, and the provider is
+not at fault). Calls still queued for a slot are not hedged, and each
+provider's hedges are capped by its hedge budget (``LLM_HEDGE_MAX_RATIO``
+of its calls), so a saturated provider does not double its own load. Providers whose circuit is open
+(``llm_health``) are skipped.
+"""
+
+import asyncio
+import importlib.util
+import json
+import logging
+import random
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+import httpx
+
+from app.core.config import settings
+from app.schemas.agent import AgentConfig
+from app.services import llm_health, llm_scheduler
+from app.services.llm_scheduler import Priority
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# HTTP/2 needs the optional h2 package (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+T = TypeVar("T")
+
+
+class LLMError(Exception):
+    """A completion could not be produced."""
+
+
+class LLMUnavailableError(LLMError):
+    """The provider is not configured (no API key)."""
+
+
+class LLMOverloadedError(LLMUnavailableError):
+    """The call was dropped by the scheduler before it could start in time."""
+
+
+class LLMRequestError(LLMError):
+    """The provider rejected the request (a 4xx not in ``RETRY_STATUSES``); other providers would too."""
+
+
+@dataclass
+class ChatRequest:
+    model: str
+    messages: list[dict[str, str]]  # [{"role": "user" | "assistant", "content": ...}]
+    system: str = ""
+    # Static start of the system prompt, sent before ``system`` and cached by the provider
+    system_prefix: str = ""
+    temperature: float = 0.7
+    max_tokens: int = 500
+    priority: Priority = Priority.INTERACTIVE
+    # Calls of one priority are shared fairly between keys (children)
+    fair_key: str | None = None
+    # Set once the call holds its scheduler slot (hedging waits for it)
+    slotted: asyncio.Event | None = field(default=None, repr=False, compare=False)
+
+
+@dataclass
+class Completion:
+    text: str
+    provider: str
+    model: str
+    input_tokens: int = 0
+    # Part of ``input_tokens`` read from the provider's prompt cache
+    cached_input_tokens: int = 0
+    output_tokens: int = 0
+    latency_ms: float = 0
+    first_token_ms: float | None = None
+    queue_ms: float = 0  # Wait for a scheduler slot, not included in latency_ms
+    attempts: int = 1
+    # A second, hedged call was sent because the first was slow
+    hedged: bool = False
+    raw: dict[str, Any] = field(default_factory=dict, repr=False)
+
+
+@dataclass
+class StreamState:
+    """Accumulates a streamed completion."""
+
+    parts: list[str] = field(default_factory=list)
+    model: str | None = None
+    input_tokens: int = 0
+    cached_input_tokens: int = 0
+    output_tokens: int = 0
+
+
+async def _sse_data(response: httpx.Response) -> AsyncIterator[dict[str, Any]]:
+    """JSON payloads of the ``data:`` lines of a server-sent event stream."""
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data and data != "[DONE]":
+            yield json.loads(data)
+
+
+def system_text(request: ChatRequest) -> str:
+    """The whole system prompt of ``request``, static prefix first."""
+    return "\n\n".join(part for part in (request.system_prefix, request.system) if part)
+
+
+class Provider:
+    """Pooled HTTP client for one LLM API."""
+
+    name = "provider"
+
+    def __init__(self, base_url: str, api_key: str | None, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self._client: httpx.AsyncClient | None = None
+        self.counters = dict.fromkeys(("completions", "input_tokens", "cached_input_tokens", "output_tokens"), 0)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=settings.LLM_HTTP2 and HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(self.timeout, connect=settings.LLM_CONNECT_TIMEOUT_SECONDS),
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY_SECONDS,
+                ),
+                headers=self.headers(),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def headers(self) -> dict[str, str]:
+        return {}
+
+    @asynccontextmanager
+    async def _slot(self, request: ChatRequest) -> AsyncIterator[float]:
+        """Scheduler slot for ``request``; yields the time waited for it in milliseconds."""
+        try:
+            async with llm_scheduler.slot(self.name, request.model, request.priority, request.fair_key) as queue_ms:
+                if request.slotted is not None:
+                    request.slotted.set()
+                yield queue_ms
+        except llm_scheduler.QueueTimeout as e:
+            raise LLMOverloadedError(str(e)) from e
+
+    def _rejected(self, response: httpx.Response) -> LLMError:
+        """Error for a status not worth retrying; only server errors count against the provider's health."""
+        message = f"{self.name} returned {response.status_code}: {response.text[:200]}"
+        if response.status_code < 500:
+            return LLMRequestError(message)
+        llm_health.health(self.name).failure()
+        return LLMError(message)
+
+    def _record(self, request: ChatRequest, completion: Completion) -> Completion:
+        """Count a successful call's usage and report its latency."""
+        if completion.first_token_ms is not None:
+            llm_health.record_latency(self.name, request.model, "first_token", completion.first_token_ms)
+            llm_health.health(self.name).success(completion.first_token_ms)
+        else:
+            llm_health.record_latency(self.name, request.model, "complete", completion.latency_ms)
+            llm_health.health(self.name).success(completion.latency_ms)
+        self.counters["completions"] += 1
+        self.counters["input_tokens"] += completion.input_tokens
+        self.counters["cached_input_tokens"] += completion.cached_input_tokens
+        self.counters["output_tokens"] += completion.output_tokens
+        return completion
+
+    def stats(self) -> dict[str, Any]:
+        input_tokens = self.counters["input_tokens"]
+        return {
+            **self.counters,
+            "cache_hit_ratio": round(self.counters["cached_input_tokens"] / input_tokens, 3) if input_tokens else 0.0,
+        }
+
+    def build(self, request: ChatRequest) -> tuple[str, dict[str, Any]]:
+        """Path and JSON body for ``request``."""
+        raise NotImplementedError
+
+    def parse(self, request: ChatRequest, data: dict[str, Any]) -> Completion:
+        raise NotImplementedError
+
+    def build_stream(self, request: ChatRequest) -> tuple[str, dict[str, Any]]:
+        """Path and JSON body for a streamed ``request``."""
+        raise NotImplementedError
+
+    def parse_stream(self, state: StreamState, data: dict[str, Any]) -> str | None:
+        """Record one stream event in ``state``, returning its text delta if any."""
+        raise NotImplementedError
+
+    async def complete(self, request: ChatRequest) -> Completion:
+        """Run ``request``, retrying transient failures."""
+        if not self.configured:
+            raise LLMUnavailableError(f"{self.name} is not configured")
+
+        path, body = self.build(request)
+        async with self._slot(request) as queue_ms:
+            started = time.perf_counter()
+            attempt = 0
+            while True:
+                attempt += 1
+                retry_after = None
+                try:
+                    response = await self.client.post(path, json=body)
+                    if response.status_code < 400:
+                        completion = self.parse(request, response.json())
+                        completion.latency_ms = (time.perf_counter() - started) * 1000
+                        completion.attempts = attempt
+                        completion.queue_ms = queue_ms
+                        return self._record(request, completion)
+                    if response.status_code not in RETRY_STATUSES:
+                        raise self._rejected(response)
+                    error = LLMError(f"{self.name} returned {response.status_code}")
+                    retry_after = response.headers.get("retry-after")
+                except httpx.TransportError as e:
+                    error = LLMError(f"{self.name} request failed: {e!r}")
+
+                if attempt > settings.LLM_MAX_RETRIES:
+                    llm_health.health(self.name).failure()
+                    raise error
+                await asyncio.sleep(_backoff(attempt, retry_after))
+
+    async def stream(self, request: ChatRequest) -> AsyncIterator[str | Completion]:
+        """Yield text deltas as they arrive, then the full ``Completion``.
+
+        Opening the stream is retried like ``complete``; once text has been
+        yielded a failure raises instead. Closing the generator early (or
+        cancelling its consumer) closes the upstream response, which aborts
+        generation on the provider.
+        """
+        if not self.configured:
+            raise LLMUnavailableError(f"{self.name} is not configured")
+
+        path, body = self.build_stream(request)
+        async with self._slot(request) as queue_ms:
+            started = time.perf_counter()
+            attempt = 0
+            while True:
+                attempt += 1
+                retry_after = None
+                state = StreamState()
+                try:
+                    async with self.client.stream("POST", path, json=body) as response:
+                        if response.status_code < 400:
+                            first_token_ms = None
+                            async for data in _sse_data(response):
+                                delta = self.parse_stream(state, data)
+                                if delta:
+                                    if first_token_ms is None:
+                                        first_token_ms = (time.perf_counter() - started) * 1000
+                                    state.parts.append(delta)
+                                    yield delta
+                            yield self._record(
+                                request,
+                                Completion(
+                                    text="".join(state.parts),
+                                    provider=self.name,
+                                    model=state.model or request.model,
+                                    input_tokens=state.input_tokens,
+                                    cached_input_tokens=state.cached_input_tokens,
+                                    output_tokens=state.output_tokens,
+                                    latency_ms=(time.perf_counter() - started) * 1000,
+                                    first_token_ms=first_token_ms,
+                                    queue_ms=queue_ms,
+                                    attempts=attempt,
+                                )
+                            )
+                            return
+
+                        await response.aread()
+                        if response.status_code not in RETRY_STATUSES:
+                            raise self._rejected(response)
+                        error = LLMError(f"{self.name} returned {response.status_code}")
+                        retry_after = response.headers.get("retry-after")
+                except httpx.TransportError as e:
+                    if state.parts:
+                        llm_health.health(self.name).failure()
+                        raise LLMError(f"{self.name} stream broke off: {e!r}") from e
+                    error = LLMError(f"{self.name} request failed: {e!r}")
+
+                if attempt > settings.LLM_MAX_RETRIES:
+                    llm_health.health(self.name).failure()
+                    raise error
+                await asyncio.sleep(_backoff(attempt, retry_after))
+
+
+def _backoff(attempt: int, retry_after: str | None = None) -> float:
+    """Seconds to wait before retry ``attempt``: full jitter, or the server's Retry-After."""
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), settings.LLM_RETRY_MAX_DELAY_MS / 1000)
+        except ValueError:
+            pass
+    cap = min(settings.LLM_RETRY_MAX_DELAY_MS, settings.LLM_RETRY_BASE_DELAY_MS * 2 ** (attempt - 1))
+    return random.uniform(0, cap) / 1000
+
+
+class OpenAICompatibleProvider(Provider):
+    """OpenAI chat completions API, also spoken by DeepSeek and the local stub."""
+
+    def __init__(self, name: str, base_url: str, api_key: str | None, timeout: float):
+        super().__init__(base_url, api_key, timeout)
+        self.name = name
+
+    def headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+    def build(self, request: ChatRequest) -> tuple[str, dict[str, Any]]:
+        system = system_text(request)
+        messages = [{"role": "system", "content": system}] if system else []
+        return "/chat/completions", {
+            "model": request.model,
+            "messages": messages + request.messages,
+            "temperature": request.temperature,
+            "max_tokens": request.max_tokens,
+        }
+
+    def parse(self, request: ChatRequest, data: dict[str, Any]) -> Completion:
+        usage = data.get("usage") or {}
+        return Completion(
+            text=data["choices"][0]["message"]["content"] or "",
+            provider=self.name,
+            model=data.get("model", request.model),
+            input_tokens=usage.get("prompt_tokens", 0),
+            cached_input_tokens=(usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0),
+            output_tokens=usage.get("completion_tokens", 0),
+            raw=data,
+        )
+
+    def build_stream(self, request: ChatRequest) -> tuple[str, dict[str, Any]]:
+        path, body = self.build(request)
+        return path, {**body, "stream": True, "stream_options": {"include_usage": True}}
+
+    def parse_stream(self, state: StreamState, data: dict[str, Any]) -> str | None:
+        state.model = data.get("model", state.model)
+        if data.get("usage"):
+            state.input_tokens = data["usage"].get("prompt_tokens", 0)
+            state.cached_input_tokens = (data["usage"].get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+            state.output_tokens = data["usage"].get("completion_tokens", 0)
+        choices = data.get("choices") or [{}]
+        return (choices[0].get("delta") or {}).get("content")
+
+
+def _anthropic_input_tokens(usage: dict[str, Any]) -> tuple[int, int]:
+    """Total and cache-read prompt tokens (Anthropic's ``input_tokens`` excludes cached ones)."""
+    cached = usage.get("cache_read_input_tokens") or 0
+    return usage.get("input_tokens", 0) + cached + (usage.get("cache_creation_input_tokens") or 0), cached
+
+
+class AnthropicProvider(Provider):
+    name = "anthropic"
+
+    def headers(self) -> dict[str, str]:
+        return {"x-api-key": self.api_key or "", "anthropic-version": "2023-06-01"}
+
+    def build(self, request: ChatRequest) -> tuple[str, dict[str, Any]]:
+        body = {
+            "model": request.model,
+            "messages": request.messages,
+            "temperature": request.temperature,
+            "max_tokens": request.max_tokens,
+        }
+        if request.system_prefix:
+            # Cache breakpoint after the static part
+            body["system"] = [{"type": "text", "text": request.system_prefix, "cache_control": {"type": "ephemeral"}}]
+            if request.system:
+                body["system"].append({"type": "text", "text": request.system})
+        elif request.system:
+            body["system"] = request.system
+        return "/v1/messages", body
+
+    def parse(self, request: ChatRequest, data: dict[str, Any]) -> Completion:
+        usage = data.get("usage") or {}
+        input_tokens, cached_input_tokens = _anthropic_input_tokens(usage)
+        return Completion(
+            text="".join(block.get("text", "") for block in data.get("content", []) if block.get("type") == "text"),
+            provider=self.name,
+            model=data.get("model", request.model),
+            input_tokens=input_tokens,
+            cached_input_tokens=cached_input_tokens,
+            output_tokens=usage.get("output_tokens", 0),
+            raw=data,
+        )
+
+    def build_stream(self, request: ChatRequest) -> tuple[str, dict[str, Any]]:
+        path, body = self.build(request)
+        return path, {**body, "stream": True}
+
+    def parse_stream(self, state: StreamState, data: dict[str, Any]) -> str | None:
+        kind = data.get("type")
+        if kind == "message_start":
+            message = data.get("message") or {}
+            state.model = message.get("model", state.model)
+            state.input_tokens, state.cached_input_tokens = _anthropic_input_tokens(message.get("usage") or {})
+        elif kind == "message_delta":
+            state.output_tokens = (data.get("usage") or {}).get("output_tokens", state.output_tokens)
+        elif kind == "content_block_delta":
+            return (data.get("delta") or {}).get("text")
+        elif kind == "error":
+            raise LLMError(f"{self.name} stream error: {data.get('error')}")
+        return None
+
+
+class GeminiProvider(Provider):
+    name = "gemini"
+
+    def headers(self) -> dict[str, str]:
+        return {"x-goog-api-key": self.api_key or ""}
+
+    def build(self, request: ChatRequest) -> tuple[str, dict[str, Any]]:
+        body: dict[str, Any] = {
+            "contents": [
+                {"role": "model" if message["role"] == "assistant" else "user", "parts": [{"text": message["content"]}]}
+                for message in request.messages
+            ],
+            "generationConfig": {"temperature": request.temperature, "maxOutputTokens": request.max_tokens},
+        }
+        system = system_text(request)
+        if system:
+            body["systemInstruction"] = {"parts": [{"text": system}]}
+        return f"/v1beta/models/{request.model}:generateContent", body
+
+    def parse(self, request: ChatRequest, data: dict[str, Any]) -> Completion:
+        usage = data.get("usageMetadata") or {}
+        candidates = data.get("candidates") or [{}]
+        parts = (candidates[0].get("content") or {}).get("parts", [])
+        return Completion(
+            text="".join(part.get("text", "") for part in parts),
+            provider=self.name,
+            model=request.model,
+            input_tokens=usage.get("promptTokenCount", 0),
+            cached_input_tokens=usage.get("cachedContentTokenCount", 0),
+            output_tokens=usage.get("candidatesTokenCount", 0),
+            raw=data,
+        )
+
+    def build_stream(self, request: ChatRequest) -> tuple[str, dict[str, Any]]:
+        path, body = self.build(request)
+        return path.replace(":generateContent", ":streamGenerateContent?alt=sse"), body
+
+    def parse_stream(self, state: StreamState, data: dict[str, Any]) -> str | None:
+        usage = data.get("usageMetadata") or {}
+        state.input_tokens = usage.get("promptTokenCount", state.input_tokens)
+        state.cached_input_tokens = usage.get("cachedContentTokenCount", state.cached_input_tokens)
+        state.output_tokens = usage.get("candidatesTokenCount", state.output_tokens)
+        candidates = data.get("candidates") or [{}]
+        parts = (candidates[0].get("content") or {}).get("parts", [])
+        return "".join(part.get("text", "") for part in parts) or None
+
+
+_providers: dict[str, Provider] = {}
+
+
+def _create(name: str) -> Provider:
+    timeout = settings.LLM_PROVIDER_TIMEOUTS.get(name, settings.LLM_DEFAULT_TIMEOUT_SECONDS)
+    if name == "openai":
+        return OpenAICompatibleProvider("openai", "https://api.openai.com/v1", settings.OPENAI_API_KEY, timeout)
+    if name == "deepseek":
+        return OpenAICompatibleProvider("deepseek", "https://api.deepseek.com/v1", settings.DEEPSEEK_API_KEY, timeout)
+    if name == "anthropic":
+        return AnthropicProvider("https://api.anthropic.com", settings.ANTHROPIC_API_KEY, timeout)
+    if name == "gemini":
+        return GeminiProvider("https://generativelanguage.googleapis.com", settings.GEMINI_API_KEY, timeout)
+    if name == "stub":
+        return OpenAICompatibleProvider("stub", f"{settings.LLM_STUB_URL.rstrip('/')}/v1", "stub", timeout)
+    raise LLMError(f"Unknown LLM provider {name!r}")
+
+
+def get_provider(name: str) -> Provider:
+    """Shared client for provider ``name``."""
+    if name not in _providers:
+        _providers[name] = _create(name)
+    return _providers[name]
+
+
+async def close_providers() -> None:
+    """Close every pooled client (on shutdown)."""
+    for provider in list(_providers.values()):
+        await provider.close()
+    _providers.clear()
+
+
+def usage_stats() -> dict[str, dict[str, Any]]:
+    """Token usage and prompt-cache hits of every provider client in this worker."""
+    return {name: provider.stats() for name, provider in _providers.items()}
+
+
+def _target(spec: str) -> tuple[Provider, str]:
+    provider_name, _, model = spec.partition(":")
+    if settings.LLM_USE_STUB:
+        provider_name = "stub"
+    return get_provider(provider_name), model
+
+
+def route(agent: AgentConfig) -> tuple[Provider, str]:
+    """Provider and model serving ``agent``'s ``modelTier``."""
+    return route_tier(agent.modelTier)
+
+
+def route_tier(tier: str) -> tuple[Provider, str]:
+    """Provider and model serving ``tier``."""
+    return _target(settings.LLM_TIER_MODELS.get(tier) or settings.LLM_TIER_MODELS["standard"])
+
+
+def route_alternate(agent: AgentConfig) -> tuple[Provider, str] | None:
+    """Provider and model that hedges and backs up ``agent``'s tier, if any."""
+    spec = settings.LLM_HEDGE_TIER_MODELS.get(agent.modelTier)
+    return _target(spec) if spec else None
+
+
+def _targets(agent: AgentConfig) -> list[tuple[Provider, str]]:
+    """Where ``agent``'s calls go: its tier's model, then the alternate (when hedging and configured)."""
+    targets = [route(agent)]
+    alternate = route_alternate(agent) if settings.LLM_HEDGING_ENABLED else None
+    if alternate is not None and alternate[0].configured and alternate != targets[0]:
+        targets.append(alternate)
+    return targets
+
+
+async def _race(
+    targets: list[tuple[Provider, str]],
+    call: Callable[[Provider, str, asyncio.Event], Awaitable[T]],
+    kind: str,
+    discard: Callable[[T], Awaitable[None]] | None = None,
+) -> tuple[T, bool]:
+    """Result of the first of ``targets`` to succeed, and whether a hedged call was sent.
+
+    The first target with a closed circuit is called; ``call`` sets the
+    event once the call holds its scheduler slot. If it has not answered
+    by its tracked tail latency for ``kind`` after that, and its provider's
+    hedge budget allows, the next target is called as well (hedging); if
+    it fails first, the next one takes over, unless the request itself was
+    rejected (``LLMRequestError``), which is raised at once. Calls that lose
+    are cancelled, and their results (if they completed anyway) handed to
+    ``discard``.
+    """
+    remaining = list(targets)
+    running: dict[asyncio.Task, tuple[Provider, str]] = {}
+    hedges: set[asyncio.Task] = set()
+    error: Exception = LLMUnavailableError("No LLM provider available (circuits open)")
+    # Completes when the current call gets its scheduler slot; the hedge timer starts then
+    slotted: asyncio.Future | None = None
+    started = 0.0
+    over_budget = False
+
+    def start_next() -> tuple[asyncio.Task | None, asyncio.Event | None]:
+        while remaining:
+            provider, model = remaining.pop(0)
+            if llm_health.health(provider.name).available():
+                event = asyncio.Event()
+                task = asyncio.create_task(call(provider, model, event))
+                running[task] = (provider, model)
+                return task, event
+        return None, None
+
+    def start_current() -> asyncio.Task | None:
+        nonlocal slotted, over_budget
+        over_budget = False
+        task, event = start_next()
+        if task is not None:
+            llm_health.health(running[task][0].name).record_call()
+            slotted = asyncio.ensure_future(event.wait())
+        return task
+
+    current = start_current()
+    try:
+        while running:
+            timeout = None
+            waiting = set(running)
+            if remaining and not hedges and not over_budget:
+                if not slotted.done():
+                    # Still queued for a slot: hedging would only add load to a saturated provider
+                    waiting.add(slotted)
+                else:
+                    provider, model = running[current]
+                    due = llm_health.hedge_delay_ms(provider.name, model, kind) / 1000
+                    timeout = max(0.0, due - (time.monotonic() - started))
+            done, _ = await asyncio.wait(waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if slotted in done:
+                started = time.monotonic()
+                done.discard(slotted)
+                if not done:
+                    continue
+            if not done:
+                # Slower than usual: call the next target too and keep whichever answers first
+                if not llm_health.health(running[current][0].name).take_hedge():
+                    # The remaining targets are still there to fail over to
+                    over_budget = True
+                    continue
+                hedge, _ = start_next()
+                if hedge is not None:
+                    hedges.add(hedge)
+                    llm_health.hedge_counters["hedged"] += 1
+                continue
+
+            winner = next((task for task in done if task.exception() is None), None)
+            for task in done:
+                if task.exception() is not None:
+                    running.pop(task)
+                    error = task.exception()
+            if winner is not None:
+                running.pop(winner)
+                if winner in hedges:
+                    llm_health.hedge_counters["hedge_won"] += 1
+                return winner.result(), bool(hedges)
+            if isinstance(error, LLMRequestError):
+                raise error
+            if not running:
+                # Failed before a hedge was needed: fail over to the next target
+                slotted.cancel()
+                current = start_current()
+                if current is not None:
+                    llm_health.hedge_counters["failed_over"] += 1
+        raise error
+    finally:
+        if slotted is not None:
+            slotted.cancel()
+        for task in running:
+            if task.cancel():
+                llm_health.hedge_counters["losers_cancelled"] += 1
+        for result in await asyncio.gather(*running, return_exceptions=True):
+            if discard is not None and not isinstance(result, BaseException):
+                await discard(result)
+
+
+def _agent_request(
+    agent: AgentConfig,
+    model: str,
+    messages: list[dict[str, str]],
+    system: str,
+    system_prefix: str,
+    fair_key: str | None,
+    slotted: asyncio.Event | None = None,
+) -> ChatRequest:
+    return ChatRequest(
+        model=model,
+        messages=messages,
+        system=system,
+        system_prefix=system_prefix,
+        temperature=agent.temperature,
+        max_tokens=agent.maxTokens,
+        priority=Priority.INTERACTIVE,
+        fair_key=fair_key,
+        slotted=slotted,
+    )
+
+
+async def complete_for_agent(
+    agent: AgentConfig,
+    messages: list[dict[str, str]],
+    system: str,
+    system_prefix: str = "",
+    fair_key: str | None = None,
+) -> Completion:
+    """Completion of ``messages`` with the model and sampling settings of ``agent``, as an interactive call."""
+
+    async def call(provider: Provider, model: str, slotted: asyncio.Event) -> Completion:
+        request = _agent_request(agent, model, messages, system, system_prefix, fair_key, slotted)
+        return await provider.complete(request)
+
+    completion, hedged = await _race(_targets(agent), call, "complete")
+    completion.hedged = hedged
+    return completion
+
+
+async def _open_stream(
+    provider: Provider, request: ChatRequest
+) -> tuple[str | Completion, AsyncIterator[str | Completion]]:
+    """First event of a stream, and the stream to read the rest from."""
+    events = provider.stream(request)
+    try:
+        return await anext(events), events
+    except BaseException:
+        await events.aclose()
+        raise
+
+
+async def stream_for_agent(
+    agent: AgentConfig,
+    messages: list[dict[str, str]],
+    system: str,
+    system_prefix: str = "",
+    fair_key: str | None = None,
+) -> AsyncIterator[str | Completion]:
+    """Streamed completion (see ``Provider.stream``) with the settings of ``agent``, hedged on the first token."""
+
+    async def call(
+        provider: Provider, model: str, slotted: asyncio.Event
+    ) -> tuple[str | Completion, AsyncIterator[str | Completion]]:
+        request = _agent_request(agent, model, messages, system, system_prefix, fair_key, slotted)
+        return await _open_stream(provider, request)
+
+    async def discard(opened: tuple[str | Completion, AsyncIterator[str | Completion]]) -> None:
+        await opened[1].aclose()
+
+    (first, events), hedged = await _race(_targets(agent), call, "first_token", discard)
+    try:
+        yield first
+        async for event in events:
+            if isinstance(event, Completion):
+                event.hedged = hedged
+            yield event
+    finally:
+        await events.aclose()
@@ -0,0 +1,225 @@
+"""Scheduling of outgoing LLM calls.
+
+Every provider call takes a slot first (``async with slot(...)``). Slots
+are bounded per provider (``LLM_PROVIDER_CONCURRENCY``) and per model
+(``LLM_MODEL_CONCURRENCY``). When none is free the call waits in its
+provider's queue, and freed slots go to waiting calls:
+
+* by ``Priority``: interactive chat before assessment evaluation before
+  report generation before background work (conversation summaries);
+* within a priority, round robin between fair keys (children), so one
+  child's burst, or one batch job, does not hold up everybody else;
+* first in, first out for the calls of one key.
+
+A call waits at most ``LLM_QUEUE_TIMEOUTS`` seconds for its priority. It
+is dropped with ``QueueTimeout`` when its deadline passes, or right away
+when the queue ahead of it cannot drain before the deadline at the
+current call duration. Queue depth, waits and drops are reported by
+``scheduler_stats``. Limits are per worker.
+"""
+
+import asyncio
+import statistics
+import time
+from collections import Counter, OrderedDict, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any
+
+from app.core.config import settings
+
+# Weight of the latest call in the moving average of call durations
+DURATION_SMOOTHING = 0.1
+
+# Recent waits kept per priority for the wait-time percentiles
+WAIT_SAMPLES = 1000
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # Child chat turns
+    ASSESSMENT = 1  # Assessment evaluation
+    REPORT = 2  # Report generation
+    BACKGROUND = 3  # Conversation summaries
+
+
+class QueueTimeout(Exception):
+    """The call could not get a slot before its deadline."""
+
+
+@dataclass(eq=False)
+class _Ticket:
+    model: str
+    priority: Priority
+    fair_key: str
+    deadline: float
+    enqueued: float = field(default_factory=time.monotonic)
+    future: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+def _timeout(priority: Priority) -> float:
+    return settings.LLM_QUEUE_TIMEOUTS.get(priority.name.lower(), settings.LLM_QUEUE_TIMEOUTS["interactive"])
+
+
+class ProviderQueue:
+    """Slots and waiting calls of one provider."""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.active = 0
+        self.active_by_model: Counter[str] = Counter()
+        self.waiting: list[OrderedDict[str, deque[_Ticket]]] = [OrderedDict() for _ in Priority]
+        self.depth = [0] * len(Priority)
+        self.duration_ms: float | None = None
+        self.waits = [deque(maxlen=WAIT_SAMPLES) for _ in Priority]
+        self.counters = {
+            name: [0] * len(Priority) for name in ("started", "queued", "dropped_deadline", "dropped_early")
+        }
+
+    @property
+    def limit(self) -> int:
+        return settings.LLM_PROVIDER_CONCURRENCY.get(self.provider, settings.LLM_DEFAULT_PROVIDER_CONCURRENCY)
+
+    def model_limit(self, model: str) -> int:
+        return settings.LLM_MODEL_CONCURRENCY.get(f"{self.provider}:{model}", self.limit)
+
+    def _has_capacity(self, model: str) -> bool:
+        return self.active < self.limit and self.active_by_model[model] < self.model_limit(model)
+
+    def _start(self, ticket: _Ticket) -> float:
+        self.active += 1
+        self.active_by_model[ticket.model] += 1
+        self.counters["started"][ticket.priority] += 1
+        waited_ms = (time.monotonic() - ticket.enqueued) * 1000
+        self.waits[ticket.priority].append(waited_ms)
+        return waited_ms
+
+    def release(self, model: str, duration_ms: float | None = None) -> None:
+        self.active -= 1
+        self.active_by_model[model] -= 1
+        if duration_ms is not None:
+            if self.duration_ms is None:
+                self.duration_ms = duration_ms
+            else:
+                self.duration_ms += DURATION_SMOOTHING * (duration_ms - self.duration_ms)
+        self._dispatch()
+
+    def _expected_wait_ms(self, priority: Priority) -> float:
+        """Time for the calls queued at ``priority`` or above to get a slot, at the usual call duration."""
+        ahead = sum(self.depth[: priority + 1])
+        return (ahead + 1) / self.limit * (self.duration_ms or 0)
+
+    async def acquire(self, model: str, priority: Priority, fair_key: str) -> float:
+        """Take a slot, waiting for one if needed; returns the wait in milliseconds."""
+        ticket = _Ticket(model, priority, fair_key, deadline=time.monotonic() + _timeout(priority))
+        # Calls are started as soon as capacity frees up, so nobody waits while this model has a slot
+        if self._has_capacity(model):
+            return self._start(ticket)
+        if self._expected_wait_ms(priority) > _timeout(priority) * 1000:
+            self.counters["dropped_early"][priority] += 1
+            raise QueueTimeout(f"{self.provider} queue too long for a {priority.name.lower()} call")
+
+        self.waiting[priority].setdefault(fair_key, deque()).append(ticket)
+        self.depth[priority] += 1
+        self.counters["queued"][priority] += 1
+        try:
+            return await asyncio.wait_for(ticket.future, ticket.deadline - time.monotonic())
+        except BaseException as e:
+            if ticket.future.done() and not ticket.future.cancelled() and ticket.future.exception() is None:
+                # Given a slot just as we stopped waiting
+                self.release(model)
+            self._remove(ticket)
+            if isinstance(e, (asyncio.TimeoutError, QueueTimeout)):
+                self.counters["dropped_deadline"][priority] += 1
+                raise QueueTimeout(f"No {self.provider} slot for a {priority.name.lower()} call in time") from None
+            raise
+
+    def _remove(self, ticket: _Ticket) -> None:
+        lanes = self.waiting[ticket.priority]
+        lane = lanes.get(ticket.fair_key)
+        if lane is not None and ticket in lane:
+            lane.remove(ticket)
+            self.depth[ticket.priority] -= 1
+            if not lane:
+                del lanes[ticket.fair_key]
+
+    def _dispatch(self) -> None:
+        """Start waiting calls while there is capacity: by priority, then round robin over fair keys."""
+        now = time.monotonic()
+        for priority in Priority:
+            lanes = self.waiting[priority]
+            progress = True
+            while progress and lanes and self.active < self.limit:
+                progress = False
+                for key in list(lanes):
+                    ticket = lanes[key][0]
+                    if ticket.future.done() or ticket.deadline <= now:
+                        # Gave up, or past its deadline
+                        self._remove(ticket)
+                        if not ticket.future.done():
+                            ticket.future.set_exception(QueueTimeout())
+                        progress = True
+                        continue
+                    if not self._has_capacity(ticket.model):
+                        continue
+                    self._remove(ticket)
+                    if key in lanes:
+                        # Next turn goes to the other keys first
+                        lanes.move_to_end(key)
+                    ticket.future.set_result(self._start(ticket))
+                    progress = True
+                    if self.active >= self.limit:
+                        break
+
+    def stats(self) -> dict[str, Any]:
+        by_priority = {}
+        for priority in Priority:
+            waits = sorted(self.waits[priority])
+            by_priority[priority.name.lower()] = {
+                "queued": self.depth[priority],
+                **{name: counts[priority] for name, counts in self.counters.items()},
+                "wait_ms_p50": round(statistics.median(waits), 1) if waits else 0.0,
+                "wait_ms_p95": round(waits[int(len(waits) * 0.95)], 1) if waits else 0.0,
+                "wait_ms_max": round(waits[-1], 1) if waits else 0.0,
+            }
+        return {
+            "active": self.active,
+            "limit": self.limit,
+            "active_by_model": {model: count for model, count in self.active_by_model.items() if count},
+            "queued": sum(self.depth),
+            "call_ms": round(self.duration_ms or 0, 1),
+            "priorities": by_priority,
+        }
+
+
+_queues: dict[str, ProviderQueue] = {}
+
+
+def provider_queue(provider: str) -> ProviderQueue:
+    if provider not in _queues:
+        _queues[provider] = ProviderQueue(provider)
+    return _queues[provider]
+
+
+@asynccontextmanager
+async def slot(
+    provider: str, model: str, priority: Priority = Priority.INTERACTIVE, fair_key: str | None = None
+) -> AsyncIterator[float]:
+    """Hold a call slot for ``provider`` and ``model``; yields the time waited for it in milliseconds."""
+    if not settings.LLM_SCHEDULER_ENABLED:
+        yield 0.0
+        return
+
+    queue = provider_queue(provider)
+    waited_ms = await queue.acquire(model, Priority(priority), fair_key or "-")
+    started = time.monotonic()
+    try:
+        yield waited_ms
+    finally:
+        queue.release(model, (time.monotonic() - started) * 1000)
+
+
+def scheduler_stats() -> dict[str, dict[str, Any]]:
+    """Slots, queue depth, waits and drops of every provider in this worker."""
+    return {name: queue.stats() for name, queue in _queues.items()}
@@ -0,0 +1,263 @@
+"""Local stub LLM server for offline load tests of the chat path.
+
+Speaks the OpenAI chat completions API (what ``LLM_USE_STUB`` routes to)
+and answers after a latency drawn from a configurable distribution, with
+an optional slow tail and error rate. Streamed requests (``"stream": true``)
+get their first token after the sampled latency and the rest at
+``--tokens-per-second``:
+
+    python -m app.services.llm_stub_server --port 8089 \\
+        --latency lognormal:400,0.4 --tail-latency uniform:3000,8000 --tail-rate 0.02 --error-rate 0.01 \\
+        --tokens-per-second 40 --prefix-cache-speedup 0.5
+
+Latency specs (milliseconds): ``fixed:MS``, ``uniform:LOW,HIGH``,
+``normal:MEAN,STDDEV`` and ``lognormal:MEDIAN,SIGMA``. Single models can
+be made slower or flakier than the rest, to exercise hedging and circuit
+breaking: ``--model-latency gpt-4o-mini=fixed:5000`` (the tail does not
+apply to them) and ``--model-error-rate deepseek-chat=1``.
+
+Prompt prefixes are cached like OpenAI's automatic prompt caching: a
+prompt starting with blocks of ``--prefix-cache-block-tokens`` seen in an
+earlier request (same model) reports them as
+``usage.prompt_tokens_details.cached_tokens``, once at least
+``--prefix-cache-min-tokens`` match, and answers faster by
+``--prefix-cache-speedup`` times the cached share of the prompt. The
+defaults are smaller than real providers' (1024 tokens minimum) so the
+tutors' prompts exercise the cache.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FILLER = "This is a stub answer used for load testing the tutor chat path."
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Sampler of latencies in milliseconds for ``spec``."""
+    kind, _, raw_args = spec.partition(":")
+    try:
+        args = [float(arg) for arg in raw_args.split(",")] if raw_args else []
+    except ValueError:
+        raise ValueError(f"Invalid latency spec {spec!r}") from None
+
+    if kind == "fixed" and len(args) == 1:
+        return lambda: args[0]
+    if kind == "uniform" and len(args) == 2:
+        return lambda: random.uniform(args[0], args[1])
+    if kind == "normal" and len(args) == 2:
+        return lambda: max(0.0, random.gauss(args[0], args[1]))
+    if kind == "lognormal" and len(args) == 2:
+        return lambda: random.lognormvariate(math.log(args[0]), args[1])
+    raise ValueError(f"Invalid latency spec {spec!r}")
+
+
+@dataclass
+class StubProfile:
+    latency: Callable[[], float]
+    tail_latency: Callable[[], float] | None = None
+    tail_rate: float = 0.0
+    error_rate: float = 0.0
+    tokens_per_second: float = 50.0
+    prefix_cache_block_tokens: int = 64
+    prefix_cache_min_tokens: int = 128  # 0 disables prefix caching
+    prefix_cache_speedup: float = 0.5  # Latency saved when the whole prompt is cached
+    prefix_cache_entries: int = 10_000
+    model_latency: dict[str, Callable[[], float]] = field(default_factory=dict)
+    model_error_rate: dict[str, float] = field(default_factory=dict)
+
+    def sample_latency_ms(self, model: str | None = None) -> float:
+        if model in self.model_latency:
+            return self.model_latency[model]()
+        if self.tail_latency is not None and random.random() < self.tail_rate:
+            return self.tail_latency()
+        return self.latency()
+
+    def fails(self, model: str | None = None) -> bool:
+        return random.random() < self.model_error_rate.get(model, self.error_rate)
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class PrefixCache:
+    """Prompt prefixes of recent requests, remembered in blocks of ``block_tokens``."""
+
+    def __init__(self, block_tokens: int, min_tokens: int, max_entries: int):
+        self.block_tokens = block_tokens
+        self.min_tokens = min_tokens
+        self.max_entries = max_entries
+        self._blocks: OrderedDict[bytes, None] = OrderedDict()
+
+    def lookup(self, prompt: str) -> int:
+        """Tokens of ``prompt`` already cached, remembering its prefixes for later requests."""
+        if self.min_tokens <= 0:
+            return 0
+        size = self.block_tokens * 4
+        digest = hashlib.sha1()
+        cached = 0
+        for end in range(size, len(prompt) + 1, size):
+            # Each key covers the whole prompt up to the end of its block
+            digest.update(prompt[end - size : end].encode())
+            key = digest.digest()
+            if key in self._blocks and cached == end - size:
+                cached = end
+            self._blocks[key] = None
+            self._blocks.move_to_end(key)
+        while len(self._blocks) > self.max_entries:
+            self._blocks.popitem(last=False)
+        tokens = cached // 4
+        return tokens if tokens >= self.min_tokens else 0
+
+
+def serialize_prompt(body: dict[str, Any]) -> str:
+    """The request's prompt as one string, in the order the model reads it."""
+    messages = "".join(f"<{m.get('role')}>{m.get('content', '')}\n" for m in body.get("messages", []))
+    return f"<model>{body.get('model', 'stub')}\n{messages}"
+
+
+def reply_text(messages: list[dict[str, Any]], max_tokens: int) -> str:
+    """Deterministic answer echoing the last user message, capped at ``max_tokens``."""
+    last = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    text = f"{FILLER} You said: {last}"
+    return text[: max_tokens * 4]
+
+
+def create_app(profile: StubProfile) -> FastAPI:
+    app = FastAPI(title="Stub LLM provider")
+    app.state.requests = 0
+    app.state.streams_completed = 0
+    app.state.streams_cancelled = 0
+    app.state.prompt_tokens = 0
+    app.state.cached_prompt_tokens = 0
+    prefix_cache = PrefixCache(
+        profile.prefix_cache_block_tokens, profile.prefix_cache_min_tokens, profile.prefix_cache_entries
+    )
+
+    async def stream_chunks(request: Request, body: dict[str, Any], text: str, usage: dict[str, int]):
+        model = body.get("model", "stub")
+        completed = False
+        try:
+            for index, word in enumerate(text.split(" ")):
+                if index:
+                    await asyncio.sleep(1 / profile.tokens_per_second)
+                    # Writes to a closed connection are dropped silently; stop like a real provider would
+                    if await request.is_disconnected():
+                        return
+                delta = {"content": word if index == 0 else f" {word}"}
+                chunk = {"model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({'model': model, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+            completed = True
+        finally:
+            # Cancelled or closed early when the client disconnects mid-stream
+            if completed:
+                app.state.streams_completed += 1
+            else:
+                app.state.streams_cancelled += 1
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(body: dict[str, Any], request: Request):
+        app.state.requests += 1
+        messages = body.get("messages", [])
+        prompt_tokens = sum(count_tokens(message.get("content", "")) for message in messages)
+        cached_tokens = min(prefix_cache.lookup(serialize_prompt(body)), prompt_tokens)
+        speedup = profile.prefix_cache_speedup * cached_tokens / prompt_tokens if prompt_tokens else 0
+        await asyncio.sleep(profile.sample_latency_ms(body.get("model")) * (1 - speedup) / 1000)
+        if profile.fails(body.get("model")):
+            return JSONResponse(status_code=503, content={"error": {"message": "stub overloaded"}})
+
+        app.state.prompt_tokens += prompt_tokens
+        app.state.cached_prompt_tokens += cached_tokens
+        text = reply_text(messages, body.get("max_tokens", 500))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            "completion_tokens": count_tokens(text),
+            "total_tokens": prompt_tokens + count_tokens(text),
+        }
+        if body.get("stream"):
+            return StreamingResponse(stream_chunks(request, body, text, usage), media_type="text/event-stream")
+
+        return {
+            "id": f"stub-{app.state.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    @app.get("/health")
+    async def health():
+        return {
+            "status": "healthy",
+            "requests": app.state.requests,
+            "streamsCompleted": app.state.streams_completed,
+            "streamsCancelled": app.state.streams_cancelled,
+            "promptTokens": app.state.prompt_tokens,
+            "cachedPromptTokens": app.state.cached_prompt_tokens,
+        }
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a stub OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="lognormal:400,0.4", help="Latency distribution (ms)")
+    parser.add_argument("--tail-latency", help="Latency distribution of slow responses (ms)")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="Fraction of responses drawn from the tail")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Streaming speed after the first token")
+    parser.add_argument("--prefix-cache-block-tokens", type=int, default=64, help="Prompt cache granularity")
+    parser.add_argument("--prefix-cache-min-tokens", type=int, default=128, help="Shortest cached prefix (0 disables)")
+    parser.add_argument(
+        "--prefix-cache-speedup", type=float, default=0.5, help="Share of latency saved by a fully cached prompt"
+    )
+    parser.add_argument(
+        "--model-latency", action="append", default=[], metavar="MODEL=SPEC", help="Latency of one model (ms)"
+    )
+    parser.add_argument(
+        "--model-error-rate", action="append", default=[], metavar="MODEL=RATE", help="Error rate of one model"
+    )
+    args = parser.parse_args()
+
+    import uvicorn
+
+    model_latency = dict(option.split("=", 1) for option in args.model_latency)
+    model_error_rate = dict(option.split("=", 1) for option in args.model_error_rate)
+
+    profile = StubProfile(
+        latency=parse_latency(args.latency),
+        tail_latency=parse_latency(args.tail_latency) if args.tail_latency else None,
+        tail_rate=args.tail_rate,
+        error_rate=args.error_rate,
+        tokens_per_second=args.tokens_per_second,
+        prefix_cache_block_tokens=args.prefix_cache_block_tokens,
+        prefix_cache_min_tokens=args.prefix_cache_min_tokens,
+        prefix_cache_speedup=args.prefix_cache_speedup,
+        model_latency={model: parse_latency(spec) for model, spec in model_latency.items()},
+        model_error_rate={model: float(rate) for model, rate in model_error_rate.items()},
+    )
+    uvicorn.run(create_app(profile), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
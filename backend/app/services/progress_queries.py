@@ -0,0 +1,111 @@
+"""Statement builders for the hot progress and dashboard read paths.
+
+Keeping these shapes in one place lets ``tests/test_query_plans.py`` run
+``EXPLAIN`` on exactly the statements the API executes, so an index or query
+change that reintroduces sequential scans or sorts fails the suite.
+"""
+
+from datetime import date
+from uuid import UUID
+
+from sqlmodel import func, select
+
+from app.models.analytics import ChildDailyStats
+from app.models.assessment import AssessmentResult, ProgressReport
+from app.models.child import Child
+from app.models.session import Session as LearningSession
+
+
+def recent_sessions_query(child_id: UUID, limit: int = 10):
+    """Latest sessions of a child, served by ``idx_sessions_child_created_cover``."""
+    return (
+        select(
+            LearningSession.id,
+            LearningSession.subject,
+            LearningSession.status,
+            LearningSession.final_score,
+            LearningSession.points_earned,
+            LearningSession.time_spent,
+            LearningSession.engagement_level,
+            LearningSession.created_at,
+        )
+        .where(LearningSession.child_id == child_id)
+        .order_by(LearningSession.created_at.desc())
+        .limit(limit)
+    )
+
+
+def recent_assessments_query(child_id: UUID, limit: int = 10):
+    """Latest assessments of a child, served by ``idx_assessment_results_child_created_cover``."""
+    return (
+        select(
+            AssessmentResult.id,
+            AssessmentResult.subject,
+            AssessmentResult.overall_score,
+            AssessmentResult.created_at,
+        )
+        .where(AssessmentResult.child_id == child_id)
+        .order_by(AssessmentResult.created_at.desc())
+        .limit(limit)
+    )
+
+
+def child_subject_totals_query(child_id: UUID):
+    """All-time per-subject session totals of a child from the daily rollup."""
+    return (
+        select(
+            ChildDailyStats.subject,
+            func.sum(ChildDailyStats.sessions_started).label("sessions"),
+            func.sum(ChildDailyStats.sessions_completed).label("completed"),
+            func.sum(ChildDailyStats.session_score_total).label("total_score"),
+            func.sum(ChildDailyStats.minutes).label("minutes"),
+        )
+        .where(ChildDailyStats.child_id == child_id)
+        .group_by(ChildDailyStats.subject)
+    )
+
+
+def guardian_daily_buckets_query(guardian_id: UUID, start_day: date):
+    """Per-day, per-subject rollup buckets across a guardian's children."""
+    child_ids = select(Child.id).where(Child.guardian_id == guardian_id).scalar_subquery()
+    return (
+        select(
+            ChildDailyStats.day,
+            ChildDailyStats.subject,
+            func.sum(ChildDailyStats.sessions_started).label("sessions"),
+            func.sum(ChildDailyStats.points).label("points"),
+            func.sum(ChildDailyStats.engagement_total).label("engagement_total"),
+            func.sum(ChildDailyStats.engagement_count).label("engagement_count"),
+        )
+        .where(ChildDailyStats.child_id.in_(child_ids), ChildDailyStats.day >= start_day)
+        .group_by(ChildDailyStats.day, ChildDailyStats.subject)
+        .order_by(ChildDailyStats.day)
+    )
+
+
+def report_totals_query(child_ids: list[UUID], start_date: date, end_date: date):
+    """Per-child, per-subject rollup totals over a report window."""
+    return (
+        select(
+            ChildDailyStats.child_id,
+            ChildDailyStats.subject,
+            func.sum(ChildDailyStats.assessments_count).label("assessments"),
+            func.sum(ChildDailyStats.assessment_score_total).label("score_total"),
+            func.sum(ChildDailyStats.minutes).label("minutes"),
+            func.sum(ChildDailyStats.points).label("points"),
+        )
+        .where(ChildDailyStats.child_id.in_(child_ids))
+        .where(ChildDailyStats.day >= start_date)
+        .where(ChildDailyStats.day <= end_date)
+        .group_by(ChildDailyStats.child_id, ChildDailyStats.subject)
+    )
+
+
+def latest_report_query(child_id: UUID, period: str):
+    """Most recent materialized report of a period, served by ``idx_progress_reports_period_date``."""
+    return (
+        select(ProgressReport)
+        .where(ProgressReport.child_id == child_id, ProgressReport.report_period == period)
+        .order_by(ProgressReport.end_date.desc())
+        .limit(1)
+    )
@@ -0,0 +1,270 @@
+"""Materialized weekly and monthly ``ProgressReport`` rows.
+
+A scheduled builder walks every child in keyset-ordered batches, aggregates
+the ``child_daily_stats`` rollup for the whole batch in one query and upserts
+one report row per child. The API serves the latest materialized row and
+falls back to building a single child's report on demand when none exists.
+
+Weekly reports cover calendar weeks (Monday to Sunday) and monthly reports
+calendar months, so each period has one row per child, refreshed in place
+by every build until the period is over. The current period is the one
+containing the guardian's local date, so a build late on Sunday (UTC)
+already starts the new week for guardians east of UTC.
+
+Run a build manually with:
+
+    python -m app.services.progress_reports build --period weekly
+"""
+
+import argparse
+import asyncio
+import calendar
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.models.assessment import ProgressReport
+from app.models.child import Child
+from app.models.guardian import Guardian
+from app.services import daily_stats, progress_queries
+
+logger = logging.getLogger(__name__)
+
+# Materialized report periods, by the ``days`` of the report requests they serve
+REPORT_PERIODS = {"weekly": 7, "monthly": 30}
+
+# Arbitrary constant identifying the builder's Postgres advisory lock
+BUILDER_LOCK_KEY = 728_001
+
+PARENT_RECOMMENDATIONS = [
+    "استمر في تشجيع طفلك على التعلم اليومي",
+    "احتفل بالإنجازات الصغيرة",
+    "خصص وقتاً للمراجعة معاً",
+]
+
+
+def period_for_days(days: int) -> str | None:
+    """Return the materialized period matching ``days``, if any."""
+    for period, period_days in REPORT_PERIODS.items():
+        if period_days == days:
+            return period
+    return None
+
+
+def period_window(days: int, today: date | None = None) -> tuple[date, date]:
+    """Return the ``(start_date, end_date)`` window of a report ending today."""
+    end_date = today or date.today()
+    return end_date - timedelta(days=days), end_date
+
+
+def calendar_window(period: str, today: date | None = None) -> tuple[date, date]:
+    """Return the calendar week or month containing ``today`` for a materialized period."""
+    today = today or date.today()
+    if period == "weekly":
+        start_date = today - timedelta(days=today.weekday())
+        return start_date, start_date + timedelta(days=6)
+    start_date = today.replace(day=1)
+    return start_date, today.replace(day=calendar.monthrange(today.year, today.month)[1])
+
+
+async def _compute_rows(
+    db: AsyncSession, children: list, period: str, start_date: date, end_date: date
+) -> list[dict[str, Any]]:
+    """Aggregate the rollup for a batch of children into report rows."""
+    child_ids = [child.id for child in children]
+    stats = (await db.execute(progress_queries.report_totals_query(child_ids, start_date, end_date))).all()
+
+    stats_by_child: dict[UUID, list] = {}
+    for row in stats:
+        stats_by_child.setdefault(row.child_id, []).append(row)
+
+    now = datetime.utcnow()
+    rows = []
+    for child in children:
+        child_stats = stats_by_child.get(child.id, [])
+        subject_progress = {
+            row.subject: {
+                "sessionsCompleted": row.assessments,
+                "totalScore": row.score_total,
+                "averageScore": round(row.score_total / row.assessments, 1),
+            }
+            for row in child_stats
+            if row.assessments
+        }
+        total_assessments = sum(row.assessments for row in child_stats)
+        total_score = sum(row.score_total for row in child_stats)
+
+        rows.append(
+            {
+                "child_id": child.id,
+                "guardian_id": child.guardian_id,
+                "report_period": period,
+                "start_date": start_date,
+                "end_date": end_date,
+                "total_sessions": total_assessments,
+                "total_time_spent": sum(row.minutes for row in child_stats),
+                "average_score": round(total_score / max(total_assessments, 1), 1),
+                "subject_progress": subject_progress,
+                "points_earned": sum(row.points for row in child_stats),
+                "parent_recommendations": PARENT_RECOMMENDATIONS,
+                "celebrate_achievements": [
+                    f"{child.first_name} أظهر تحسناً رائعاً في التعلم",
+                    "الالتزام بالوقت المحدد ممتاز",
+                ],
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+    return rows
+
+
+async def _upsert(db: AsyncSession, rows: list[dict[str, Any]]) -> None:
+    """Insert or refresh report rows with a single multi-row statement."""
+    if not rows:
+        return
+
+    stmt = insert(ProgressReport).values(rows)
+    refreshed = [
+        "total_sessions",
+        "total_time_spent",
+        "average_score",
+        "subject_progress",
+        "points_earned",
+        "parent_recommendations",
+        "celebrate_achievements",
+        "updated_at",
+    ]
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["child_id", "report_period", "start_date", "end_date"],
+            set_={name: stmt.excluded[name] for name in refreshed},
+        )
+    )
+
+
+async def build_reports(period: str, today: date | None = None, batch_size: int | None = None) -> int:
+    """Materialize ``period`` reports for every child, one batch per transaction.
+
+    Each child's report covers the period containing its guardian's local
+    date, or ``today`` when given. Returns the number of reports written, or
+    0 when another worker already holds the builder lock.
+    """
+    batch_size = batch_size or settings.REPORT_BUILD_BATCH_SIZE
+    built = 0
+
+    async with engine.connect() as lock_conn:
+        lock = await lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": BUILDER_LOCK_KEY})
+        acquired = lock.scalar()
+        if not acquired:
+            logger.info("Progress report builder already running elsewhere, skipping %s build", period)
+            return 0
+
+        try:
+            last_id = None
+            while True:
+                async with AsyncSessionLocal() as db:
+                    query = (
+                        select(Child.id, Child.guardian_id, Child.first_name, Guardian.timezone)
+                        .join(Guardian, Guardian.id == Child.guardian_id)
+                        .order_by(Child.id)
+                        .limit(batch_size)
+                    )
+                    if last_id is not None:
+                        query = query.where(Child.id > last_id)
+                    children = (await db.execute(query)).all()
+                    if not children:
+                        break
+
+                    # Guardians' local dates span at most a day either side, so few windows per batch
+                    windows: dict[tuple[date, date], list] = {}
+                    for child in children:
+                        window = calendar_window(period, today or daily_stats.local_today(child.timezone))
+                        windows.setdefault(window, []).append(child)
+                    rows = []
+                    for (start_date, end_date), group in windows.items():
+                        rows.extend(await _compute_rows(db, group, period, start_date, end_date))
+                    await _upsert(db, rows)
+                    await db.commit()
+
+                built += len(children)
+                last_id = children[-1].id
+        finally:
+            await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": BUILDER_LOCK_KEY})
+
+    logger.info("Built %d %s progress reports", built, period)
+    return built
+
+
+async def get_report(
+    db: AsyncSession, child: Child, days: int, today: date | None = None
+) -> tuple[ProgressReport, dict[str, Any]]:
+    """Return the child's report for ``days`` with staleness metadata.
+
+    Materialized periods are served from the latest stored row, covering the
+    calendar week or month of ``today`` (the guardian's local date by
+    default). When no row exists yet the report is computed on demand and
+    stored. Other values of ``days`` get a report of the last ``days`` days,
+    computed on demand.
+    """
+    period = period_for_days(days)
+    today = today or daily_stats.local_today(await daily_stats.guardian_zone(db, child.id))
+
+    if period is not None:
+        report = (await db.execute(progress_queries.latest_report_query(child.id, period))).scalar_one_or_none()
+
+        if report is not None:
+            generated_at = report.updated_at or report.created_at
+            age = datetime.utcnow() - generated_at
+            stale = report.end_date < today or age > timedelta(hours=settings.REPORT_STALE_AFTER_HOURS)
+            return report, {"source": "precomputed", "generatedAt": generated_at.isoformat(), "stale": stale}
+
+    start_date, end_date = calendar_window(period, today) if period is not None else period_window(days, today)
+    rows = await _compute_rows(db, [child], period or "custom", start_date, end_date)
+    if period is not None:
+        await _upsert(db, rows)
+        await db.commit()
+
+    report = ProgressReport(**rows[0])
+    return report, {"source": "on_demand", "generatedAt": report.created_at.isoformat(), "stale": False}
+
+
+async def run_report_scheduler() -> None:
+    """Rebuild every materialized period on a fixed interval until cancelled."""
+    interval = settings.REPORT_BUILD_INTERVAL_MINUTES * 60
+    while True:
+        for period in REPORT_PERIODS:
+            try:
+                await build_reports(period)
+            except Exception as e:
+                logger.error(f"Progress report build failed for {period}: {e}")
+        await asyncio.sleep(interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Materialize progress reports")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="Build reports for every child")
+    build_parser.add_argument("--period", choices=[*REPORT_PERIODS, "all"], default="all")
+    build_parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    periods = list(REPORT_PERIODS) if args.period == "all" else [args.period]
+
+    async def _build():
+        for period in periods:
+            await build_reports(period, batch_size=args.batch_size)
+
+    asyncio.run(_build())
+
+
+if __name__ == "__main__":
+    main()
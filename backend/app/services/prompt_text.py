@@ -0,0 +1,29 @@
+"""Text helpers shared by prompt building: normalization and token estimates.
+
+Token counts are estimates (``CHARS_PER_TOKEN`` characters per token,
+conservative for Arabic); no tokenizer is loaded.
+"""
+
+import re
+import unicodedata
+
+# Harakat, Quranic annotation marks, superscript alef and tatweel
+ARABIC_MARKS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+
+CHARS_PER_TOKEN = 3
+# Role and formatting tokens per message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def normalize_prompt(text: str) -> str:
+    """``text`` with compatibility forms, case, Arabic diacritics and whitespace folded."""
+    text = ARABIC_MARKS.sub("", unicodedata.normalize("NFKC", text))
+    return " ".join(text.casefold().split())
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def message_tokens(content: str) -> int:
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
@@ -0,0 +1,225 @@
+"""Cache of agent replies to repeated prompts.
+
+Children ask the same things over and over ("احكي لي عن الحروف", the
+suggestion chips of the chat screen), and for one agent, lesson and age
+group the right answer does not depend on who asks. Replies to first-turn
+prompts (no conversation history) are cached by agent, lesson (and the
+lesson context given to the model), age group and normalized prompt.
+Normalization folds Unicode compatibility forms, case, Arabic diacritics,
+tatweel and whitespace, so "أَهْلاً  بِك" and "أهلا بك" share an entry.
+
+The key also carries a fingerprint of the agent's prompts, examples,
+sampling settings and model, so editing an agent's YAML starts afresh.
+Entries are tagged ``agent:<id>`` and with their lesson's tag, so
+``entity_cache.invalidate_lesson`` drops them too.
+
+Cached replies are generated without the child's name so they can be
+shared; agents opt out with ``cacheReplies: false``. Replies are checked
+with ``DEFAULT_SAFETY_VALIDATOR`` and, when they fail, replaced by the
+validator's fallback response. The verdict is stored with each entry, so a
+hit skips both the provider call and the check. Replies failing the checks
+are kept only for ``REPLY_CACHE_UNSAFE_TTL_SECONDS``: long enough to answer
+the requests waiting on the same key with the fallback instead of each
+asking the provider again, short enough that the next child gets a new try.
+
+Storage is the two-tier cache (``app.core.cache``): a size-bounded LRU per
+worker in front of Redis, with ``REPLY_CACHE_TTL_SECONDS``.
+
+Identical prompts arriving together (a classroom pressing the same
+suggestion) are coalesced by cache key with ``app.core.single_flight``:
+one request per key, across all workers, looks the reply up or calls the
+provider, and the others get its result.
+"""
+
+import dataclasses
+import functools
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID
+
+from app.core.cache import TwoTierCache
+from app.core.config import settings
+from app.core.safety_policies import (
+    DEFAULT_SAFETY_VALIDATOR,
+    SAFETY_POLICY_VERSION,
+    SafetyVerdict,
+)
+from app.core.single_flight import SingleFlight
+from app.schemas.agent import AgentConfig
+from app.services import llm_providers, tutor_chat
+from app.services.entity_cache import lesson_tag
+from app.services.llm_providers import Completion
+from app.services.prompt_text import normalize_prompt
+
+reply_cache = TwoTierCache(
+    "reply",
+    ttl=settings.REPLY_CACHE_TTL_SECONDS,
+    local_ttl=settings.REPLY_CACHE_LOCAL_TTL_SECONDS,
+    max_entries=settings.REPLY_CACHE_LOCAL_MAX_ENTRIES,
+)
+reply_flight = SingleFlight("reply")
+
+
+@dataclass
+class AgentReply:
+    completion: Completion
+    safety: SafetyVerdict
+    cached: bool = False
+    # Answered by an identical request in flight at the same time
+    shared: bool = False
+
+
+def agent_tag(agent_id: str) -> str:
+    return f"agent:{agent_id}"
+
+
+@functools.lru_cache(maxsize=128)
+def _fingerprint(agent: AgentConfig, model: str) -> str:
+    digest = hashlib.sha1(agent.model_dump_json().encode())
+    digest.update(model.encode())
+    return digest.hexdigest()[:16]
+
+
+def checked(agent: AgentConfig, completion: Completion, age_group: str | None) -> AgentReply:
+    """``completion`` with its safety verdict, its text replaced by the fallback response if it failed."""
+    safety = DEFAULT_SAFETY_VALIDATOR.check_agent_response(completion.text, agent.subject, age_group)
+    if not safety.passed:
+        completion = dataclasses.replace(completion, text=DEFAULT_SAFETY_VALIDATOR.fallback_response(agent.language))
+    return AgentReply(completion=completion, safety=safety)
+
+
+def cache_key(
+    agent: AgentConfig,
+    user_message: str,
+    lesson_id: UUID | str | None,
+    age_group: str | None,
+    context: str | None = None,
+) -> str:
+    provider, model = llm_providers.route(agent)
+    prompt = hashlib.sha1(normalize_prompt(user_message).encode())
+    prompt.update((context or "").encode())
+    return ":".join(
+        (
+            agent.id,
+            _fingerprint(agent, f"{provider.name}:{model}"),
+            f"p{SAFETY_POLICY_VERSION}",
+            str(lesson_id or "-"),
+            age_group or "-",
+            prompt.hexdigest(),
+        )
+    )
+
+
+async def _generate(
+    agent: AgentConfig,
+    user_message: str,
+    history: list[dict[str, str]] | None = None,
+    child_name: str | None = None,
+    context: str | None = None,
+    age_group: str | None = None,
+    fair_key: str | None = None,
+) -> AgentReply:
+    completion = await tutor_chat.reply(
+        agent,
+        user_message,
+        history=history,
+        child_name=child_name,
+        context=context,
+        age_group=age_group,
+        fair_key=fair_key,
+    )
+    return checked(agent, completion, age_group)
+
+
+def _shareable(reply: AgentReply) -> dict[str, Any]:
+    completion = reply.completion
+    return {
+        "text": completion.text,
+        "provider": completion.provider,
+        "model": completion.model,
+        "safety": reply.safety.to_dict(),
+    }
+
+
+def _entry_ttl(entry: dict[str, Any]) -> int | None:
+    return None if entry["safety"]["passed"] else settings.REPLY_CACHE_UNSAFE_TTL_SECONDS
+
+
+async def _lookup(
+    agent: AgentConfig,
+    user_message: str,
+    context: str | None,
+    age_group: str | None,
+    fair_key: str | None,
+    key: str,
+    tags: list[str],
+) -> dict[str, Any]:
+    """Cached or freshly generated reply, as a JSON-serializable dict."""
+    fresh: list[AgentReply] = []
+    generate = functools.partial(
+        _generate, agent, user_message, context=context, age_group=age_group, fair_key=fair_key
+    )
+
+    async def load():
+        generated = await generate()
+        fresh.append(generated)
+        return _shareable(generated)
+
+    entry = await reply_cache.get_or_load(key, tags, load, ttl_of=_entry_ttl)
+    if not fresh:
+        return {**entry, "cached": True}
+
+    generated = fresh[0]
+    completion = generated.completion
+    return {
+        **_shareable(generated),
+        "cached": False,
+        "inputTokens": completion.input_tokens,
+        "cachedInputTokens": completion.cached_input_tokens,
+        "outputTokens": completion.output_tokens,
+        "latencyMs": completion.latency_ms,
+    }
+
+
+async def get_reply(
+    agent: AgentConfig,
+    user_message: str,
+    lesson_id: UUID | str | None = None,
+    age_group: str | None = None,
+    history: list[dict[str, str]] | None = None,
+    child_name: str | None = None,
+    context: str | None = None,
+    fair_key: str | None = None,
+) -> AgentReply:
+    """The agent's checked answer to ``user_message``, from the cache or an identical request in flight."""
+    if not settings.REPLY_CACHE_ENABLED or not agent.cacheReplies or history:
+        return await _generate(agent, user_message, history, child_name, context, age_group, fair_key)
+
+    started = time.perf_counter()
+    key = cache_key(agent, user_message, lesson_id, age_group, context)
+    tags = [agent_tag(agent.id)] + ([lesson_tag(lesson_id)] if lesson_id else [])
+    lookup = functools.partial(_lookup, agent, user_message, context, age_group, fair_key, key, tags)
+    if settings.REPLY_COALESCING_ENABLED:
+        result, shared = await reply_flight.run(key, lookup)
+    else:
+        result, shared = await lookup(), False
+
+    # Only the request that called the provider is charged its tokens
+    paid = not result["cached"] and not shared
+    completion = Completion(
+        text=result["text"],
+        provider=result["provider"],
+        model=result["model"],
+        input_tokens=result["inputTokens"] if paid else 0,
+        cached_input_tokens=result["cachedInputTokens"] if paid else 0,
+        output_tokens=result["outputTokens"] if paid else 0,
+        latency_ms=(time.perf_counter() - started) * 1000,
+    )
+    return AgentReply(
+        completion=completion,
+        safety=SafetyVerdict.from_dict(result["safety"]),
+        cached=result["cached"],
+        shared=shared,
+    )
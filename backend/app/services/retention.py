@@ -0,0 +1,347 @@
+"""Data retention engine.
+
+Enforces ``DataRetentionPolicy`` one data type ("target") at a time. Each
+target is walked in primary-key order in batches of ``RETENTION_BATCH_SIZE``
+rows; every batch is its own short transaction that
+
+* locks its rows with ``SKIP LOCKED`` under a ``lock_timeout`` so it never
+  queues behind (or in front of) application writes,
+* removes the files referenced by the rows, then the rows themselves,
+* advances the target's ``RetentionCheckpoint`` in the same commit, so an
+  interrupted pass resumes after the last purged batch with the same cutoff.
+
+Throughput is capped at ``RETENTION_ROWS_PER_SECOND`` and the engine pauses
+while replica replay lag exceeds ``RETENTION_MAX_REPLICATION_LAG_SECONDS``.
+Chat messages and audio are additionally capped by each child's
+``data_retention_days``. Whole expired chat partitions are dropped by
+``app.services.chat_partitions``; this engine handles the per-child rows
+inside the live partitions. ``VOICE_SAMPLES`` is not stored anywhere yet and
+has no target.
+
+Run manually with:
+
+    python -m app.services.retention run [--dry-run] [--target chat_messages]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import (
+    DateTime,
+    cast,
+    delete,
+    exists,
+    func,
+    literal,
+    null,
+    or_,
+    text,
+    update,
+)
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.core.safety_policies import DataRetentionPolicy
+from app.models.assessment import AssessmentResult
+from app.models.child import Child
+from app.models.retention import RetentionCheckpoint
+from app.models.session import ChatMessage
+from app.models.session import Session as LearningSession
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary constant identifying the retention engine's Postgres advisory lock
+RETENTION_LOCK_KEY = 728_003
+
+# Attempts per batch before a target is left for the next run
+MAX_BATCH_ATTEMPTS = 3
+
+
+@dataclass(frozen=True)
+class RetentionTarget:
+    """One data type the engine purges."""
+
+    name: str
+    policy: DataRetentionPolicy
+    model: Any  # Table whose ``id`` primary key is walked
+    days: Callable[[], int]  # Global retention period
+    candidates: Callable[[datetime, int], Any]  # (reference_time, days) -> select(id, file)
+    purge: Callable[[list[UUID]], Any]  # ids -> statement
+
+
+def _child_cutoff(column, reference_time: datetime, days: int):
+    """``column`` is older than the shorter of ``days`` and the child's own retention period."""
+    child_cutoff = cast(literal(reference_time), DateTime) - func.make_interval(0, 0, 0, Child.data_retention_days)
+    return or_(column < reference_time - timedelta(days=days), column < child_cutoff)
+
+
+def _chat_with_child():
+    return (
+        select(ChatMessage.id, ChatMessage.audio_url.label("file"))
+        .join(LearningSession, LearningSession.id == ChatMessage.session_id)
+        .join(Child, Child.id == LearningSession.child_id)
+    )
+
+
+TARGETS = [
+    RetentionTarget(
+        name="audio_recordings",
+        policy=DataRetentionPolicy.AUDIO_RECORDINGS,
+        model=ChatMessage,
+        days=lambda: settings.AUDIO_RETENTION_DAYS,
+        candidates=lambda now, days: _chat_with_child().where(
+            ChatMessage.audio_url.is_not(None), _child_cutoff(ChatMessage.timestamp, now, days)
+        ),
+        purge=lambda ids: update(ChatMessage).where(ChatMessage.id.in_(ids)).values(audio_url=None),
+    ),
+    RetentionTarget(
+        name="chat_messages",
+        policy=DataRetentionPolicy.CHAT_MESSAGES,
+        model=ChatMessage,
+        days=lambda: settings.CHAT_RETENTION_DAYS,
+        candidates=lambda now, days: _chat_with_child().where(_child_cutoff(ChatMessage.timestamp, now, days)),
+        purge=lambda ids: delete(ChatMessage).where(ChatMessage.id.in_(ids)),
+    ),
+    RetentionTarget(
+        name="assessment_data",
+        policy=DataRetentionPolicy.ASSESSMENT_DATA,
+        model=AssessmentResult,
+        days=lambda: DataRetentionPolicy.ASSESSMENT_DATA.value,
+        candidates=lambda now, days: select(AssessmentResult.id, null().label("file")).where(
+            AssessmentResult.created_at < now - timedelta(days=days)
+        ),
+        purge=lambda ids: delete(AssessmentResult).where(AssessmentResult.id.in_(ids)),
+    ),
+    RetentionTarget(
+        # Sessions still referenced by messages or assessments are kept until those are purged
+        name="session_logs",
+        policy=DataRetentionPolicy.SESSION_LOGS,
+        model=LearningSession,
+        days=lambda: settings.SESSION_LOG_RETENTION_DAYS,
+        candidates=lambda now, days: select(LearningSession.id, null().label("file")).where(
+            LearningSession.created_at < now - timedelta(days=days),
+            ~exists().where(ChatMessage.session_id == LearningSession.id),
+            ~exists().where(AssessmentResult.session_id == LearningSession.id),
+        ),
+        purge=lambda ids: delete(LearningSession).where(LearningSession.id.in_(ids)),
+    ),
+]
+
+TARGETS_BY_NAME = {target.name: target for target in TARGETS}
+
+
+def _local_path(file_ref: str | None) -> Path | None:
+    """Resolve a stored file reference inside ``UPLOAD_DIR``; remote URLs and escapes are ignored."""
+    if not file_ref or "://" in file_ref:
+        return None
+    root = Path(settings.UPLOAD_DIR).resolve()
+    path = (root / file_ref.lstrip("/")).resolve()
+    return path if path.is_relative_to(root) else None
+
+
+def _remove_files(file_refs: list[str | None]) -> int:
+    """Delete the local files of a batch, returning how many existed."""
+    removed = 0
+    for file_ref in file_refs:
+        path = _local_path(file_ref)
+        if path is None:
+            continue
+        try:
+            path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+async def _replication_lag(db: AsyncSession) -> float:
+    """Worst replay lag of connected replicas in seconds (0 without replicas or monitoring rights)."""
+    lag = await db.scalar(
+        text("SELECT COALESCE(MAX(EXTRACT(EPOCH FROM replay_lag)), 0) FROM pg_stat_replication")
+    )
+    return float(lag or 0)
+
+
+async def _load_checkpoint(target: RetentionTarget) -> RetentionCheckpoint:
+    """Return the target's checkpoint, starting a new pass unless one is in progress."""
+    async with AsyncSessionLocal() as db:
+        checkpoint = await db.get(RetentionCheckpoint, target.name)
+        if checkpoint is None:
+            checkpoint = RetentionCheckpoint(target=target.name)
+        if checkpoint.reference_time is None or checkpoint.completed_at is not None:
+            now = datetime.utcnow()
+            checkpoint.last_id = None
+            checkpoint.reference_time = now
+            checkpoint.rows_purged = 0
+            checkpoint.files_purged = 0
+            checkpoint.started_at = now
+            checkpoint.completed_at = None
+        checkpoint.updated_at = datetime.utcnow()
+        db.add(checkpoint)
+        await db.commit()
+        return checkpoint
+
+
+async def _purge_batch(target: RetentionTarget, checkpoint: RetentionCheckpoint, batch_size: int) -> int:
+    """Purge the next batch of ``target`` and advance its checkpoint, returning the rows purged."""
+    id_column = target.model.id
+    query = target.candidates(checkpoint.reference_time, target.days())
+    if checkpoint.last_id is not None:
+        query = query.where(id_column > checkpoint.last_id)
+    query = query.order_by(id_column).limit(batch_size).with_for_update(of=target.model, skip_locked=True)
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(text(f"SET LOCAL lock_timeout = {int(settings.RETENTION_LOCK_TIMEOUT_MS)}"))
+        rows = (await db.execute(query)).all()
+        if not rows:
+            await db.execute(
+                update(RetentionCheckpoint)
+                .where(RetentionCheckpoint.target == target.name)
+                .values(last_id=None, completed_at=datetime.utcnow(), updated_at=datetime.utcnow())
+            )
+            await db.commit()
+            return 0
+
+        ids = [row.id for row in rows]
+        files_removed = await asyncio.to_thread(_remove_files, [row.file for row in rows])
+        await db.execute(target.purge(ids))
+        await db.execute(
+            update(RetentionCheckpoint)
+            .where(RetentionCheckpoint.target == target.name)
+            .values(
+                last_id=ids[-1],
+                rows_purged=RetentionCheckpoint.rows_purged + len(ids),
+                files_purged=RetentionCheckpoint.files_purged + files_removed,
+                updated_at=datetime.utcnow(),
+            )
+        )
+        await db.commit()
+
+    checkpoint.last_id = ids[-1]
+    return len(ids)
+
+
+async def purge_target(target: RetentionTarget, batch_size: int | None = None) -> int:
+    """Run (or resume) a pass over ``target`` at the configured throttle, returning the rows purged."""
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+    min_batch_seconds = batch_size / max(settings.RETENTION_ROWS_PER_SECOND, 1)
+    checkpoint = await _load_checkpoint(target)
+    purged = 0
+
+    while True:
+        started = time.monotonic()
+        for attempt in range(1, MAX_BATCH_ATTEMPTS + 1):
+            try:
+                batch = await _purge_batch(target, checkpoint, batch_size)
+                break
+            except DBAPIError as e:
+                # Typically a lock_timeout: back off instead of queueing behind application writes
+                logger.warning(f"Retention batch for {target.name} failed (attempt {attempt}): {e}")
+                await asyncio.sleep(attempt)
+        else:
+            logger.error(f"Retention pass for {target.name} stopped, resuming from checkpoint next run")
+            return purged
+
+        if batch == 0:
+            break
+        purged += batch
+
+        # Throttle to RETENTION_ROWS_PER_SECOND and wait for replicas to catch up
+        await asyncio.sleep(max(0.0, min_batch_seconds - (time.monotonic() - started)))
+        async with AsyncSessionLocal() as db:
+            while await _replication_lag(db) > settings.RETENTION_MAX_REPLICATION_LAG_SECONDS:
+                logger.info(f"Retention paused for {target.name}: replica lag above threshold")
+                await asyncio.sleep(5)
+
+    logger.info(f"Retention pass for {target.name} purged {purged} rows")
+    return purged
+
+
+async def dry_run_report(targets: list[RetentionTarget] | None = None) -> dict[str, Any]:
+    """Count what a pass would purge per target, without locking or changing anything."""
+    report = {}
+    async with AsyncSessionLocal() as db:
+        for target in targets or TARGETS:
+            checkpoint = await db.get(RetentionCheckpoint, target.name)
+            resuming = checkpoint is not None and checkpoint.completed_at is None and checkpoint.reference_time
+            reference_time = checkpoint.reference_time if resuming else datetime.utcnow()
+
+            candidates = target.candidates(reference_time, target.days())
+            if resuming and checkpoint.last_id is not None:
+                candidates = candidates.where(target.model.id > checkpoint.last_id)
+            candidates = candidates.subquery()
+            rows, files = (await db.execute(select(func.count(), func.count(candidates.c.file)))).one()
+
+            report[target.name] = {
+                "policy": target.policy.name,
+                "retentionDays": target.days(),
+                "referenceTime": reference_time.isoformat(),
+                "resuming": bool(resuming),
+                "rows": rows,
+                "files": files,
+            }
+    return report
+
+
+async def run_retention(target_names: list[str] | None = None) -> dict[str, int]:
+    """Run every (or the named) target once under the engine's advisory lock."""
+    targets = [TARGETS_BY_NAME[name] for name in target_names] if target_names else TARGETS
+    purged: dict[str, int] = {}
+
+    async with engine.connect() as lock_conn:
+        lock = await lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": RETENTION_LOCK_KEY})
+        acquired = lock.scalar()
+        if not acquired:
+            logger.info("Retention engine already running elsewhere, skipping")
+            return purged
+
+        try:
+            for target in targets:
+                purged[target.name] = await purge_target(target)
+        finally:
+            await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": RETENTION_LOCK_KEY})
+
+    return purged
+
+
+async def run_retention_scheduler() -> None:
+    """Run the retention engine on a fixed interval until cancelled."""
+    interval = settings.RETENTION_INTERVAL_MINUTES * 60
+    while True:
+        try:
+            await run_retention()
+        except Exception as e:
+            logger.error(f"Retention run failed: {e}")
+        await asyncio.sleep(interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Enforce data retention policies")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Purge expired data")
+    run_parser.add_argument("--dry-run", action="store_true", help="Only report what would be purged")
+    run_parser.add_argument("--target", action="append", choices=list(TARGETS_BY_NAME), help="Limit to target(s)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.dry_run:
+        targets = [TARGETS_BY_NAME[name] for name in args.target] if args.target else None
+        print(json.dumps(asyncio.run(dry_run_report(targets)), indent=2))
+    else:
+        print(json.dumps(asyncio.run(run_retention(args.target)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Prompting of tutor agents.
+
+Turns an agent's YAML configuration (persona, rules, guardrails and
+example exchanges) and a child's message into a provider request, and
+runs it on the model routed for the agent's tier.
+
+The system prompt is laid out for provider prompt caching: the agent's
+static instructions (persona, rules and guardrails) come first, in a
+fixed order and canonical form so they are byte-identical on every turn
+of every child, and are sent as the request's cacheable
+``system_prefix``. What changes per child or session (the child's name,
+lesson context and conversation summary) follows it.
+"""
+
+import functools
+import re
+import unicodedata
+from collections.abc import AsyncIterator
+
+from app.schemas.agent import AgentConfig
+from app.services import example_index, llm_providers
+from app.services.llm_providers import Completion
+
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def canonical(text: str) -> str:
+    """``text`` in NFC with unified line endings and no trailing or repeated blank space."""
+    text = unicodedata.normalize("NFC", text).replace("\r\n", "\n").replace("\r", "\n")
+    text = "\n".join(line.rstrip() for line in text.split("\n"))
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def _join(sections: list[str]) -> str:
+    return "\n\n".join(section for section in sections if section)
+
+
+@functools.lru_cache(maxsize=128)
+def static_prompt(agent: AgentConfig) -> str:
+    """Agent persona followed by its behavioural rules and content guardrails, identical on every turn."""
+    sections = [canonical(agent.systemPrompt)]
+    if agent.rules:
+        sections.append("\n".join(f"- {canonical(rule)}" for rule in agent.rules))
+    guardrails = agent.contentGuardrails + agent.religiousGuidelines
+    if guardrails:
+        sections.append("\n".join(f"- {canonical(guardrail)}" for guardrail in guardrails))
+    return _join(sections)
+
+
+def session_prompt(agent: AgentConfig, child_name: str | None = None, context: str | None = None) -> str:
+    """The part of the system prompt that depends on the child and the conversation ``context``."""
+    sections = []
+    if child_name:
+        sections.append(f"{agent.userPrefix or 'Child'}: {child_name}")
+    if context:
+        sections.append(canonical(context))
+    return _join(sections)
+
+
+def system_prompt(agent: AgentConfig, child_name: str | None = None, context: str | None = None) -> str:
+    """The whole system prompt, static part first."""
+    return _join([static_prompt(agent), session_prompt(agent, child_name, context)])
+
+
+def build_messages(
+    agent: AgentConfig,
+    user_message: str,
+    history: list[dict[str, str]] | None = None,
+    age_group: str | None = None,
+) -> list[dict[str, str]]:
+    """Example exchanges relevant to the message, then the conversation so far, then the child's message."""
+    messages = []
+    for example in example_index.select(agent, user_message, age_group):
+        messages.append({"role": "user", "content": example.input})
+        messages.append({"role": "assistant", "content": example.output})
+    messages.extend(history or [])
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
+
+async def reply(
+    agent: AgentConfig,
+    user_message: str,
+    history: list[dict[str, str]] | None = None,
+    child_name: str | None = None,
+    context: str | None = None,
+    age_group: str | None = None,
+    fair_key: str | None = None,
+) -> Completion:
+    """The agent's answer to ``user_message``; ``fair_key`` (the child) shares out provider capacity."""
+    return await llm_providers.complete_for_agent(
+        agent,
+        build_messages(agent, user_message, history, age_group),
+        session_prompt(agent, child_name, context),
+        static_prompt(agent),
+        fair_key,
+    )
+
+
+def stream_reply(
+    agent: AgentConfig,
+    user_message: str,
+    history: list[dict[str, str]] | None = None,
+    child_name: str | None = None,
+    context: str | None = None,
+    age_group: str | None = None,
+    fair_key: str | None = None,
+) -> AsyncIterator[str | Completion]:
+    """The agent's answer to ``user_message`` as text deltas, then the full ``Completion``."""
+    return llm_providers.stream_for_agent(
+        agent,
+        build_messages(agent, user_message, history, age_group),
+        session_prompt(agent, child_name, context),
+        static_prompt(agent),
+        fair_key,
+    )
@@ -0,0 +1,45 @@
+"""Child daily stats rollup migration
+Creates the per child, per day and per subject activity rollup read by dashboards and reports.
+Populate existing data afterwards with ``python -m app.services.daily_stats backfill``.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision = "002"
+down_revision = "001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create child_daily_stats table."""
+    op.create_table(
+        "child_daily_stats",
+        sa.Column("child_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("subject", sa.String(50), nullable=False),
+        sa.Column("sessions_started", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("sessions_completed", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("minutes", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("points", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("session_score_total", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("assessments_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("assessment_score_total", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("engagement_total", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("engagement_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP(), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False),
+        sa.ForeignKeyConstraint(["child_id"], ["children.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("child_id", "day", "subject"),
+    )
+
+    # Range scans by day across a guardian's children
+    op.create_index("idx_child_daily_stats_day", "child_daily_stats", ["day"])
+
+
+def downgrade():
+    """Drop child_daily_stats table."""
+    op.drop_index("idx_child_daily_stats_day")
+    op.drop_table("child_daily_stats")
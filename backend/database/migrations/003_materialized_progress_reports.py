@@ -0,0 +1,49 @@
+"""Materialized progress reports migration
+Adds the columns written by the scheduled report builder and a unique key per child, period and window.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision = "003"
+down_revision = "002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Align progress_reports with the materialized report model."""
+    op.add_column("progress_reports", sa.Column("total_time_spent", sa.Integer(), server_default="0"))
+    op.add_column("progress_reports", sa.Column("subject_progress", sa.Text(), server_default="{}"))
+    op.add_column("progress_reports", sa.Column("badges_earned", sa.Text(), server_default="[]"))
+    op.add_column("progress_reports", sa.Column("points_earned", sa.Integer(), server_default="0"))
+    op.add_column("progress_reports", sa.Column("parent_recommendations", sa.Text(), server_default="[]"))
+    op.add_column("progress_reports", sa.Column("celebrate_achievements", sa.Text(), server_default="[]"))
+    op.add_column("progress_reports", sa.Column("concern_areas", sa.Text(), server_default="[]"))
+    op.add_column("progress_reports", sa.Column("updated_at", sa.TIMESTAMP(timezone=True)))
+
+    # Builder upserts target one row per child, period and window
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_progress_reports_unique "
+        "ON progress_reports(child_id, report_period, start_date, end_date)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_progress_reports_period_date "
+        "ON progress_reports(child_id, report_period, end_date DESC)"
+    )
+
+
+def downgrade():
+    """Drop materialized report columns."""
+    op.execute("DROP INDEX IF EXISTS idx_progress_reports_period_date")
+    op.execute("DROP INDEX IF EXISTS idx_progress_reports_unique")
+
+    op.drop_column("progress_reports", "updated_at")
+    op.drop_column("progress_reports", "concern_areas")
+    op.drop_column("progress_reports", "celebrate_achievements")
+    op.drop_column("progress_reports", "parent_recommendations")
+    op.drop_column("progress_reports", "points_earned")
+    op.drop_column("progress_reports", "badges_earned")
+    op.drop_column("progress_reports", "subject_progress")
+    op.drop_column("progress_reports", "total_time_spent")
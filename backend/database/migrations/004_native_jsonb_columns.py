@@ -0,0 +1,82 @@
+"""Native JSONB columns migration
+Converts JSON-in-text model fields to JSONB (adding any that are missing) and indexes lesson tags and keywords.
+Columns that are already JSONB are left untouched, so this is safe on databases created by 001 or by create_all.
+"""
+
+from alembic import op
+
+# revision identifiers
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+# table -> column -> JSON default
+JSONB_COLUMNS = {
+    "children": {"enabled_subjects": '["arabic"]'},
+    "lessons": {"objectives": "[]", "keywords": "[]", "prerequisites": "[]", "unlocks": "[]", "tags": "[]"},
+    "activities": {"content": "{}"},
+    "sessions": {"activities_completed": "[]", "badges_earned": "[]", "device_info": "{}"},
+    "chat_messages": {"message_metadata": "{}"},
+    "assessment_results": {
+        "skill_scores": "{}",
+        "strengths": "[]",
+        "areas_for_improvement": "[]",
+        "recommendations": "[]",
+        "mastered_skills": "[]",
+        "struggling_skills": "[]",
+    },
+    "progress_reports": {
+        "subject_progress": "{}",
+        "badges_earned": "[]",
+        "parent_recommendations": "[]",
+        "celebrate_achievements": "[]",
+        "concern_areas": "[]",
+    },
+}
+
+
+def _convert_to_jsonb(table: str, column: str, default: str):
+    op.execute(f"""
+    DO $$
+    DECLARE
+        current_type text;
+    BEGIN
+        IF to_regclass('{table}') IS NULL THEN
+            RETURN;
+        END IF;
+
+        SELECT data_type INTO current_type
+        FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = '{table}' AND column_name = '{column}';
+
+        IF current_type IS NULL THEN
+            ALTER TABLE {table} ADD COLUMN {column} JSONB NOT NULL DEFAULT '{default}'::jsonb;
+        ELSIF current_type <> 'jsonb' THEN
+            ALTER TABLE {table} ALTER COLUMN {column} DROP DEFAULT;
+            ALTER TABLE {table} ALTER COLUMN {column} TYPE JSONB
+                USING COALESCE(NULLIF({column}, ''), '{default}')::jsonb;
+        END IF;
+
+        UPDATE {table} SET {column} = '{default}'::jsonb WHERE {column} IS NULL;
+        ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT '{default}'::jsonb;
+        ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL;
+    END $$;
+    """)
+
+
+def upgrade():
+    """Convert JSON text columns to JSONB and add GIN indexes."""
+    for table, columns in JSONB_COLUMNS.items():
+        for column, default in columns.items():
+            _convert_to_jsonb(table, column, default)
+
+    # Containment filters on the lesson catalogue (tags @> '["..."]')
+    op.execute("CREATE INDEX IF NOT EXISTS idx_lessons_tags_gin ON lessons USING GIN (tags jsonb_path_ops)")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_lessons_keywords_gin ON lessons USING GIN (keywords jsonb_path_ops)")
+
+
+def downgrade():
+    """Drop GIN indexes (JSONB columns are kept, they are compatible with 001)."""
+    op.execute("DROP INDEX IF EXISTS idx_lessons_keywords_gin")
+    op.execute("DROP INDEX IF EXISTS idx_lessons_tags_gin")
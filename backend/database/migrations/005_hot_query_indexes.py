@@ -0,0 +1,36 @@
+"""Hot query indexes migration
+Adds covering indexes for the newest-first session and assessment history of a child.
+Indexes are built concurrently so the migration does not block writes on large tables.
+"""
+
+from alembic import op
+
+# revision identifiers
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "idx_sessions_child_created_cover": (
+        "sessions (child_id, created_at) "
+        "INCLUDE (id, subject, status, final_score, points_earned, time_spent, engagement_level)"
+    ),
+    "idx_assessment_results_child_created_cover": (
+        "assessment_results (child_id, created_at) INCLUDE (id, subject, overall_score)"
+    ),
+}
+
+
+def upgrade():
+    """Create covering indexes for hot read paths."""
+    with op.get_context().autocommit_block():
+        for name, definition in INDEXES.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}")
+
+
+def downgrade():
+    """Drop covering indexes."""
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
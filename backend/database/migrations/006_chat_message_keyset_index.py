@@ -0,0 +1,26 @@
+"""Chat message keyset index migration
+Adds the (session_id, timestamp, id) index that serves paginated and streamed session transcripts.
+"""
+
+from alembic import op
+
+# revision identifiers
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create the transcript keyset index."""
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chat_messages_session_timestamp_id "
+            "ON chat_messages (session_id, timestamp, id)"
+        )
+
+
+def downgrade():
+    """Drop the transcript keyset index."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_chat_messages_session_timestamp_id")
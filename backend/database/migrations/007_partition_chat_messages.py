@@ -0,0 +1,126 @@
+"""Partition chat messages migration
+Turns chat_messages into a table range-partitioned by timestamp (daily partitions).
+The existing table is attached as-is as a legacy partition covering everything before
+the day after tomorrow, so no rows are copied; it is dropped by partition maintenance once
+all of its rows fall outside CHAT_RETENTION_DAYS. New daily partitions are pre-created here
+and afterwards by ``python -m app.services.chat_partitions maintain``.
+
+Everything that reads the whole table runs first, without blocking chat reads and writes:
+NULL timestamps are filled in, the (id, timestamp) unique index the partitioned primary key
+needs is built CONCURRENTLY, and a NOT VALID CHECK matching the legacy partition's range is
+validated under a SHARE UPDATE EXCLUSIVE lock. Only the renames, SET NOT NULL (proven by the
+CHECK) and the ATTACH (which reuses the index and skips its scan thanks to the CHECK) run
+under the ACCESS EXCLUSIVE lock, so chat is blocked for moments, not for the table's size.
+"""
+
+from datetime import UTC, datetime, timedelta
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+# Days of daily partitions created ahead of the migration date
+PREMAKE_DAYS = 14
+
+LEGACY_INDEX = "chat_messages_legacy_id_timestamp_key"
+LEGACY_CHECK = "chat_messages_legacy_range"
+
+
+def _scalar(sql: str):
+    return op.get_bind().execute(sa.text(sql)).scalar()
+
+
+def upgrade():
+    """Partition chat_messages by timestamp, keeping existing rows in a legacy partition."""
+    if _scalar("SELECT relkind FROM pg_class WHERE oid = to_regclass('chat_messages')") == "p":
+        return
+
+    # The legacy range ends a day after tomorrow, leaving a day's margin for messages
+    # written while the CHECK below is enforced and the migration is still running
+    first_day = datetime.now(UTC).date() + timedelta(days=2)
+
+    with op.get_context().autocommit_block():
+        # The partition key must be part of every unique constraint
+        op.execute("UPDATE chat_messages SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL")
+
+        # Left INVALID by an interrupted earlier run
+        if _scalar(f"SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass('{LEGACY_INDEX}')"):
+            op.execute(f"DROP INDEX CONCURRENTLY {LEGACY_INDEX}")
+        op.execute(f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {LEGACY_INDEX} ON chat_messages (id, timestamp)")
+
+        if _scalar(f"SELECT count(*) FROM pg_constraint WHERE conname = '{LEGACY_CHECK}'"):
+            op.execute(f"ALTER TABLE chat_messages DROP CONSTRAINT {LEGACY_CHECK}")
+        op.execute(
+            f"ALTER TABLE chat_messages ADD CONSTRAINT {LEGACY_CHECK} "
+            f"CHECK (timestamp IS NOT NULL AND timestamp < '{first_day}') NOT VALID"
+        )
+        op.execute(f"ALTER TABLE chat_messages VALIDATE CONSTRAINT {LEGACY_CHECK}")
+
+    op.execute(f"""
+    DO $$
+    DECLARE
+        first_day date := '{first_day}';
+        day date;
+    BEGIN
+        LOCK TABLE chat_messages IN ACCESS EXCLUSIVE MODE;
+
+        -- Free the names the partitioned parent will use
+        ALTER TABLE chat_messages RENAME TO chat_messages_legacy;
+        ALTER TABLE chat_messages_legacy RENAME CONSTRAINT chat_messages_pkey TO chat_messages_legacy_pkey;
+        ALTER INDEX IF EXISTS idx_chat_messages_session_timestamp_id
+            RENAME TO chat_messages_legacy_session_timestamp_id_idx;
+
+        -- No scan: implied by the validated CHECK
+        ALTER TABLE chat_messages_legacy ALTER COLUMN timestamp SET NOT NULL;
+
+        CREATE TABLE chat_messages (LIKE chat_messages_legacy INCLUDING DEFAULTS)
+            PARTITION BY RANGE (timestamp);
+        ALTER TABLE chat_messages ADD PRIMARY KEY (id, timestamp);
+        ALTER TABLE chat_messages
+            ADD FOREIGN KEY (session_id) REFERENCES sessions (id) ON DELETE CASCADE;
+        CREATE INDEX idx_chat_messages_session_timestamp_id ON chat_messages (session_id, timestamp, id);
+
+        -- Reuses the legacy indexes and foreign key; the CHECK proves the range without a scan
+        EXECUTE format(
+            'ALTER TABLE chat_messages ATTACH PARTITION chat_messages_legacy FOR VALUES FROM (MINVALUE) TO (%L)',
+            first_day
+        );
+        ALTER TABLE chat_messages_legacy DROP CONSTRAINT {LEGACY_CHECK};
+
+        FOR day IN SELECT generate_series(first_day, first_day + {PREMAKE_DAYS}, interval '1 day')::date LOOP
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF chat_messages FOR VALUES FROM (%L) TO (%L)',
+                'chat_messages_p' || to_char(day, 'YYYYMMDD'), day, day + 1
+            );
+        END LOOP;
+    END $$;
+    """)
+
+
+def downgrade():
+    """Copy every partition back into a plain chat_messages table."""
+    op.execute("""
+    DO $$
+    BEGIN
+        IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('chat_messages')) <> 'p' THEN
+            RETURN;
+        END IF;
+
+        ALTER TABLE chat_messages RENAME TO chat_messages_partitioned;
+        ALTER INDEX idx_chat_messages_session_timestamp_id RENAME TO chat_messages_partitioned_keyset_idx;
+
+        CREATE TABLE chat_messages (LIKE chat_messages_partitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS);
+        INSERT INTO chat_messages SELECT * FROM chat_messages_partitioned;
+        DROP TABLE chat_messages_partitioned CASCADE;
+
+        ALTER TABLE chat_messages ADD PRIMARY KEY (id);
+        ALTER TABLE chat_messages
+            ADD FOREIGN KEY (session_id) REFERENCES sessions (id) ON DELETE CASCADE;
+        CREATE INDEX idx_chat_messages_session_timestamp_id ON chat_messages (session_id, timestamp, id);
+    END $$;
+    """)
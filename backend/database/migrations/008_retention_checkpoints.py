@@ -0,0 +1,34 @@
+"""Retention checkpoints migration
+Creates the table holding the retention engine's resumable progress per data type.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create retention_checkpoints table."""
+    op.create_table(
+        "retention_checkpoints",
+        sa.Column("target", sa.String(50), nullable=False),
+        sa.Column("last_id", postgresql.UUID(as_uuid=True)),
+        sa.Column("reference_time", sa.TIMESTAMP()),
+        sa.Column("rows_purged", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("files_purged", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("started_at", sa.TIMESTAMP()),
+        sa.Column("updated_at", sa.TIMESTAMP(), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False),
+        sa.Column("completed_at", sa.TIMESTAMP()),
+        sa.PrimaryKeyConstraint("target"),
+    )
+
+
+def downgrade():
+    """Drop retention_checkpoints table."""
+    op.drop_table("retention_checkpoints")
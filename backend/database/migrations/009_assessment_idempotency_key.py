@@ -0,0 +1,28 @@
+"""Assessment idempotency key migration
+Adds the client supplied idempotency key used to deduplicate bulk assessment uploads.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision = "009"
+down_revision = "008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add assessment_results.idempotency_key with a per-child unique index."""
+    op.add_column("assessment_results", sa.Column("idempotency_key", sa.String(100)))
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_assessment_results_idempotency_key "
+            "ON assessment_results (child_id, idempotency_key) WHERE idempotency_key IS NOT NULL"
+        )
+
+
+def downgrade():
+    """Drop assessment_results.idempotency_key."""
+    op.execute("DROP INDEX IF EXISTS idx_assessment_results_idempotency_key")
+    op.drop_column("assessment_results", "idempotency_key")
@@ -0,0 +1,27 @@
+"""Session context summary migration
+Adds the running summary of compacted chat turns to sessions.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision = "010"
+down_revision = "009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add sessions.context_summary and the position of the last summarized message."""
+    op.add_column("sessions", sa.Column("context_summary", sa.Text()))
+    op.add_column("sessions", sa.Column("summary_through", sa.DateTime()))
+    op.add_column("sessions", sa.Column("summary_through_id", postgresql.UUID(as_uuid=True)))
+
+
+def downgrade():
+    """Drop the session context summary columns."""
+    op.drop_column("sessions", "summary_through_id")
+    op.drop_column("sessions", "summary_through")
+    op.drop_column("sessions", "context_summary")
@@ -0,0 +1,28 @@
+"""Calendar progress report windows migration
+Deletes weekly and monthly reports built over rolling windows, which the builder no longer refreshes.
+"""
+
+from alembic import op
+
+# revision identifiers
+revision = "011"
+down_revision = "010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Keep only reports covering a calendar week (Monday to Sunday) or a calendar month."""
+    op.execute(
+        "DELETE FROM progress_reports WHERE report_period = 'weekly' "
+        "AND (extract(isodow FROM start_date) <> 1 OR end_date <> start_date + 6)"
+    )
+    op.execute(
+        "DELETE FROM progress_reports WHERE report_period = 'monthly' "
+        "AND (extract(day FROM start_date) <> 1 "
+        "OR end_date <> (date_trunc('month', start_date) + interval '1 month - 1 day')::date)"
+    )
+
+
+def downgrade():
+    """Rolling-window reports are rebuilt by the builder; nothing to restore."""
@@ -0,0 +1,29 @@
+"""Chat messages default partition migration
+Adds a default partition to chat_messages for rows outside the daily partitions.
+Without it, inserts fail when no daily partition covers their timestamp.
+"""
+
+from alembic import op
+
+# revision identifiers
+revision = "012"
+down_revision = "011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create chat_messages_default when chat_messages is partitioned."""
+    op.execute("""
+    DO $$
+    BEGIN
+        IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('chat_messages')) = 'p' THEN
+            CREATE TABLE IF NOT EXISTS chat_messages_default PARTITION OF chat_messages DEFAULT;
+        END IF;
+    END $$;
+    """)
+
+
+def downgrade():
+    """Drop the default partition, with any rows still in it."""
+    op.execute("DROP TABLE IF EXISTS chat_messages_default")
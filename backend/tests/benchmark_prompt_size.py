@@ -0,0 +1,83 @@
+"""Few-shot prompt size benchmark.
+
+Gives each repository agent a long list of example exchanges (its own
+plus generated ones) and compares, over a set of child messages, the
+estimated prompt tokens of sending every example with those of sending
+the ones ``example_index`` selects, along with the time selection takes.
+
+Run from ``backend/`` with:
+
+    python -m tests.benchmark_prompt_size [--examples 60]
+"""
+
+import argparse
+import statistics
+import time
+
+from app.core.config import settings
+from app.schemas.agent import AgentExample
+from app.services import tutor_chat
+from app.services.agent_registry import AgentRegistry
+from app.services.example_index import ExampleIndex, example_tokens
+from app.services.prompt_text import estimate_tokens, message_tokens
+
+TOPICS = {
+    "ar": ["حرف الألف", "حرف الباء", "حرف التاء", "الأرقام", "الألوان", "الحيوانات", "الفواكه", "أيام الأسبوع"],
+    "en": ["the letter A", "the letter B", "numbers", "colours", "animals", "fruit", "the days of the week", "shapes"],
+}
+TEMPLATES = {
+    "ar": ["ما هو {topic}؟", "علمني {topic}", "احكي لي عن {topic}", "أعطني مثالاً على {topic}"],
+    "en": ["What is {topic}?", "Teach me {topic}", "Tell me about {topic}", "Give me an example of {topic}"],
+}
+QUERIES = {
+    "ar": ["علّمني حَرْف البَاء", "كم يوماً في الأسبوع؟", "ما لون التفاحة؟", "احكي لي قصة عن الحيوانات"],
+    "en": [
+        "teach me the letter b",
+        "how many days are in a week?",
+        "what colour is an apple?",
+        "a story about animals",
+    ],
+}
+
+
+def examples_for(language: str, count: int, output: str) -> tuple[AgentExample, ...]:
+    language = language if language in TOPICS else "ar"
+    inputs = [template.format(topic=topic) for topic in TOPICS[language] for template in TEMPLATES[language]]
+    return tuple(AgentExample(input=inputs[i % len(inputs)], output=output) for i in range(count))
+
+
+def prompt_tokens(agent, message: str, examples) -> int:
+    """Estimated tokens of a first-turn prompt carrying ``examples``."""
+    system = estimate_tokens(tutor_chat.system_prompt(agent))
+    return system + sum(example_tokens(example) for example in examples) + message_tokens(message)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark few-shot example selection")
+    parser.add_argument("--examples", type=int, default=60, help="Examples per agent")
+    args = parser.parse_args()
+
+    print(f"{'agent':<10}{'all tokens':>12}{'selected':>12}{'saved':>8}{'select us':>12}")
+    for agent in AgentRegistry().all():
+        output = max((example.output for example in agent.examples), key=len, default="...")
+        examples = agent.examples + examples_for(agent.language, args.examples, output)
+        index = ExampleIndex(examples)
+        queries = QUERIES.get(agent.language, QUERIES["ar"])
+
+        full, selected, timings = [], [], []
+        for query in queries:
+            started = time.perf_counter()
+            chosen = index.select(query, None, settings.FEW_SHOT_MAX_EXAMPLES, settings.FEW_SHOT_TOKEN_BUDGET)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+            full.append(prompt_tokens(agent, query, examples))
+            selected.append(prompt_tokens(agent, query, chosen))
+
+        saved = 1 - statistics.mean(selected) / statistics.mean(full)
+        print(
+            f"{agent.id:<10}{statistics.mean(full):>12.0f}{statistics.mean(selected):>12.0f}"
+            f"{saved:>8.0%}{statistics.median(timings):>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Worker startup benchmark.
+
+Each run starts a fresh interpreter (so nothing is already imported or
+cached) and times the three phases of a worker coming up:
+
+* import: ``import app.main``
+* engine: creating an async engine, plus its first connection and
+  ``init_db`` when a database is reachable
+* first_request: the first ``GET /health`` through the ASGI app
+
+Run from ``backend/`` with:
+
+    python -m tests.benchmark_startup [--runs 5] [--mode verify]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PHASES = ("import", "engine", "connect", "init_db", "first_request")
+
+# Executed in a fresh interpreter per run; prints one JSON object of timings in ms
+_RUN = r"""
+import asyncio, json, time
+
+timings = {}
+started = time.perf_counter()
+import app.main
+timings["import"] = (time.perf_counter() - started) * 1000
+
+
+async def run():
+    import httpx
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.core.database import engine as app_engine, init_db
+
+    started = time.perf_counter()
+    engine = create_async_engine(app_engine.url)
+    timings["engine"] = (time.perf_counter() - started) * 1000
+
+    try:
+        started = time.perf_counter()
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        timings["connect"] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        await init_db()
+        timings["init_db"] = (time.perf_counter() - started) * 1000
+    except Exception as e:
+        timings["error"] = f"database unavailable: {e.__class__.__name__}"
+    finally:
+        await engine.dispose()
+
+    transport = httpx.ASGITransport(app=app.main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+        started = time.perf_counter()
+        response = await client.get("/health")
+        timings["first_request"] = (time.perf_counter() - started) * 1000
+        response.raise_for_status()
+
+
+asyncio.run(run())
+print(json.dumps(timings))
+"""
+
+
+def run_once(mode: str | None) -> dict:
+    env = dict(os.environ)
+    if mode:
+        env["DB_STARTUP_MODE"] = mode
+    result = subprocess.run([sys.executable, "-c", _RUN], env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark API worker startup")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start")
+    parser.add_argument("--mode", choices=["create_all", "verify"], help="DB_STARTUP_MODE to benchmark")
+    args = parser.parse_args()
+
+    runs = [run_once(args.mode) for _ in range(args.runs)]
+    errors = {run["error"] for run in runs if "error" in run}
+
+    print(f"{'phase':<15}{'median ms':>12}{'max ms':>12}")
+    for phase in PHASES:
+        samples = [run[phase] for run in runs if phase in run]
+        if samples:
+            print(f"{phase:<15}{statistics.median(samples):>12.1f}{max(samples):>12.1f}")
+        else:
+            print(f"{phase:<15}{'-':>12}{'-':>12}")
+    for error in errors:
+        print(f"note: {error}")
+
+
+if __name__ == "__main__":
+    main()
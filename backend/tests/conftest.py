@@ -0,0 +1,58 @@
+"""Shared fixtures for the backend test suite."""
+
+import os
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+import app.models  # noqa: F401  (registers every table on SQLModel.metadata)
+from app.core.config import settings
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", settings.DATABASE_URL)
+
+
+@pytest.fixture(scope="session")
+def pg_schema():
+    """Name of a throwaway schema holding every table, skipped when Postgres is unreachable."""
+    admin = create_engine(TEST_DATABASE_URL)
+    try:
+        with admin.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except OperationalError:
+        admin.dispose()
+        pytest.skip(f"Postgres not reachable at {TEST_DATABASE_URL}")
+
+    schema = f"test_{uuid4().hex[:12]}"
+    with admin.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+    try:
+        yield schema
+    finally:
+        with admin.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        admin.dispose()
+
+
+@pytest.fixture(scope="session")
+def pg_engine(pg_schema):
+    """Synchronous engine bound to the throwaway schema."""
+    engine = create_engine(TEST_DATABASE_URL, connect_args={"options": f"-csearch_path={pg_schema}"})
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def async_pg_engine(pg_engine, pg_schema):
+    """Async (asyncpg) engine bound to the throwaway schema, as used by the application."""
+    engine = create_async_engine(
+        TEST_DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"),
+        connect_args={"server_settings": {"search_path": pg_schema}},
+    )
+    yield engine
+    await engine.dispose()
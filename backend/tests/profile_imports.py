@@ -0,0 +1,107 @@
+"""Import-time profile of the API worker.
+
+Imports a module in a fresh interpreter under ``-X importtime`` and
+reports the slowest modules by cumulative and self time, plus self time
+summed per top-level package. Run from ``backend/`` with:
+
+    python -m tests.profile_imports [--module app.main] [--top 20]
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+# Executed in a fresh interpreter; prints import time, peak RSS and the loaded modules
+_MEASURE = r"""
+import json, resource, sys, time
+
+started = time.perf_counter()
+import {module}
+elapsed_ms = (time.perf_counter() - started) * 1000
+print(json.dumps({{
+    "import_ms": elapsed_ms,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": sorted(sys.modules),
+}}))
+"""
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> list[ImportRecord]:
+    """Parse ``-X importtime`` stderr output."""
+    records = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append(ImportRecord(module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return records
+
+
+def profile(module: str = "app.main") -> list[ImportRecord]:
+    """Import ``module`` in a fresh interpreter under ``-X importtime``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=True
+    )
+    return parse_importtime(result.stderr)
+
+
+def measure(module: str = "app.main") -> dict:
+    """Wall-clock import time (ms), peak RSS (MB) and loaded modules of importing ``module`` fresh.
+
+    Peak RSS comes from ``resource``, so this only works on Unix.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", _MEASURE.format(module=module)], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def package_totals(records: list[ImportRecord]) -> dict[str, int]:
+    """Self time in microseconds summed per top-level package."""
+    totals: dict[str, int] = defaultdict(int)
+    for record in records:
+        totals[record.module.split(".")[0]] += record.self_us
+    return dict(totals)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Profile import time of the API worker")
+    parser.add_argument("--module", default="app.main", help="Module to import")
+    parser.add_argument("--top", type=int, default=20, help="Rows per table")
+    args = parser.parse_args()
+
+    records = profile(args.module)
+    stats = measure(args.module)
+    summary = f"{stats['import_ms']:.0f} ms, peak RSS {stats['max_rss_mb']:.0f} MB, {len(stats['modules'])} modules"
+    print(f"{args.module}: {summary}")
+
+    print(f"\n{'cumulative ms':>14}{'self ms':>10}  module")
+    for record in sorted(records, key=lambda r: r.cumulative_us, reverse=True)[: args.top]:
+        print(f"{record.cumulative_us / 1000:>14.1f}{record.self_us / 1000:>10.1f}  {record.module}")
+
+    print(f"\n{'self ms':>14}  module")
+    for record in sorted(records, key=lambda r: r.self_us, reverse=True)[: args.top]:
+        print(f"{record.self_us / 1000:>14.1f}  {record.module}")
+
+    print(f"\n{'self ms':>14}  package")
+    totals = sorted(package_totals(records).items(), key=lambda item: item[1], reverse=True)
+    for package, self_us in totals[: args.top]:
+        print(f"{self_us / 1000:>14.1f}  {package}")
+
+
+if __name__ == "__main__":
+    main()
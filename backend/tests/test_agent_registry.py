@@ -0,0 +1,65 @@
+import json
+import os
+
+import pytest
+from pydantic import ValidationError
+
+from app.services.agent_registry import AgentRegistry
+
+
+def _write_agent(directory, agent_id, name, mtime=None):
+    path = directory / f"{agent_id}.yaml"
+    path.write_text(f'name: "{name}"\nsubject: "{agent_id}"\nmodelTier: "standard"\n', encoding="utf-8")
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+    return path
+
+
+def test_repository_agents_are_valid():
+    registry = AgentRegistry()
+    registry.load()
+
+    assert {agent.id for agent in registry.all()} == {"arabic", "english", "islamic"}
+    listing = json.loads(registry.listing().body)
+    assert [agent["id"] for agent in listing] == ["arabic", "english", "islamic"]
+    details = json.loads(registry.details("arabic").body)
+    assert details["name"] == registry.get("arabic").name
+    assert details["examples"] and details["systemPrompt"]
+
+
+def test_configs_are_immutable():
+    registry = AgentRegistry()
+    with pytest.raises(ValidationError):
+        registry.get("arabic").temperature = 2
+
+
+@pytest.mark.asyncio
+async def test_reloads_when_files_change(tmp_path):
+    _write_agent(tmp_path, "math", "Mr. Numbers", mtime=1_000_000_000)
+    registry = AgentRegistry(tmp_path)
+    registry.load()
+    assert await registry.reload_if_changed() is False
+
+    _write_agent(tmp_path, "math", "Mrs. Numbers", mtime=2_000_000_000)
+    _write_agent(tmp_path, "science", "Dr. Atoms")
+    assert await registry.reload_if_changed() is True
+    assert registry.get("math").name == "Mrs. Numbers"
+    assert [agent["id"] for agent in json.loads(registry.listing().body)] == ["math", "science"]
+
+    (tmp_path / "science.yaml").unlink()
+    assert await registry.reload_if_changed() is True
+    assert registry.get("science") is None
+    assert registry.details("science") is None
+
+
+@pytest.mark.asyncio
+async def test_invalid_change_keeps_previous_version(tmp_path):
+    _write_agent(tmp_path, "math", "Mr. Numbers", mtime=1_000_000_000)
+    registry = AgentRegistry(tmp_path)
+    registry.load()
+    rendered = registry.details("math")
+
+    (tmp_path / "math.yaml").write_text('name: "Broken"\ntemperature: 9\n', encoding="utf-8")
+    assert await registry.reload_if_changed() is True
+    assert registry.get("math").name == "Mr. Numbers"
+    assert registry.details("math").body == rendered.body
@@ -0,0 +1,147 @@
+"""Bulk assessment ingestion: payload parsing, row validation, ownership and idempotent retries."""
+
+import json
+from datetime import date
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.child import Child
+from app.models.guardian import Guardian
+from app.models.lesson import Lesson
+from app.models.session import Session as LearningSession
+from app.services import assessment_ingest
+from app.services.assessment_ingest import PayloadError, parse_payload
+
+
+def _record(child_id, session_id, **fields):
+    return {"childId": str(child_id), "sessionId": str(session_id), "subject": "arabic", "overallScore": 80, **fields}
+
+
+def test_parses_json_arrays_and_ndjson():
+    rows = [_record(uuid4(), uuid4()), _record(uuid4(), uuid4(), idempotencyKey="k")]
+    assert parse_payload(json.dumps(rows).encode(), "application/json") == rows
+
+    ndjson = "\n".join(json.dumps(row) for row in rows) + "\n\n"
+    assert parse_payload(ndjson.encode(), "application/x-ndjson") == rows
+
+    # A broken NDJSON line is reported against its own row
+    items = parse_payload(b'{"a": 1}\n{not json\n', "application/jsonl")
+    assert items[0] == {"a": 1} and isinstance(items[1], PayloadError) and "Line 2" in str(items[1])
+
+
+@pytest.mark.parametrize("body", [b"", b"{not json", b'{"childId": "x"}', b'"rows"'])
+def test_rejects_bodies_that_are_not_json_arrays(body):
+    with pytest.raises(PayloadError):
+        parse_payload(body, "application/json")
+
+
+def test_rejects_payloads_over_the_row_limit(monkeypatch):
+    monkeypatch.setattr(settings, "ASSESSMENT_BULK_MAX_ROWS", 2)
+    assert len(parse_payload(b"[{}, {}]", "application/json")) == 2
+    with pytest.raises(PayloadError, match="At most 2"):
+        parse_payload(b"[{}, {}, {}]", "application/json")
+    with pytest.raises(PayloadError, match="At most 2"):
+        parse_payload(b"{}\n{}\n{}\n", "application/x-ndjson")
+
+
+def test_validates_each_row():
+    child_id, session_id = uuid4(), uuid4()
+    items = [
+        _record(child_id, session_id, idempotencyKey="a"),
+        _record(child_id, session_id, overallScore=101),
+        {"childId": "not-a-uuid", "sessionId": str(session_id)},
+        PayloadError("Line 4 is not valid JSON"),
+        _record(child_id, session_id, idempotencyKey="a"),
+        _record(uuid4(), session_id, idempotencyKey="a"),  # Same key, other child
+    ]
+
+    records, errors = assessment_ingest._validate(items)
+    assert sorted(records) == [0, 5]
+    assert errors[1] == ["overallScore: Input should be less than or equal to 100"]
+    assert any(error.startswith("childId:") for error in errors[2])
+    assert any(error.startswith("subject:") for error in errors[2])
+    assert errors[3] == ["Line 4 is not valid JSON"]
+    assert errors[4] == ["idempotencyKey repeats row 0"]
+
+
+@pytest.fixture
+def make_session(async_pg_engine):
+    return sessionmaker(async_pg_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def _seed(make_session):
+    """A guardian's child with a session, and another guardian's child with a session."""
+    seeded = []
+    async with make_session() as db:
+        for _ in range(2):
+            guardian = Guardian(
+                email=f"{uuid4().hex}@example.com", hashed_password="x", first_name="G", last_name="T"
+            )
+            child = Child(guardian_id=guardian.id, first_name="C", birth_date=date(2019, 1, 1), age_group="6-8")
+            lesson = Lesson(
+                title="L",
+                description="L",
+                subject="arabic",
+                age_group="6-8",
+                difficulty="beginner",
+                estimated_duration=10,
+            )
+            learning_session = LearningSession(
+                child_id=child.id, lesson_id=lesson.id, subject="arabic", agent_id="agent"
+            )
+            db.add(guardian)
+            await db.flush()
+            db.add_all([child, lesson])
+            await db.flush()
+            db.add(learning_session)
+            await db.flush()
+            seeded.append((guardian, child, learning_session))
+        await db.commit()
+    return seeded
+
+
+@pytest.mark.asyncio
+async def test_ingest_checks_ownership_and_skips_retried_rows(make_session):
+    (guardian, child, learning_session), (_, other_child, other_session) = await _seed(make_session)
+    items = [
+        _record(child.id, learning_session.id, idempotencyKey="first"),
+        _record(child.id, learning_session.id, idempotencyKey="second", overallScore=60),
+        _record(child.id, learning_session.id),  # No key: stored every time
+        _record(other_child.id, other_session.id, idempotencyKey="first"),
+        _record(child.id, other_session.id, idempotencyKey="third"),
+    ]
+
+    async with make_session() as db:
+        report = await assessment_ingest.ingest(db, guardian.id, items)
+    assert (report["created"], report["duplicates"], report["errors"]) == (3, 0, 2)
+    assert [row["status"] for row in report["results"]] == ["created"] * 3 + ["error"] * 2
+    assert report["results"][3]["errors"] == ["Child not found"]
+    assert report["results"][4]["errors"] == ["Session not found for child"]
+
+    # A retried upload gets the original ids back for keyed rows
+    async with make_session() as db:
+        retry = await assessment_ingest.ingest(db, guardian.id, items[:3])
+    assert (retry["created"], retry["duplicates"], retry["errors"]) == (1, 2, 0)
+    for original, retried in zip(report["results"][:2], retry["results"][:2]):
+        assert retried == {**original, "status": "duplicate"}
+
+    async with make_session() as db:
+        stored = await db.scalar(
+            text("SELECT count(*) FROM assessment_results WHERE child_id = :child_id"), {"child_id": child.id}
+        )
+        rollup = (
+            await db.execute(
+                text(
+                    "SELECT sum(assessments_count), sum(assessment_score_total) "
+                    "FROM child_daily_stats WHERE child_id = :child_id"
+                ),
+                {"child_id": child.id},
+            )
+        ).one()
+    assert stored == 4
+    assert tuple(rollup) == (4, 80 + 60 + 80 + 80)
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app.services import chat_context, llm_providers
+from app.services.agent_registry import AgentRegistry
+from app.services.llm_providers import Completion
+
+LESSON = {"title": "حرف الباء", "subject": "arabic", "keywords": ["الحروف", "الباء"]}
+
+
+def _messages(count: int, length: int = 300) -> list[SimpleNamespace]:
+    start = datetime(2026, 1, 1)
+    return [
+        SimpleNamespace(
+            id=uuid4(),
+            role="child" if index % 2 == 0 else "agent",
+            content=f"{index} " + "ب" * length,
+            timestamp=start + timedelta(seconds=index),
+        )
+        for index in range(count)
+    ]
+
+
+def test_short_conversation_is_sent_whole():
+    agent = AgentRegistry().get("arabic")
+    messages = _messages(4)
+
+    window = chat_context.fit(agent, "ما هذا الحرف؟", messages, lesson=LESSON)
+
+    assert [turn["content"] for turn in window.history] == [message.content for message in messages]
+    assert window.history[0]["role"] == "user" and window.history[1]["role"] == "assistant"
+    assert window.compactable == []
+    assert window.context == "نحن نتعلم الحروف، الباء في درس حرف الباء"
+
+
+def test_long_conversation_keeps_newest_within_budget():
+    agent = AgentRegistry().get("arabic")
+    messages = _messages(200)
+
+    window = chat_context.fit(agent, "ما هذا الحرف؟", messages, summary="تعلمنا حرف الألف.", lesson=LESSON)
+
+    assert window.prompt_tokens <= chat_context.prompt_budget(agent)
+    assert window.history[-1]["content"] == messages[-1].content
+    assert chat_context.SUMMARY_HEADING in window.context
+    # The oldest messages are compacted, the newest half of the budget never is
+    remaining = len(messages) - len(window.compactable)
+    assert window.compactable == messages[: len(window.compactable)]
+    assert 0 < remaining < len(window.history)
+
+
+def test_agent_without_template_has_no_lesson_context():
+    agent = AgentRegistry().get("arabic").model_copy(update={"contextTemplate": ""})
+    assert chat_context.lesson_context(agent, LESSON) == ""
+    assert chat_context.lesson_context(AgentRegistry().get("english"), None) == ""
+
+
+@pytest.mark.asyncio
+async def test_summarize_folds_messages_into_summary(monkeypatch):
+    requests = []
+
+    class Provider:
+        name = "stub"
+
+        async def complete(self, request):
+            requests.append(request)
+            return Completion(text=" ملخص جديد ", provider="stub", model=request.model)
+
+    monkeypatch.setattr(llm_providers, "route_tier", lambda tier: (Provider(), "small-model"))
+
+    summary = await chat_context.summarize("ملخص قديم", _messages(2, length=5))
+
+    assert summary == "ملخص جديد"
+    content = requests[0].messages[0]["content"]
+    assert "ملخص قديم" in content and "Child: 0" in content and "Tutor: 1" in content
+    assert requests[0].system == chat_context.SUMMARY_PROMPT
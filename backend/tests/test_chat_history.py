@@ -0,0 +1,106 @@
+"""Transcript cursors, keyset pages and NDJSON streaming."""
+
+import base64
+import json
+from datetime import date, datetime, timedelta
+from uuid import UUID, uuid4
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.models.child import Child
+from app.models.guardian import Guardian
+from app.models.lesson import Lesson
+from app.models.session import ChatMessage
+from app.models.session import Session as LearningSession
+from app.services import chat_history, chat_partitions
+from app.services.chat_history import decode_cursor, encode_cursor
+
+DAY = date(2025, 6, 1)
+
+
+def test_cursor_round_trip():
+    timestamp, message_id = datetime(2025, 6, 1, 12, 30, 15, 123456), uuid4()
+    cursor = encode_cursor(timestamp, message_id)
+    assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+    assert decode_cursor(cursor) == (timestamp, message_id)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not a cursor",
+        "%%%",
+        base64.urlsafe_b64encode(b"2025-06-01T12:00:00").decode(),
+        base64.urlsafe_b64encode(b"yesterday|" + str(uuid4()).encode()).decode(),
+        base64.urlsafe_b64encode(b"2025-06-01T12:00:00|not-a-uuid").decode(),
+        base64.urlsafe_b64encode(b"2025-06-01T12:00:00|a|b").decode(),
+        base64.urlsafe_b64encode(b"\xff\xfe|\xff").decode(),
+    ],
+)
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+@pytest_asyncio.fixture
+async def transcript(async_pg_engine, monkeypatch) -> tuple[sessionmaker, UUID, list[ChatMessage]]:
+    """A session of 7 messages, the first 5 sharing one timestamp."""
+    make_session = sessionmaker(async_pg_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(chat_history, "AsyncSessionLocal", make_session)
+
+    guardian = Guardian(email=f"{uuid4().hex}@example.com", hashed_password="x", first_name="G", last_name="T")
+    child = Child(guardian_id=guardian.id, first_name="C", birth_date=date(2019, 1, 1), age_group="6-8")
+    lesson = Lesson(
+        title="L", description="L", subject="arabic", age_group="6-8", difficulty="beginner", estimated_duration=10
+    )
+    learning_session = LearningSession(child_id=child.id, lesson_id=lesson.id, subject="arabic", agent_id="agent")
+    tied = datetime.combine(DAY, datetime.min.time()) + timedelta(hours=9)
+    timestamps = [tied] * 5 + [tied + timedelta(seconds=1), tied + timedelta(seconds=2)]
+    messages = [
+        ChatMessage(session_id=learning_session.id, role="child", content=f"رسالة {i}", timestamp=timestamp)
+        for i, timestamp in enumerate(timestamps)
+    ]
+
+    async with make_session() as db:
+        await db.execute(text(chat_partitions.create_partition_sql(DAY)))
+        db.add(guardian)
+        await db.flush()
+        db.add_all([child, lesson])
+        await db.flush()
+        db.add(learning_session)
+        await db.flush()
+        db.add_all(messages)
+        await db.commit()
+
+    expected = sorted(messages, key=lambda message: (message.timestamp, message.id))
+    return make_session, learning_session.id, expected
+
+
+@pytest.mark.asyncio
+async def test_pages_cover_ties_exactly_once(transcript):
+    make_session, session_id, expected = transcript
+
+    seen, cursor = [], None
+    async with make_session() as db:
+        while True:
+            page, cursor = await chat_history.get_page(db, session_id, cursor, limit=2)
+            seen.extend(message["id"] for message in page)
+            if cursor is None:
+                break
+    assert seen == [str(message.id) for message in expected]
+
+
+@pytest.mark.asyncio
+async def test_ndjson_streams_the_whole_transcript(transcript, monkeypatch):
+    _, session_id, expected = transcript
+    monkeypatch.setattr(chat_history, "STREAM_BATCH_SIZE", 3)
+
+    chunks = [chunk async for chunk in chat_history.stream_ndjson(session_id)]
+    lines = b"".join(chunks).decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [str(message.id) for message in expected]
+    assert json.loads(lines[0])["content"] == expected[0].content
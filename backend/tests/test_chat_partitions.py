@@ -0,0 +1,91 @@
+"""Daily chat partitions: the default partition, partition creation and detachment."""
+
+from datetime import date, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.models.child import Child
+from app.models.guardian import Guardian
+from app.models.lesson import Lesson
+from app.models.session import ChatMessage
+from app.models.session import Session as LearningSession
+from app.services import chat_partitions
+from app.services.chat_partitions import DEFAULT_PARTITION, partition_name
+
+
+async def _count(db, table: str, message_id) -> int:
+    return await db.scalar(text(f"SELECT count(*) FROM {table} WHERE id = :id"), {"id": message_id})
+
+
+@pytest.mark.asyncio
+async def test_rows_outside_daily_partitions_land_in_default_until_their_day_exists(async_pg_engine):
+    make_session = sessionmaker(async_pg_engine, class_=AsyncSession, expire_on_commit=False)
+    day = date(2035, 3, 1)
+    guardian = Guardian(email=f"{uuid4().hex}@example.com", hashed_password="x", first_name="G", last_name="T")
+    child = Child(guardian_id=guardian.id, first_name="C", birth_date=date(2019, 1, 1), age_group="6-8")
+    lesson = Lesson(
+        title="L", description="L", subject="arabic", age_group="6-8", difficulty="beginner", estimated_duration=10
+    )
+    learning_session = LearningSession(child_id=child.id, lesson_id=lesson.id, subject="arabic", agent_id="agent")
+    message = ChatMessage(
+        session_id=learning_session.id, role="child", content="hi", timestamp=datetime(2035, 3, 1, 8, 30)
+    )
+
+    async with make_session() as db:
+        db.add(guardian)
+        await db.flush()
+        db.add_all([child, lesson])
+        await db.flush()
+        db.add(learning_session)
+        await db.flush()
+        # No daily partition covers 2035: the insert must not fail
+        db.add(message)
+        await db.commit()
+        assert await _count(db, DEFAULT_PARTITION, message.id) == 1
+
+        await db.execute(text(chat_partitions.create_partition_sql(day)))
+        await db.execute(text(chat_partitions.create_partition_sql(day)))  # Idempotent
+        await db.commit()
+        assert await _count(db, DEFAULT_PARTITION, message.id) == 0
+        assert await _count(db, partition_name(day), message.id) == 1
+        assert await _count(db, "chat_messages", message.id) == 1
+
+
+@pytest.mark.asyncio
+async def test_partitions_are_created_ahead_and_detached_when_expired(async_pg_engine):
+    today = date(2036, 1, 1)
+    async with async_pg_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        created = await chat_partitions.ensure_partitions(conn, today, days=2)
+        assert created == [partition_name(today + timedelta(days=offset)) for offset in range(3)]
+        assert await chat_partitions.ensure_partitions(conn, today, days=2) == []
+
+        partitions = dict(await chat_partitions.list_partitions(conn))
+        assert partitions[partition_name(today)] == today + timedelta(days=1)
+        assert partitions[DEFAULT_PARTITION] is None
+
+        expired = await chat_partitions.expired_partitions(conn, today + timedelta(days=3), retention_days=1)
+        assert partition_name(today) in expired and partition_name(today + timedelta(days=2)) not in expired
+        assert DEFAULT_PARTITION not in expired
+
+        await chat_partitions.drop_partition(conn, partition_name(today))
+        partitions = dict(await chat_partitions.list_partitions(conn))
+        assert partition_name(today) not in partitions and partition_name(today + timedelta(days=1)) in partitions
+        assert await conn.scalar(text("SELECT to_regclass(:name)"), {"name": partition_name(today)}) is None
+        assert await conn.scalar(text("SHOW lock_timeout")) == "0"
+
+
+@pytest.mark.asyncio
+async def test_dry_run_only_reports(async_pg_engine, monkeypatch):
+    monkeypatch.setattr(chat_partitions, "engine", async_pg_engine)
+    monkeypatch.setattr(chat_partitions.settings, "CHAT_PARTITION_PREMAKE_DAYS", 1)
+    today = date(2037, 1, 1)
+
+    summary = await chat_partitions.run_maintenance(today, dry_run=True)
+    assert summary["created"] == [partition_name(today), partition_name(today + timedelta(days=1))]
+    async with async_pg_engine.connect() as conn:
+        assert await chat_partitions.missing_partitions(conn, today, days=1) == [today, today + timedelta(days=1)]
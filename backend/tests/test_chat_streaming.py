@@ -0,0 +1,167 @@
+import asyncio
+import json
+from datetime import date
+from uuid import uuid4
+
+import httpx
+import pytest
+from starlette.requests import Request
+
+from app.api.routes import sessions
+from app.core.safety_policies import DEFAULT_SAFETY_VALIDATOR
+from app.models.child import Child
+from app.models.session import Session as LearningSession
+from app.services import chat_streaming, llm_providers, tutor_chat
+from app.services.agent_registry import AgentRegistry
+from app.services.chat_context import ContextWindow
+from app.services.llm_providers import ChatRequest, OpenAICompatibleProvider
+from app.services.llm_stub_server import StubProfile, create_app, parse_latency
+
+
+class _SlowStream(httpx.AsyncByteStream):
+    """SSE body producing one token every 10 ms, recording whether it was closed early."""
+
+    def __init__(self, tokens: int):
+        self.tokens = tokens
+        self.sent = 0
+        self.closed = False
+
+    async def __aiter__(self):
+        for _ in range(self.tokens):
+            await asyncio.sleep(0.01)
+            self.sent += 1
+            chunk = {"choices": [{"delta": {"content": "word "}}]}
+            yield f"data: {json.dumps(chunk)}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+
+    async def aclose(self):
+        self.closed = True
+
+
+def _provider(transport: httpx.AsyncBaseTransport) -> OpenAICompatibleProvider:
+    provider = OpenAICompatibleProvider("stub", "http://stub/v1", "stub", timeout=5)
+    provider._client = httpx.AsyncClient(transport=transport, base_url="http://stub/v1")
+    return provider
+
+
+@pytest.mark.asyncio
+async def test_stream_matches_completion():
+    provider = _provider(httpx.ASGITransport(app=create_app(StubProfile(latency=parse_latency("fixed:0")))))
+    request = ChatRequest(model="stub-model", messages=[{"role": "user", "content": "مرحبا"}])
+
+    events = [event async for event in provider.stream(request)]
+    completion = events[-1]
+
+    assert len(events) > 2
+    assert "".join(events[:-1]) == completion.text == (await provider.complete(request)).text
+    assert completion.input_tokens > 0 and completion.output_tokens > 0
+    assert completion.first_token_ms is not None
+
+
+@pytest.mark.asyncio
+async def test_relay_persists_turn_before_done(monkeypatch):
+    agent = AgentRegistry().get("arabic")
+    provider = _provider(httpx.ASGITransport(app=create_app(StubProfile(latency=parse_latency("fixed:0")))))
+    monkeypatch.setattr(llm_providers, "route", lambda agent: (provider, "stub-model"))
+    saved = []
+
+    async def persist(completion):
+        saved.append(completion.text)
+        return {"agentResponse": {"id": "1"}}
+
+    events = chat_streaming.relay(tutor_chat.stream_reply(agent, "ما هي الحروف؟"), on_complete=persist)
+    body = b"".join([chunk async for chunk in chat_streaming.to_sse(events)]).decode()
+
+    frames = [frame.split("\n") for frame in body.strip().split("\n\n")]
+    assert {frame[0] for frame in frames[:-1]} == {"event: token"}
+    done = json.loads(frames[-1][1][len("data: "):])
+    assert frames[-1][0] == "event: done"
+    assert saved == [done["response"]] and done["agentResponse"] == {"id": "1"} and "flagged" not in done
+    assert "".join(json.loads(frame[1][len("data: "):])["text"] for frame in frames[:-1]) == done["response"]
+
+
+@pytest.mark.asyncio
+async def test_unsafe_streamed_reply_is_replaced_and_flagged(monkeypatch):
+    chunks = [{"choices": [{"delta": {"content": text}}]} for text in ("تعلّم المزيد على ", "www.example.com")]
+    body = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks) + "data: [DONE]\n\n"
+    provider = _provider(httpx.MockTransport(lambda request: httpx.Response(200, content=body.encode())))
+    monkeypatch.setattr(llm_providers, "route", lambda agent: (provider, "stub-model"))
+    saved = []
+
+    async def save_messages(messages):
+        saved.extend(messages)
+
+    monkeypatch.setattr(chat_streaming, "save_messages", save_messages)
+    learning_session = LearningSession(child_id=uuid4(), lesson_id=uuid4(), subject="arabic", agent_id="arabic")
+    child = Child(guardian_id=uuid4(), first_name="سارة", birth_date=date(2019, 1, 1), age_group="6-8")
+    window = ContextWindow(context="", history=[], prompt_tokens=10)
+
+    turn = sessions._stream_turn(learning_session, child, AgentRegistry().get("arabic"), {"content": "رابط"}, window)
+    events = [event async for event in turn]
+
+    fallback = DEFAULT_SAFETY_VALIDATOR.fallback_response("ar")
+    assert events[-1]["type"] == "done" and events[-1]["flagged"] and events[-1]["response"] == fallback
+    _, agent_response = saved
+    assert agent_response.content == fallback and agent_response.is_flagged
+    assert agent_response.flagged_reason == "Links to an external site"
+    assert agent_response.message_metadata["safety"]["flags"] == ["external_link"]
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_upstream():
+    body = _SlowStream(tokens=100)
+    provider = _provider(httpx.MockTransport(lambda request: httpx.Response(200, stream=body)))
+    saved = []
+
+    async def persist(completion):
+        saved.append(completion)
+        return {}
+
+    async def consume():
+        request = ChatRequest(model="m", messages=[{"role": "user", "content": "hi"}])
+        async for _ in chat_streaming.relay(provider.stream(request), on_complete=persist):
+            pass
+
+    task = asyncio.create_task(consume())
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert body.closed and body.sent < body.tokens
+    assert saved == []
+
+
+@pytest.mark.asyncio
+async def test_provider_failure_is_an_error_event():
+    provider = _provider(httpx.MockTransport(lambda request: httpx.Response(400)))
+    request = ChatRequest(model="m", messages=[{"role": "user", "content": "hi"}])
+
+    events = [event async for event in chat_streaming.relay(provider.stream(request))]
+    assert events == [{"type": "error", "status": 502, "detail": "AI tutor failed to respond"}]
+
+
+@pytest.mark.asyncio
+async def test_sse_body_stops_when_client_disconnects():
+    disconnect = asyncio.Event()
+    closed = []
+
+    async def receive():
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def chunks():
+        try:
+            while True:
+                await asyncio.sleep(0.01)
+                yield b"data: {}\n\n"
+        finally:
+            closed.append(True)
+
+    request = Request({"type": "http", "method": "POST", "headers": []}, receive)
+    body = chat_streaming.until_disconnected(request, chunks())
+    assert await anext(body) == b"data: {}\n\n"
+
+    disconnect.set()
+    assert [chunk async for chunk in body] == []
+    assert closed == [True]
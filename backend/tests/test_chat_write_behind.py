@@ -0,0 +1,71 @@
+"""Write-behind queue durability and ordering, using the local append-only log."""
+
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from app.models.session import ChatMessage
+from app.services import chat_write_behind
+from app.services.chat_write_behind import AppendOnlyLogQueue
+
+
+def _entry(n: int) -> dict:
+    return {"id": str(uuid4()), "session_id": str(uuid4()), "n": n}
+
+
+@pytest.mark.asyncio
+async def test_unacknowledged_entries_are_replayed_after_restart(tmp_path):
+    queue = AppendOnlyLogQueue(tmp_path / "chat.log")
+    await queue.append([_entry(n) for n in range(5)])
+
+    batch = await queue.read(count=3, block_ms=0)
+    await queue.ack([position for position, _ in batch])
+    # Crash before the second batch is acknowledged
+    assert [entry["n"] for _, entry in await queue.read(count=3, block_ms=0)] == [3, 4]
+
+    restarted = AppendOnlyLogQueue(tmp_path / "chat.log")
+    replayed = await restarted.read(count=10, block_ms=0)
+    assert [entry["n"] for _, entry in replayed] == [3, 4]
+
+    await restarted.ack([position for position, _ in replayed])
+    assert await restarted.read(count=10, block_ms=0) == []
+    assert (tmp_path / "chat.log").stat().st_size == 0
+
+
+@pytest.mark.asyncio
+async def test_torn_final_line_is_not_consumed(tmp_path):
+    queue = AppendOnlyLogQueue(tmp_path / "chat.log")
+    await queue.append([_entry(0)])
+    with open(tmp_path / "chat.log", "ab") as log:
+        log.write(b'{"id": "partial')
+
+    assert [entry["n"] for _, entry in await queue.read(count=10, block_ms=0)] == [0]
+
+
+@pytest.mark.asyncio
+async def test_enqueue_keeps_session_timestamps_strictly_increasing(tmp_path):
+    queue = AppendOnlyLogQueue(tmp_path / "chat.log")
+    session_id = uuid4()
+    sent_at = datetime(2026, 1, 1, 12, 0, 0)
+    messages = [
+        ChatMessage(session_id=session_id, role=role, content=role, timestamp=sent_at) for role in ("child", "agent")
+    ]
+
+    await chat_write_behind.enqueue(messages, queue)
+
+    entries = [entry for _, entry in await queue.read(count=10, block_ms=0)]
+    assert [entry["role"] for entry in entries] == ["child", "agent"]
+    assert entries[0]["timestamp"] < entries[1]["timestamp"]
+
+
+def test_flags_survive_the_queue():
+    message = ChatMessage(
+        session_id=uuid4(), role="agent", content="...", is_flagged=True, flagged_reason="Contains contact details"
+    )
+    row = chat_write_behind.deserialize(chat_write_behind.serialize(message))
+    assert row["is_flagged"] and row["flagged_reason"] == "Contains contact details"
+
+    # Entries queued before flags were recorded
+    older = {key: value for key, value in chat_write_behind.serialize(message).items() if "flag" not in key}
+    assert not chat_write_behind.deserialize(older)["is_flagged"]
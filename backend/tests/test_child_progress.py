@@ -0,0 +1,216 @@
+"""Session completions, starts and assessments must keep points, streak days and rollup counts right."""
+
+import asyncio
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes import assessments, dashboard, sessions
+from app.models.assessment import AssessmentResult
+from app.models.child import Child
+from app.models.guardian import Guardian
+from app.models.lesson import Lesson
+from app.models.session import Session as LearningSession
+from app.services import child_progress, daily_stats
+from app.services.entity_cache import GuardianPrincipal
+
+PARALLEL_COMPLETIONS = 25
+POINTS = 10
+
+
+@pytest.fixture
+def make_session(async_pg_engine):
+    return sessionmaker(async_pg_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def _seed(make_session, sessions: int, last_activity: datetime | None = None):
+    guardian = Guardian(
+        email=f"{uuid4().hex}@example.com", hashed_password="x", first_name="G", last_name="T"
+    )
+    child = Child(
+        guardian_id=guardian.id,
+        first_name="C",
+        birth_date=datetime(2019, 1, 1).date(),
+        age_group="6-8",
+        last_activity=last_activity,
+        current_streak=3 if last_activity else 0,
+        longest_streak=3 if last_activity else 0,
+    )
+    lesson = Lesson(
+        title="L", description="L", subject="arabic", age_group="6-8", difficulty="beginner", estimated_duration=10
+    )
+    learning_sessions = [
+        LearningSession(child_id=child.id, lesson_id=lesson.id, subject="arabic", agent_id="agent")
+        for _ in range(sessions)
+    ]
+    async with make_session() as db:
+        db.add(guardian)
+        await db.flush()
+        db.add_all([child, lesson])
+        await db.flush()
+        db.add_all(learning_sessions)
+        await db.commit()
+    return child, learning_sessions
+
+
+async def _complete(make_session, session_id):
+    async with make_session() as db:
+        completed = await child_progress.complete_session(db, session_id, final_score=80, points=POINTS)
+        await db.commit()
+        return completed is not None
+
+
+@pytest.mark.asyncio
+async def test_parallel_completions_credit_every_session(make_session):
+    child, learning_sessions = await _seed(
+        make_session, PARALLEL_COMPLETIONS, last_activity=datetime.utcnow() - timedelta(days=1)
+    )
+
+    results = await asyncio.gather(*[_complete(make_session, s.id) for s in learning_sessions])
+    assert all(results)
+
+    async with make_session() as db:
+        refreshed = await db.get(Child, child.id)
+        assert refreshed.total_points == PARALLEL_COMPLETIONS * POINTS
+        # Yesterday's 3-day streak is extended exactly once, however many sessions end today
+        assert refreshed.current_streak == 4
+        assert refreshed.longest_streak == 4
+
+        completed = await db.scalar(
+            text("SELECT sum(sessions_completed) FROM child_daily_stats WHERE child_id = :child_id"),
+            {"child_id": child.id},
+        )
+        assert completed == PARALLEL_COMPLETIONS
+
+
+@pytest.mark.asyncio
+async def test_parallel_ends_of_one_session_count_once(make_session):
+    child, (learning_session,) = await _seed(make_session, 1)
+
+    results = await asyncio.gather(*[_complete(make_session, learning_session.id) for _ in range(10)])
+    assert results.count(True) == 1
+
+    async with make_session() as db:
+        refreshed = await db.get(Child, child.id)
+        assert refreshed.total_points == POINTS
+        assert refreshed.current_streak == 1
+        completed = await db.scalar(
+            text("SELECT sum(sessions_completed) FROM child_daily_stats WHERE child_id = :child_id"),
+            {"child_id": child.id},
+        )
+        assert completed == 1
+
+
+def _principal(guardian_id) -> GuardianPrincipal:
+    return GuardianPrincipal(
+        id=guardian_id,
+        email="g@example.com",
+        first_name="G",
+        last_name="T",
+        preferred_language="ar",
+        timezone="UTC",
+        is_email_verified=True,
+        is_active=True,
+    )
+
+
+async def _rollup_total(make_session, child_id, column: str) -> int:
+    async with make_session() as db:
+        return await db.scalar(
+            text(f"SELECT coalesce(sum({column}), 0) FROM child_daily_stats WHERE child_id = :child_id"),
+            {"child_id": child_id},
+        )
+
+
+@pytest.mark.asyncio
+async def test_started_sessions_are_counted(make_session):
+    child, (learning_session,) = await _seed(make_session, 1)
+    request = {"childId": str(child.id), "lessonId": str(learning_session.lesson_id), "agentId": "agent"}
+
+    async with make_session() as db:
+        started = await sessions.start_session(request, guardian=_principal(child.guardian_id), session=db)
+    assert started["status"] == "started"
+    assert await _rollup_total(make_session, child.id, "sessions_started") == 1
+
+    async with make_session() as db:
+        with pytest.raises(HTTPException) as error:
+            await sessions.start_session(request, guardian=_principal(uuid4()), session=db)
+    assert error.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_assessment_for_unknown_child_is_not_found(make_session):
+    child, (learning_session,) = await _seed(make_session, 1)
+    assessment = {"sessionId": str(learning_session.id), "subject": "arabic", "overallScore": 90}
+
+    async with make_session() as db:
+        with pytest.raises(HTTPException) as error:
+            await assessments.create_assessment(str(uuid4()), assessment, session=db)
+    assert error.value.status_code == 404
+
+    async with make_session() as db:
+        await assessments.create_assessment(str(child.id), assessment, session=db)
+    assert await _rollup_total(make_session, child.id, "assessments_count") == 1
+
+
+@pytest.mark.asyncio
+async def test_notifications_warn_about_inactive_children(make_session):
+    child, _ = await _seed(make_session, 0, last_activity=datetime.utcnow() - timedelta(days=5))
+
+    async with make_session() as db:
+        result = await dashboard.get_notifications(guardian=_principal(child.guardian_id), session=db)
+    assert [(n["type"], n["childId"]) for n in result["notifications"]] == [("warning", child.id)]
+    assert result["notifications"][0]["message"] == "No activity for 5 days"
+
+
+def test_unknown_timezones_are_rejected_and_count_as_utc():
+    with pytest.raises(ValueError, match="Unknown timezone"):
+        Guardian(email="g@example.com", hashed_password="x", first_name="G", last_name="T", timezone="Mars/Olympus")
+    assert Guardian(email="g@example.com", hashed_password="x", first_name="G", last_name="T").timezone == "Asia/Dubai"
+
+    late_evening = datetime(2026, 10, 18, 22, 30)
+    assert daily_stats.local_date(late_evening, "Asia/Dubai") == late_evening.date() + timedelta(days=1)
+    assert daily_stats.local_date(late_evening, "Mars/Olympus") == late_evening.date()
+    assert daily_stats.zone_name("") == daily_stats.zone_name(None) == "UTC"
+
+
+@pytest.mark.asyncio
+async def test_writes_survive_a_stored_unknown_timezone(make_session):
+    child, (learning_session,) = await _seed(make_session, 1)
+    async with make_session() as db:
+        # Set before timezones were validated
+        await db.execute(
+            text("UPDATE guardians SET timezone = 'Mars/Olympus' WHERE id = :id"), {"id": child.guardian_id}
+        )
+        await db.commit()
+
+    request = {"childId": str(child.id), "lessonId": str(learning_session.lesson_id), "agentId": "agent"}
+    async with make_session() as db:
+        await sessions.start_session(request, guardian=_principal(child.guardian_id), session=db)
+    assert await _complete(make_session, learning_session.id)
+    assessment = {"sessionId": str(learning_session.id), "subject": "arabic", "overallScore": 90}
+    async with make_session() as db:
+        await assessments.create_assessment(str(child.id), assessment, session=db)
+
+    assert await _rollup_total(make_session, child.id, "sessions_started") == 1
+    assert await _rollup_total(make_session, child.id, "sessions_completed") == 1
+    assert await _rollup_total(make_session, child.id, "assessments_count") == 1
+    async with make_session() as db:
+        days = (
+            await db.execute(text("SELECT DISTINCT day FROM child_daily_stats WHERE child_id = :id"), {"id": child.id})
+        ).scalars().all()
+        assert days == [datetime.utcnow().date()]
+        assert (await db.get(Child, child.id)).current_streak == 1
+
+        # The bulk path maps the zone to UTC in SQL
+        bulk = AssessmentResult(session_id=learning_session.id, child_id=child.id, subject="arabic", overall_score=70)
+        db.add(bulk)
+        await db.flush()
+        await daily_stats.record_assessments(db, [bulk.id])
+        await db.commit()
+    assert await _rollup_total(make_session, child.id, "assessments_count") == 2
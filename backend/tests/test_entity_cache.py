@@ -0,0 +1,84 @@
+"""Local tier of the entity cache: tags, stampede protection and hit rates (Redis disabled)."""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import cached, invalidate
+
+
+@pytest.fixture(autouse=True)
+def local_only(monkeypatch):
+    async def no_redis():
+        return None
+
+    monkeypatch.setattr(cache_module, "_redis", no_redis)
+
+
+def _counting_loader(name: str, delay: float = 0):
+    calls = []
+
+    @cached(f"test-{name}-{uuid4().hex[:8]}", tags=lambda entity_id: [f"entity:{entity_id}"])
+    async def load(db, entity_id):
+        calls.append(entity_id)
+        await asyncio.sleep(delay)
+        return {"id": entity_id, "version": len(calls)}
+
+    return load, calls
+
+
+@pytest.mark.asyncio
+async def test_hits_are_served_until_tag_is_invalidated():
+    load, calls = _counting_loader("hits")
+
+    assert (await load(None, "a"))["version"] == 1
+    assert (await load(None, "a"))["version"] == 1
+    await invalidate("entity:b")
+    assert (await load(None, "a"))["version"] == 1
+
+    await invalidate("entity:a")
+    assert (await load(None, "a"))["version"] == 2
+    assert calls == ["a", "a"]
+
+    stats = load.cache.stats()
+    assert stats["local_hits"] == 2 and stats["misses"] == 2 and stats["hit_rate"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    load, calls = _counting_loader("stampede", delay=0.05)
+
+    results = await asyncio.gather(*(load(None, "a") for _ in range(20)))
+
+    assert calls == ["a"]
+    assert all(result == results[0] for result in results)
+    assert load.cache.stats()["coalesced"] == 19
+
+
+@pytest.mark.asyncio
+async def test_load_racing_an_invalidation_is_not_cached():
+    load, calls = _counting_loader("race", delay=0.05)
+
+    pending = asyncio.create_task(load(None, "a"))
+    await asyncio.sleep(0.01)
+    # The write commits and invalidates while the load is still reading old data
+    await invalidate("entity:a")
+    assert (await pending)["version"] == 1
+
+    assert (await load(None, "a"))["version"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_fail_followers():
+    load, calls = _counting_loader("cancel", delay=0.05)
+
+    leader = asyncio.create_task(load(None, "a"))
+    await asyncio.sleep(0.01)
+    follower = asyncio.create_task(load(None, "a"))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert (await follower)["id"] == "a"
+    assert calls == ["a", "a"]
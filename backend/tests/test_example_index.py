@@ -0,0 +1,48 @@
+from app.schemas.agent import AgentExample
+from app.services import example_index, tutor_chat
+from app.services.agent_registry import AgentRegistry
+from app.services.example_index import ExampleIndex
+
+EXAMPLES = (
+    AgentExample(input="ما هو حرف الباء؟", output="الباء حرف جميل: ب، مثل باب وبطة."),
+    AgentExample(input="كم عدد أيام الأسبوع؟", output="في الأسبوع سبعة أيام!"),
+    AgentExample(input="ما لون السماء؟", output="السماء زرقاء في النهار."),
+    AgentExample(input="احكي لي قصة عن الأسد", output="كان يا ما كان أسد شجاع...", ageGroups=("4-6",)),
+    AgentExample(input="احكي لي قصة عن النمر", output="في غابة بعيدة عاش نمر ذكي...", ageGroups=("7-9",)),
+)
+
+
+def test_selects_most_similar_examples():
+    index = ExampleIndex(EXAMPLES)
+
+    (chosen,) = index.select("علّمني حَرْف البَاء", None, limit=1, budget=1000)
+    assert chosen is EXAMPLES[0]
+    chosen = index.select("ما لون السماء اليوم؟ وما هو حرف الباء", None, limit=2, budget=1000)
+    assert chosen == (EXAMPLES[0], EXAMPLES[2])
+
+
+def test_respects_age_group_and_budget():
+    index = ExampleIndex(EXAMPLES)
+
+    assert EXAMPLES[4] not in index.select("احكي لي قصة عن النمر", "4-6", limit=5, budget=1000)
+    assert index.select("احكي لي قصة", "7-9", limit=1, budget=1000) == EXAMPLES[4:5]
+
+    budget = example_index.example_tokens(EXAMPLES[1]) + 1
+    chosen = index.select("حرف الباء", None, limit=5, budget=budget)
+    assert sum(example_index.example_tokens(example) for example in chosen) <= budget
+
+
+def test_short_example_lists_are_sent_whole():
+    agent = AgentRegistry().get("arabic")
+    assert example_index.index_for(agent) is None
+    assert example_index.select(agent, "مرحبا") == agent.examples
+
+
+def test_prompt_carries_only_selected_examples(monkeypatch):
+    agent = AgentRegistry().get("arabic").model_copy(update={"examples": EXAMPLES})
+    monkeypatch.setattr(example_index.settings, "FEW_SHOT_MAX_EXAMPLES", 2)
+
+    messages = tutor_chat.build_messages(agent, "ما هو حرف الباء؟", age_group="4-6")
+
+    assert len(messages) == 2 * 2 + 1
+    assert messages[0]["content"] == EXAMPLES[0].input and messages[-1]["content"] == "ما هو حرف الباء؟"
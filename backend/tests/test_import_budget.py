@@ -0,0 +1,62 @@
+"""Cold-start budget of the API worker.
+
+Budgets can be tuned per environment with ``IMPORT_TIME_BUDGET_MS`` and
+``IMPORT_RSS_BUDGET_MB``; see ``python -m tests.profile_imports`` for
+what is taking the time.
+"""
+
+import os
+import sys
+
+import pytest
+
+from app.core.lazy_imports import HEAVY_MODULES, LazyModule
+from tests.profile_imports import measure, parse_importtime
+
+IMPORT_TIME_BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", 2500))
+IMPORT_RSS_BUDGET_MB = float(os.environ.get("IMPORT_RSS_BUDGET_MB", 150))
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="peak RSS is measured with the resource module")
+
+
+@pytest.fixture(scope="module")
+def app_import():
+    # Best of three runs so one slow cold disk read does not fail the build
+    runs = [measure("app.main") for _ in range(3)]
+    return min(runs, key=lambda run: run["import_ms"])
+
+
+def test_app_import_time_within_budget(app_import):
+    assert app_import["import_ms"] <= IMPORT_TIME_BUDGET_MS, (
+        f"import app.main took {app_import['import_ms']:.0f} ms (budget {IMPORT_TIME_BUDGET_MS:.0f} ms)"
+    )
+
+
+def test_app_import_rss_within_budget(app_import):
+    assert app_import["max_rss_mb"] <= IMPORT_RSS_BUDGET_MB, (
+        f"import app.main peaked at {app_import['max_rss_mb']:.0f} MB RSS (budget {IMPORT_RSS_BUDGET_MB:.0f} MB)"
+    )
+
+
+def test_app_does_not_import_heavy_modules(app_import):
+    loaded = {name.split(".")[0] for name in app_import["modules"]}
+    assert not loaded & set(HEAVY_MODULES), "use app.core.lazy_imports for heavy optional dependencies"
+
+
+def test_lazy_module_imports_on_first_access():
+    lazy = LazyModule("json")
+    assert not lazy.loaded
+    assert lazy.dumps({"a": 1}) == '{"a": 1}'
+    assert lazy.loaded
+
+
+def test_lazy_module_names_missing_package():
+    lazy = LazyModule("not_an_installed_module", package="not-installed")
+    with pytest.raises(ImportError, match="not-installed"):
+        lazy.anything
+
+
+def test_parse_importtime():
+    output = "import time: self [us] | cumulative | imported package\nimport time:       120 |        450 |   app.core\n"
+    (record,) = parse_importtime(output)
+    assert (record.module, record.self_us, record.cumulative_us, record.depth) == ("app.core", 120, 450, 1)
@@ -0,0 +1,76 @@
+"""Missed-message detection of the cache invalidation bus."""
+
+import pytest
+
+from app.core import cache as cache_module
+from app.core import invalidation_bus
+from app.core.cache import cached
+from app.core.invalidation_bus import SequenceTracker
+
+
+def test_consecutive_messages_are_applied_and_duplicates_skipped():
+    tracker = SequenceTracker()
+    assert tracker.resync(10) is False
+    assert [tracker.observe(seq) for seq in (11, 12, 12, 13)] == ["apply", "apply", "skip", "apply"]
+
+
+def test_gap_in_sequence_is_reported():
+    tracker = SequenceTracker()
+    tracker.resync(10)
+    assert tracker.observe(11) == "apply"
+    assert tracker.observe(14) == "gap"
+    assert tracker.observe(15) == "apply"
+
+
+def test_reconnect_after_missed_messages_flushes():
+    tracker = SequenceTracker()
+    tracker.resync(10)
+    tracker.observe(11)
+    assert tracker.resync(11) is False
+    assert tracker.resync(13) is True
+
+
+def test_counter_ahead_only_counts_as_lost_when_still_behind_at_next_check():
+    tracker = SequenceTracker()
+    tracker.resync(10)
+    # Message 11 is published but still in flight
+    assert tracker.check(11) is False
+    tracker.observe(11)
+    assert tracker.check(11) is False
+
+    # Message 12 never arrives
+    assert tracker.check(12) is False
+    assert tracker.check(12) is True
+    assert tracker.last_seq == 12
+
+
+def test_counter_reset_flushes():
+    tracker = SequenceTracker()
+    tracker.resync(50)
+    assert tracker.check(3) is True
+    assert tracker.last_seq == 3
+
+
+@pytest.mark.asyncio
+async def test_remote_invalidation_evicts_local_entries(monkeypatch):
+    async def no_redis():
+        return None
+
+    monkeypatch.setattr(cache_module, "_redis", no_redis)
+    calls = []
+
+    @cached("test-bus", tags=lambda entity_id: [f"entity:{entity_id}"])
+    async def load(db, entity_id):
+        calls.append(entity_id)
+        return {"id": entity_id}
+
+    await load(None, "a")
+    await load(None, "b")
+    invalidation_bus._notify({"entity:a"})
+    await load(None, "a")
+    await load(None, "b")
+    assert calls == ["a", "b", "a"]
+
+    invalidation_bus._notify(None)
+    await load(None, "b")
+    assert calls == ["a", "b", "a", "b"]
@@ -0,0 +1,47 @@
+"""The lesson catalogue's tag and keyword filters run on the async session."""
+
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes import lessons
+from app.models.lesson import Lesson
+
+
+@pytest.mark.asyncio
+async def test_lessons_filter_by_tag_and_keyword(async_pg_engine):
+    make_session = sessionmaker(async_pg_engine, class_=AsyncSession, expire_on_commit=False)
+    subject = f"subject-{uuid4().hex[:8]}"
+    catalogue = [
+        Lesson(
+            title=title,
+            description=title,
+            subject=subject,
+            age_group="6-8",
+            difficulty="beginner",
+            estimated_duration=10,
+            is_published=published,
+            tags=tags,
+            keywords=keywords,
+        )
+        for title, published, tags, keywords in [
+            ("letters", True, ["letters", "reading"], ["alif"]),
+            ("numbers", True, ["numbers"], ["one", "two"]),
+            ("draft", False, ["letters"], ["alif"]),
+        ]
+    ]
+    async with make_session() as db:
+        db.add_all(catalogue)
+        await db.commit()
+
+    async with make_session() as db:
+        assert {lesson["title"] for lesson in await lessons.get_lessons(subject=subject, session=db)} == {
+            "letters",
+            "numbers",
+        }
+        by_tag = await lessons.get_lessons(subject=subject, tag="letters", session=db)
+        by_keyword = await lessons.get_lessons(subject=subject, keyword="two", session=db)
+    assert [lesson["title"] for lesson in by_tag] == ["letters"]
+    assert [lesson["title"] for lesson in by_keyword] == ["numbers"]
@@ -0,0 +1,177 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services import llm_health, llm_providers, llm_scheduler
+from app.services.agent_registry import AgentRegistry
+from app.services.llm_health import CLOSED, HALF_OPEN, OPEN, ProviderHealth
+from app.services.llm_providers import LLMRequestError, OpenAICompatibleProvider
+from app.services.llm_stub_server import StubProfile, create_app, parse_latency
+
+
+def _stub_provider(name: str, profile: StubProfile) -> OpenAICompatibleProvider:
+    provider = OpenAICompatibleProvider(name, "http://stub/v1", "stub", timeout=5)
+    provider.app = create_app(profile)
+    transport = httpx.ASGITransport(app=provider.app)
+    provider._client = httpx.AsyncClient(transport=transport, base_url="http://stub/v1")
+    return provider
+
+
+@pytest.fixture(autouse=True)
+def fresh_health(monkeypatch):
+    monkeypatch.setattr(llm_health, "_health", {})
+    monkeypatch.setattr(llm_health, "_latencies", {})
+    monkeypatch.setattr(llm_health, "hedge_counters", dict.fromkeys(llm_health.hedge_counters, 0))
+    monkeypatch.setattr(settings, "LLM_HEDGE_DEFAULT_DELAY_MS", 50)
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 0)
+
+
+def _route(monkeypatch, primary, alternate):
+    monkeypatch.setattr(llm_providers, "route", lambda agent: primary)
+    monkeypatch.setattr(llm_providers, "route_alternate", lambda agent: alternate)
+
+
+def _messages():
+    return [{"role": "user", "content": "ما هي الحروف؟"}]
+
+
+@pytest.mark.asyncio
+async def test_slow_call_is_hedged_and_the_loser_cancelled(monkeypatch):
+    profile = StubProfile(
+        latency=parse_latency("fixed:0"),
+        model_latency={"slow": parse_latency("fixed:5000"), "fast": parse_latency("fixed:0")},
+    )
+    provider = _stub_provider("stub", profile)
+    _route(monkeypatch, (provider, "slow"), (provider, "fast"))
+    agent = AgentRegistry().get("arabic")
+
+    completion = await llm_providers.complete_for_agent(agent, _messages(), "system")
+    assert completion.model == "fast" and completion.hedged
+    assert completion.latency_ms < 1000
+
+    events = [event async for event in llm_providers.stream_for_agent(agent, _messages(), "system")]
+    assert events[-1].model == "fast" and events[-1].hedged
+    assert "".join(event for event in events[:-1]) == events[-1].text
+
+    assert llm_health.hedge_counters == {"hedged": 2, "hedge_won": 2, "failed_over": 0, "losers_cancelled": 2}
+
+
+@pytest.mark.asyncio
+async def test_fast_calls_are_not_hedged(monkeypatch):
+    profile = StubProfile(latency=parse_latency("fixed:0"))
+    primary, alternate = _stub_provider("primary", profile), _stub_provider("backup", profile)
+    _route(monkeypatch, (primary, "model"), (alternate, "model"))
+
+    completion = await llm_providers.complete_for_agent(AgentRegistry().get("arabic"), _messages(), "system")
+    assert completion.provider == "primary" and not completion.hedged
+    assert alternate.app.state.requests == 0
+
+
+@pytest.fixture
+def one_slot(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "_queues", {})
+    monkeypatch.setattr(settings, "LLM_PROVIDER_CONCURRENCY", {})
+    monkeypatch.setattr(settings, "LLM_DEFAULT_PROVIDER_CONCURRENCY", 1)
+
+
+@pytest.mark.asyncio
+async def test_calls_queued_for_a_slot_are_not_hedged(monkeypatch, one_slot):
+    # Each call answers well within the hedge delay, but waits for the only slot longer than that
+    primary = _stub_provider("primary", StubProfile(latency=parse_latency("fixed:30")))
+    backup = _stub_provider("backup", StubProfile(latency=parse_latency("fixed:0")))
+    _route(monkeypatch, (primary, "model"), (backup, "model"))
+    agent = AgentRegistry().get("arabic")
+
+    completions = await asyncio.gather(*(llm_providers.complete_for_agent(agent, _messages(), "s") for _ in range(5)))
+    assert max(completion.queue_ms for completion in completions) > settings.LLM_HEDGE_DEFAULT_DELAY_MS
+    assert all(completion.provider == "primary" and not completion.hedged for completion in completions)
+    assert backup.app.state.requests == 0 and llm_health.hedge_counters["hedged"] == 0
+
+
+@pytest.mark.asyncio
+async def test_hedges_stay_within_the_budget(monkeypatch, one_slot):
+    monkeypatch.setattr(settings, "LLM_HEDGE_BURST", 2)
+    monkeypatch.setattr(settings, "LLM_HEDGE_MAX_RATIO", 0.05)
+    primary = _stub_provider("primary", StubProfile(latency=parse_latency("fixed:200")))
+    backup = _stub_provider("backup", StubProfile(latency=parse_latency("fixed:0")))
+    _route(monkeypatch, (primary, "model"), (backup, "model"))
+    agent = AgentRegistry().get("arabic")
+
+    completions = await asyncio.gather(*(llm_providers.complete_for_agent(agent, _messages(), "s") for _ in range(6)))
+    assert [completion.hedged for completion in completions].count(True) == 2
+    assert backup.app.state.requests == 2
+    stats = llm_health.health("primary").stats()
+    assert stats["calls"] == 6 and stats["hedges"] == 2 and stats["hedges_denied"] == 4
+
+
+@pytest.mark.asyncio
+async def test_failures_fail_over_and_open_the_circuit(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CIRCUIT_FAILURE_THRESHOLD", 2)
+    primary = _stub_provider("primary", StubProfile(latency=parse_latency("fixed:0"), error_rate=1.0))
+    backup = _stub_provider("backup", StubProfile(latency=parse_latency("fixed:0")))
+    _route(monkeypatch, (primary, "model"), (backup, "model"))
+    agent = AgentRegistry().get("arabic")
+
+    for _ in range(3):
+        completion = await llm_providers.complete_for_agent(agent, _messages(), "system")
+        assert completion.provider == "backup"
+
+    # The third call skipped the open circuit instead of failing over
+    assert primary.app.state.requests == 2
+    assert llm_health.health("primary").state == OPEN
+    assert llm_health.hedge_counters["failed_over"] == 2
+    stats = llm_health.health_stats()
+    assert stats["providers"]["primary"]["score"] == 0 and stats["providers"]["backup"]["score"] > 0
+
+
+@pytest.mark.asyncio
+async def test_rejected_requests_do_not_fail_over_or_count_against_health(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CIRCUIT_FAILURE_THRESHOLD", 1)
+    primary = OpenAICompatibleProvider("primary", "http://stub/v1", "stub", timeout=5)
+    primary._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(400)), base_url="http://stub/v1"
+    )
+    backup = _stub_provider("backup", StubProfile(latency=parse_latency("fixed:0")))
+    _route(monkeypatch, (primary, "model"), (backup, "model"))
+    agent = AgentRegistry().get("arabic")
+
+    with pytest.raises(LLMRequestError):
+        await llm_providers.complete_for_agent(agent, _messages(), "system")
+    with pytest.raises(LLMRequestError):
+        [event async for event in llm_providers.stream_for_agent(agent, _messages(), "system")]
+
+    assert backup.app.state.requests == 0 and llm_health.hedge_counters["failed_over"] == 0
+    assert llm_health.health("primary").state == CLOSED
+    assert llm_health.health("primary").stats()["failures"] == 0
+
+def test_circuit_half_opens_for_one_probe(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CIRCUIT_FAILURE_THRESHOLD", 3)
+    health = ProviderHealth("provider")
+    for _ in range(3):
+        assert health.available()
+        health.failure()
+    assert health.state == OPEN and not health.available()
+
+    monkeypatch.setattr(settings, "LLM_CIRCUIT_OPEN_SECONDS", 0)
+    assert health.available() and health.state == HALF_OPEN
+    health.failure()
+    assert health.state == OPEN
+
+    assert health.available()
+    health.success(100)
+    assert health.state == CLOSED and health.score == 1.0
+
+
+def test_hedge_delay_follows_the_tail_latency(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGE_MIN_SAMPLES", 20)
+    monkeypatch.setattr(settings, "LLM_HEDGE_MIN_DELAY_MS", 10)
+    for latency in range(1, 11):
+        llm_health.record_latency("provider", "model", "complete", latency * 100)
+    assert llm_health.hedge_delay_ms("provider", "model", "complete") == 50  # Default until enough samples
+
+    for latency in range(11, 101):
+        llm_health.record_latency("provider", "model", "complete", latency * 100)
+    assert llm_health.hedge_delay_ms("provider", "model", "complete") == 9600
+    assert llm_health.hedge_delay_ms("provider", "model", "first_token") == 50
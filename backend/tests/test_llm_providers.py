@@ -0,0 +1,142 @@
+import json
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services import llm_providers, tutor_chat
+from app.services.agent_registry import AgentRegistry
+from app.services.llm_providers import (
+    AnthropicProvider,
+    ChatRequest,
+    LLMError,
+    OpenAICompatibleProvider,
+)
+from app.services.llm_stub_server import StubProfile, create_app, parse_latency
+
+
+def _stub_provider(profile: StubProfile) -> OpenAICompatibleProvider:
+    provider = OpenAICompatibleProvider("stub", "http://stub/v1", "stub", timeout=5)
+    transport = httpx.ASGITransport(app=create_app(profile))
+    provider._client = httpx.AsyncClient(transport=transport, base_url="http://stub/v1")
+    return provider
+
+
+@pytest.fixture
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_DELAY_MS", 0)
+
+
+@pytest.mark.asyncio
+async def test_agent_reply_through_stub(monkeypatch):
+    agent = AgentRegistry().get("arabic")
+    provider = _stub_provider(StubProfile(latency=parse_latency("fixed:0")))
+    monkeypatch.setattr(llm_providers, "route", lambda agent: (provider, "stub-model"))
+
+    completion = await tutor_chat.reply(agent, "ما هي الحروف؟", child_name="سارة")
+
+    assert "ما هي الحروف؟" in completion.text
+    assert completion.provider == "stub" and completion.model == "stub-model"
+    assert completion.input_tokens > 0 and completion.output_tokens > 0
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried(no_retry_delay):
+    statuses = iter([503, 429, 200])
+
+    def handler(request):
+        status = next(statuses)
+        if status != 200:
+            return httpx.Response(status)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}], "usage": {}})
+
+    provider = OpenAICompatibleProvider("openai", "http://api/v1", "key", timeout=5)
+    provider._client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://api/v1")
+
+    completion = await provider.complete(ChatRequest(model="m", messages=[{"role": "user", "content": "hi"}]))
+    assert completion.text == "ok" and completion.attempts == 3
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried(no_retry_delay):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, json={"error": "bad request"})
+
+    provider = AnthropicProvider("http://api", "key", timeout=5)
+    provider._client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://api")
+
+    with pytest.raises(LLMError):
+        await provider.complete(ChatRequest(model="m", messages=[{"role": "user", "content": "hi"}]))
+    assert len(calls) == 1
+
+
+def test_tier_routing(monkeypatch):
+    agent = AgentRegistry().get("islamic")
+    provider, model = llm_providers.route(agent)
+    assert f"{provider.name}:{model}" == settings.LLM_TIER_MODELS[agent.modelTier]
+
+    monkeypatch.setattr(settings, "LLM_USE_STUB", True)
+    provider, stub_model = llm_providers.route(agent)
+    assert provider.name == "stub" and stub_model == model
+
+
+def test_backoff_is_jittered_and_capped():
+    delays = [llm_providers._backoff(10) for _ in range(200)]
+    assert all(0 <= delay <= settings.LLM_RETRY_MAX_DELAY_MS / 1000 for delay in delays)
+    assert len(set(delays)) > 1
+    assert llm_providers._backoff(1, retry_after="1") == 1.0
+
+
+def test_static_prompt_is_canonical_and_first():
+    agent = AgentRegistry().get("arabic")
+    edited = agent.model_copy(update={"systemPrompt": agent.systemPrompt.replace("\n", "  \r\n") + "\n\n\n"})
+
+    assert tutor_chat.static_prompt(edited) == tutor_chat.static_prompt(agent)
+    for child_name, context in (("سارة", "نحن نتعلم الحروف"), ("Omar", None)):
+        assert tutor_chat.system_prompt(agent, child_name, context).startswith(tutor_chat.static_prompt(agent))
+        assert child_name not in tutor_chat.static_prompt(agent)
+
+
+@pytest.mark.asyncio
+async def test_stub_reports_prefix_cache_hits(monkeypatch):
+    agent = AgentRegistry().get("arabic")
+    provider = _stub_provider(StubProfile(latency=parse_latency("fixed:0")))
+    monkeypatch.setattr(llm_providers, "route", lambda agent: (provider, "stub-model"))
+
+    first = await tutor_chat.reply(agent, "ما هي الحروف؟", child_name="سارة")
+    second = await tutor_chat.reply(agent, "كم عدد الحروف؟", child_name="عمر")
+
+    # The second child's prompt shares the agent's static instructions
+    assert first.cached_input_tokens == 0
+    assert 0 < second.cached_input_tokens < second.input_tokens
+    assert second.cached_input_tokens >= len(tutor_chat.static_prompt(agent)) // 4 - 64
+    stats = provider.stats()
+    assert stats["completions"] == 2 and stats["cached_input_tokens"] == second.cached_input_tokens
+    assert 0 < stats["cache_hit_ratio"] < 1
+
+
+@pytest.mark.asyncio
+async def test_anthropic_cache_breakpoint_and_usage():
+    bodies = []
+
+    def handler(request):
+        bodies.append(json.loads(request.content))
+        usage = {"input_tokens": 20, "cache_read_input_tokens": 900, "output_tokens": 5}
+        return httpx.Response(200, json={"content": [{"type": "text", "text": "ok"}], "usage": usage})
+
+    provider = AnthropicProvider("http://api", "key", timeout=5)
+    provider._client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://api")
+
+    request = ChatRequest(
+        model="m", messages=[{"role": "user", "content": "hi"}], system="Child: Sara", system_prefix="You are a tutor."
+    )
+    completion = await provider.complete(request)
+
+    assert bodies[0]["system"] == [
+        {"type": "text", "text": "You are a tutor.", "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": "Child: Sara"},
+    ]
+    assert (completion.input_tokens, completion.cached_input_tokens) == (920, 900)
@@ -0,0 +1,93 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services import llm_scheduler
+from app.services.llm_providers import (
+    ChatRequest,
+    LLMOverloadedError,
+    OpenAICompatibleProvider,
+)
+from app.services.llm_scheduler import Priority, QueueTimeout
+
+
+@pytest.fixture
+def one_slot(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PROVIDER_CONCURRENCY", {})
+    monkeypatch.setattr(settings, "LLM_DEFAULT_PROVIDER_CONCURRENCY", 1)
+
+
+async def _run_in_order(provider: str, calls: list[tuple[Priority, str]]) -> list[str]:
+    """Names of ``calls`` (priority, name) in the order they got the provider's only slot."""
+    order = []
+
+    async def call(priority, name, key):
+        async with llm_scheduler.slot(provider, "m", priority, key):
+            order.append(name)
+
+    async with llm_scheduler.slot(provider, "m"):
+        tasks = []
+        for priority, name in calls:
+            tasks.append(asyncio.create_task(call(priority, name, name.rstrip("0123456789"))))
+            await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_higher_priorities_go_first(one_slot):
+    calls = [(Priority.REPORT, "report"), (Priority.BACKGROUND, "summary"), (Priority.INTERACTIVE, "chat")]
+    assert await _run_in_order("priorities", calls) == ["chat", "report", "summary"]
+
+
+@pytest.mark.asyncio
+async def test_children_take_turns(one_slot):
+    calls = [(Priority.INTERACTIVE, name) for name in ("burst1", "burst2", "burst3", "other1", "quiet1")]
+    assert await _run_in_order("fairness", calls) == ["burst1", "other1", "quiet1", "burst2", "burst3"]
+
+
+@pytest.mark.asyncio
+async def test_calls_past_their_deadline_are_dropped(one_slot, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_QUEUE_TIMEOUTS", {"interactive": 0.02})
+
+    async with llm_scheduler.slot("deadline", "m"):
+        with pytest.raises(QueueTimeout):
+            async with llm_scheduler.slot("deadline", "m"):
+                pass
+
+    async with llm_scheduler.slot("deadline", "m") as waited_ms:
+        assert waited_ms < 20
+    stats = llm_scheduler.scheduler_stats()["deadline"]
+    assert stats["active"] == 0 and stats["queued"] == 0
+    assert stats["priorities"]["interactive"]["dropped_deadline"] == 1
+
+
+@pytest.mark.asyncio
+async def test_model_limits_leave_other_models_free(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MODEL_CONCURRENCY", {"models:busy": 1})
+    monkeypatch.setattr(settings, "LLM_QUEUE_TIMEOUTS", {"interactive": 0.02})
+
+    async with llm_scheduler.slot("models", "busy"):
+        async with llm_scheduler.slot("models", "other") as waited_ms:
+            assert waited_ms < 20
+        with pytest.raises(QueueTimeout):
+            async with llm_scheduler.slot("models", "busy"):
+                pass
+
+
+@pytest.mark.asyncio
+async def test_provider_reports_dropped_calls_as_overloaded(one_slot, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_QUEUE_TIMEOUTS", {"interactive": 0.02})
+    provider = OpenAICompatibleProvider("overloaded", "http://api/v1", "key", timeout=5)
+    response = {"choices": [{"message": {"content": "ok"}}], "usage": {}}
+    provider._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json=response)), base_url="http://api/v1"
+    )
+    request = ChatRequest(model="m", messages=[{"role": "user", "content": "hi"}])
+
+    async with llm_scheduler.slot("overloaded", "m"):
+        with pytest.raises(LLMOverloadedError):
+            await provider.complete(request)
+    assert (await provider.complete(request)).text == "ok"
@@ -0,0 +1,147 @@
+"""Materialized progress reports: calendar windows, batched builds and staleness metadata."""
+
+from datetime import date, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes import assessments
+from app.models.analytics import ChildDailyStats
+from app.models.assessment import ProgressReport
+from app.models.child import Child
+from app.models.guardian import Guardian
+from app.services import daily_stats, progress_reports
+from app.services.progress_reports import calendar_window
+
+
+@pytest.fixture
+def make_session(async_pg_engine, monkeypatch):
+    make_session = sessionmaker(async_pg_engine, class_=AsyncSession, expire_on_commit=False)
+    # The builder opens its own sessions and lock connection
+    monkeypatch.setattr(progress_reports, "engine", async_pg_engine)
+    monkeypatch.setattr(progress_reports, "AsyncSessionLocal", make_session)
+    return make_session
+
+
+async def _seed(make_session, children: int, day: date, timezone: str = "Asia/Dubai") -> list[Child]:
+    guardian = Guardian(
+        email=f"{uuid4().hex}@example.com", hashed_password="x", first_name="G", last_name="T", timezone=timezone
+    )
+    seeded = [
+        Child(guardian_id=guardian.id, first_name=f"C{i}", birth_date=date(2019, 1, 1), age_group="6-8")
+        for i in range(children)
+    ]
+    async with make_session() as db:
+        db.add(guardian)
+        await db.flush()
+        db.add_all(seeded)
+        await db.flush()
+        db.add_all(
+            ChildDailyStats(
+                child_id=child.id, day=day, subject="arabic", assessments_count=2, assessment_score_total=170
+            )
+            for child in seeded
+        )
+        await db.commit()
+    return seeded
+
+
+async def _reports(make_session, children: list[Child]) -> list[ProgressReport]:
+    async with make_session() as db:
+        query = select(ProgressReport).where(ProgressReport.child_id.in_([child.id for child in children]))
+        return list((await db.execute(query)).scalars())
+
+
+def test_calendar_windows():
+    assert calendar_window("weekly", date(2026, 10, 21)) == (date(2026, 10, 19), date(2026, 10, 25))
+    assert calendar_window("weekly", date(2026, 10, 19)) == (date(2026, 10, 19), date(2026, 10, 25))
+    assert calendar_window("monthly", date(2026, 10, 19)) == (date(2026, 10, 1), date(2026, 10, 31))
+    assert calendar_window("monthly", date(2028, 2, 10)) == (date(2028, 2, 1), date(2028, 2, 29))
+
+
+@pytest.mark.asyncio
+async def test_builds_in_batches_and_refreshes_the_period_in_place(make_session):
+    monday = date(2026, 10, 19)
+    children = await _seed(make_session, 5, monday)
+
+    # Batches of two walk every child (and any left by other tests)
+    assert await progress_reports.build_reports("weekly", today=monday, batch_size=2) >= len(children)
+    reports = await _reports(make_session, children)
+    assert len(reports) == len(children)
+    assert {(report.start_date, report.end_date) for report in reports} == {(monday, monday + timedelta(days=6))}
+    assert all(report.total_sessions == 2 and report.average_score == 85 for report in reports)
+
+    # Later days of the same week update the same rows; the next week adds one row per child
+    await progress_reports.build_reports("weekly", today=monday + timedelta(days=3), batch_size=2)
+    assert len(await _reports(make_session, children)) == len(children)
+    await progress_reports.build_reports("weekly", today=monday + timedelta(days=7), batch_size=2)
+    assert len(await _reports(make_session, children)) == 2 * len(children)
+
+
+@pytest.mark.asyncio
+async def test_report_metadata(make_session):
+    today = daily_stats.local_today("Asia/Dubai")
+    (child,) = await _seed(make_session, 1, today)
+
+    async with make_session() as db:
+        report, meta = await progress_reports.get_report(db, child, 7)
+    assert meta["source"] == "on_demand" and not meta["stale"]
+    assert (report.start_date, report.end_date) == calendar_window("weekly", today)
+
+    async with make_session() as db:
+        report, meta = await progress_reports.get_report(db, child, 7)
+    assert meta["source"] == "precomputed" and not meta["stale"]
+    assert report.total_sessions == 2
+
+    # A report from an earlier week, or refreshed too long ago, is marked stale
+    async with make_session() as db:
+        stored = await db.get(ProgressReport, report.id)
+        stored.updated_at = datetime.utcnow() - timedelta(days=2)
+        await db.commit()
+        _, meta = await progress_reports.get_report(db, child, 7)
+    assert meta["stale"]
+
+    # Periods that are not materialized are computed over the last ``days`` days and not stored
+    async with make_session() as db:
+        report, meta = await progress_reports.get_report(db, child, 3)
+        stored = await db.scalar(select(func.count()).where(ProgressReport.child_id == child.id))
+    assert meta["source"] == "on_demand" and report.end_date - report.start_date == timedelta(days=3)
+    assert stored == 1
+
+
+@pytest.mark.asyncio
+async def test_sunday_evening_builds_use_the_guardians_local_week(make_session, monkeypatch):
+    sunday = date(2031, 3, 9)
+    # 21:00 UTC on Sunday is already Monday in Dubai
+    monkeypatch.setattr(daily_stats, "local_today", lambda timezone: sunday + timedelta(days=timezone != "UTC"))
+    (in_utc,) = await _seed(make_session, 1, sunday, timezone="UTC")
+    (in_dubai,) = await _seed(make_session, 1, sunday + timedelta(days=1))
+
+    await progress_reports.build_reports("weekly")
+    (utc_report,) = await _reports(make_session, [in_utc])
+    (dubai_report,) = await _reports(make_session, [in_dubai])
+    assert (utc_report.start_date, utc_report.end_date) == (sunday - timedelta(days=6), sunday)
+    assert (dubai_report.start_date, dubai_report.end_date) == (sunday + timedelta(days=1), sunday + timedelta(days=7))
+    assert utc_report.total_sessions == dubai_report.total_sessions == 2
+
+
+@pytest.mark.asyncio
+async def test_report_period_covers_the_week_so_far(make_session, monkeypatch):
+    monday = date(2031, 3, 10)
+    monkeypatch.setattr(daily_stats, "local_today", lambda timezone: monday)
+    (child,) = await _seed(make_session, 1, monday)
+
+    async with make_session() as db:
+        weekly = await assessments.generate_progress_report(str(child.id), days=7, session=db)
+        custom = await assessments.generate_progress_report(str(child.id), days=3, session=db)
+    assert weekly["reportPeriod"] == {
+        "period": "weekly",
+        "startDate": monday.isoformat(),
+        "endDate": monday.isoformat(),
+        "days": 1,
+    }
+    assert weekly["totalSessions"] == 2
+    assert custom["reportPeriod"]["period"] == "custom" and custom["reportPeriod"]["days"] == 3
@@ -0,0 +1,186 @@
+"""EXPLAIN regression suite for the hot progress and dashboard queries.
+
+Loads a synthetic dataset into a throwaway schema and asserts the planner
+answers each statement from ``app.services.progress_queries`` with index
+scans and, where the statement is ordered, without a Sort node.
+"""
+
+import hashlib
+from datetime import date, timedelta
+from uuid import UUID
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from app.services import chat_history, chat_partitions, progress_queries
+
+GUARDIANS = 50
+CHILDREN_PER_GUARDIAN = 4
+SESSIONS_PER_CHILD = 60
+STATS_DAYS = 90
+CHAT_SESSIONS = 2000
+MESSAGES_PER_SESSION = 50
+
+TODAY = date(2026, 1, 31)
+
+
+def _uuid(prefix: str, n: int) -> UUID:
+    """Deterministic ids matching the ``md5(prefix || n)::uuid`` expressions of the loader."""
+    return UUID(hashlib.md5(f"{prefix}{n}".encode()).hexdigest())
+
+
+SYNTHETIC_DATA = f"""
+INSERT INTO guardians (id, email, hashed_password, first_name, last_name, preferred_language, timezone,
+                       is_email_verified, is_active, created_at)
+SELECT md5('g' || g)::uuid, 'guardian' || g || '@example.com', 'x', 'Guardian', 'Test', 'ar', 'Asia/Dubai',
+       true, true, now()
+FROM generate_series(1, {GUARDIANS}) g;
+
+INSERT INTO children (id, guardian_id, first_name, birth_date, age_group, preferred_language, daily_time_limit,
+                      voice_enabled, chat_enabled, voice_recording_allowed, data_retention_days, total_points,
+                      current_streak, longest_streak, created_at)
+SELECT md5('c' || c)::uuid, md5('g' || (1 + (c - 1) / {CHILDREN_PER_GUARDIAN}))::uuid, 'Child', '2019-01-01',
+       '6-8', 'ar', 30, true, true, false, 90, 0, 0, 0, now()
+FROM generate_series(1, {GUARDIANS * CHILDREN_PER_GUARDIAN}) c;
+
+INSERT INTO lessons (id, title, description, subject, age_group, difficulty, estimated_duration, is_published,
+                     created_at)
+SELECT md5('l' || l)::uuid, 'Lesson', 'Lesson', 'arabic', '6-8', 'beginner', 15, true, now()
+FROM generate_series(1, 10) l;
+
+INSERT INTO sessions (id, child_id, lesson_id, subject, agent_id, status, start_time, score, time_spent,
+                      hints_used, final_score, points_earned, engagement_level, created_at)
+SELECT md5('s' || c || '-' || s)::uuid, md5('c' || c)::uuid, md5('l' || (1 + s % 10))::uuid,
+       (ARRAY['arabic', 'english', 'islamic'])[1 + s % 3], 'agent', 'completed',
+       timestamp '2026-01-31' - s * interval '7 hours', 0, 10, 0, 70 + s % 30, 10, 'high',
+       timestamp '2026-01-31' - s * interval '7 hours'
+FROM generate_series(1, {GUARDIANS * CHILDREN_PER_GUARDIAN}) c, generate_series(1, {SESSIONS_PER_CHILD}) s;
+
+INSERT INTO assessment_results (id, session_id, child_id, subject, overall_score, assessment_method, created_at)
+SELECT md5('a' || s.id::text)::uuid, s.id, s.child_id, s.subject, s.final_score, 'ai_evaluation', s.created_at
+FROM sessions s;
+
+INSERT INTO chat_messages (id, session_id, role, content, content_type, timestamp, is_flagged)
+SELECT md5('m' || s.id::text || '-' || m)::uuid, s.id, CASE WHEN m % 2 = 0 THEN 'child' ELSE 'agent' END, 'message',
+       'text', s.created_at + m * interval '1 second', false
+FROM (SELECT id, created_at FROM sessions ORDER BY id LIMIT {CHAT_SESSIONS}) s, generate_series(1, {MESSAGES_PER_SESSION}) m;
+
+INSERT INTO child_daily_stats (child_id, day, subject, sessions_started, sessions_completed, minutes, points,
+                               session_score_total, assessments_count, assessment_score_total, engagement_total,
+                               engagement_count, updated_at)
+SELECT md5('c' || c)::uuid, date '2026-01-31' - d, subject, 1, 1, 10, 10, 80, 1, 80, 3, 1, now()
+FROM generate_series(1, {GUARDIANS * CHILDREN_PER_GUARDIAN}) c, generate_series(0, {STATS_DAYS - 1}) d,
+     unnest(ARRAY['arabic', 'english', 'islamic']) subject;
+
+INSERT INTO progress_reports (id, child_id, guardian_id, report_period, start_date, end_date, total_sessions,
+                              total_time_spent, average_score, points_earned, created_at)
+SELECT md5('r' || c || '-' || w || p)::uuid, md5('c' || c)::uuid,
+       md5('g' || (1 + (c - 1) / {CHILDREN_PER_GUARDIAN}))::uuid, p,
+       date '2026-01-31' - (w * 7 + 7), date '2026-01-31' - w * 7, 5, 50, 80, 50, now()
+FROM generate_series(1, {GUARDIANS * CHILDREN_PER_GUARDIAN}) c, generate_series(0, 11) w,
+     unnest(ARRAY['weekly', 'monthly']) p;
+"""
+
+
+@pytest.fixture(scope="module")
+def loaded_engine(pg_engine):
+    """Engine whose schema holds the synthetic dataset with fresh statistics."""
+    with pg_engine.begin() as conn:
+        for offset in range(40):
+            conn.execute(text(chat_partitions.create_partition_sql(TODAY - timedelta(days=offset))))
+        conn.execute(text(SYNTHETIC_DATA))
+    with pg_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # Also sets the visibility map so covering indexes can serve index-only scans
+        conn.execute(text("VACUUM ANALYZE"))
+    return pg_engine
+
+
+def _explain(engine, statement) -> dict:
+    """Return the root plan node of ``statement`` as executed by the API."""
+    compiled = statement.compile(dialect=postgresql.dialect(), compile_kwargs={"render_postcompile": True})
+    params = {key: str(value) if isinstance(value, UUID) else value for key, value in compiled.params.items()}
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params).scalar()
+    return plan[0]["Plan"]
+
+
+def _nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def _scans_of(node: dict, table: str) -> bool:
+    """Whether ``node`` reads ``table`` or one of its daily partitions."""
+    relation = node.get("Relation Name", "")
+    return relation == table or relation.startswith(f"{table}_p")
+
+
+def _assert_indexed(plan: dict, table: str, index: str | None = None, index_only: bool = False):
+    nodes = list(_nodes(plan))
+    seq_scans = [node for node in nodes if node["Node Type"] == "Seq Scan" and _scans_of(node, table)]
+    assert not seq_scans, f"sequential scan on {table}"
+
+    scans = [node for node in nodes if _scans_of(node, table)]
+    assert scans, f"{table} not scanned"
+    if index is not None:
+        assert any(node.get("Index Name") == index for node in scans), f"{index} not used: {scans}"
+    if index_only:
+        assert all(node["Node Type"] == "Index Only Scan" for node in scans), f"heap access on {table}"
+
+
+def _assert_no_sort(plan: dict):
+    sorts = [node for node in _nodes(plan) if node["Node Type"] in ("Sort", "Incremental Sort")]
+    assert not sorts, "unexpected sort in plan"
+
+
+def test_recent_sessions_uses_covering_index(loaded_engine):
+    plan = _explain(loaded_engine, progress_queries.recent_sessions_query(_uuid("c", 7)))
+    _assert_indexed(plan, "sessions", "idx_sessions_child_created_cover", index_only=True)
+    _assert_no_sort(plan)
+
+
+def test_recent_assessments_uses_covering_index(loaded_engine):
+    plan = _explain(loaded_engine, progress_queries.recent_assessments_query(_uuid("c", 7)))
+    _assert_indexed(plan, "assessment_results", "idx_assessment_results_child_created_cover", index_only=True)
+    _assert_no_sort(plan)
+
+
+def test_latest_report_uses_period_index(loaded_engine):
+    plan = _explain(loaded_engine, progress_queries.latest_report_query(_uuid("c", 7), "weekly"))
+    _assert_indexed(plan, "progress_reports", "idx_progress_reports_period_date")
+    _assert_no_sort(plan)
+
+
+def test_child_subject_totals_uses_rollup_key(loaded_engine):
+    plan = _explain(loaded_engine, progress_queries.child_subject_totals_query(_uuid("c", 7)))
+    _assert_indexed(plan, "child_daily_stats")
+
+
+def test_guardian_daily_buckets_uses_rollup_key(loaded_engine):
+    plan = _explain(loaded_engine, progress_queries.guardian_daily_buckets_query(_uuid("g", 3), date(2026, 1, 1)))
+    _assert_indexed(plan, "children", "ix_children_guardian_id")
+    _assert_indexed(plan, "child_daily_stats")
+
+
+def test_report_totals_uses_rollup_key(loaded_engine):
+    child_ids = [_uuid("c", n) for n in range(1, 21)]
+    plan = _explain(loaded_engine, progress_queries.report_totals_query(child_ids, date(2026, 1, 24), TODAY))
+    _assert_indexed(plan, "child_daily_stats")
+
+
+def test_message_page_uses_keyset_index(loaded_engine):
+    with loaded_engine.connect() as conn:
+        session_id, timestamp, message_id = conn.execute(
+            text("SELECT session_id, timestamp, id FROM chat_messages ORDER BY session_id, timestamp LIMIT 1 OFFSET 120")
+        ).one()
+
+    query = chat_history.messages_query(session_id, (timestamp, message_id)).limit(chat_history.DEFAULT_PAGE_SIZE + 1)
+    plan = _explain(loaded_engine, query)
+    _assert_indexed(plan, "chat_messages")
+    _assert_no_sort(plan)
+
+    # The cursor's timestamp bound prunes every partition before the cursor's day
+    scanned = {node["Relation Name"] for node in _nodes(plan) if _scans_of(node, "chat_messages")}
+    assert chat_partitions.partition_name(timestamp.date() - timedelta(days=1)) not in scanned
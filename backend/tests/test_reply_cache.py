@@ -0,0 +1,142 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import cache as cache_module
+from app.core import single_flight
+from app.core.cache import invalidate
+from app.core.config import settings
+from app.core.safety_policies import DEFAULT_SAFETY_VALIDATOR
+from app.services import reply_cache, tutor_chat
+from app.services.agent_registry import AgentRegistry
+from app.services.entity_cache import lesson_tag
+from app.services.llm_providers import Completion
+from app.services.reply_cache import normalize_prompt
+
+
+@pytest.fixture(autouse=True)
+def local_only(monkeypatch):
+    async def no_redis():
+        return None
+
+    monkeypatch.setattr(cache_module, "_redis", no_redis)
+    monkeypatch.setattr(single_flight, "_redis", no_redis)
+    reply_cache.reply_cache.evict_local()
+
+
+@pytest.fixture
+def provider_calls(monkeypatch):
+    calls = []
+
+    async def reply(agent, user_message, history=None, child_name=None, context=None, age_group=None, fair_key=None):
+        calls.append((user_message, child_name))
+        await asyncio.sleep(0.01)
+        text = "تواصل معنا على www.example.com" if "رابط" in user_message else f"جواب {len(calls)}"
+        return Completion(text=text, provider="stub", model="stub-model", input_tokens=10, output_tokens=5)
+
+    monkeypatch.setattr(tutor_chat, "reply", reply)
+    return calls
+
+
+def test_normalization_folds_diacritics_and_whitespace():
+    assert normalize_prompt("  اُحْكِي لِي   عَنِ الحُرُوفِ ") == normalize_prompt("احكي لي عن الحروف")
+    assert normalize_prompt("مرحـــبا\tHello") == "مرحبا hello"
+    assert normalize_prompt("احكي لي عن الحروف") != normalize_prompt("احكي لي عن الأرقام")
+
+
+@pytest.mark.asyncio
+async def test_hits_skip_provider_and_safety_check(provider_calls):
+    agent = AgentRegistry().get("arabic")
+
+    first = await reply_cache.get_reply(agent, "احكي لي عن الحروف", lesson_id="l1", age_group="4-6", child_name="سارة")
+    second = await reply_cache.get_reply(agent, "اِحْكِي لي عن  الحروف", lesson_id="l1", age_group="4-6")
+
+    assert not first.cached and second.cached
+    assert second.completion.text == first.completion.text and second.safety == first.safety
+    # Shared replies never see a child's name
+    assert provider_calls == [("احكي لي عن الحروف", None)]
+
+    other_age = await reply_cache.get_reply(agent, "احكي لي عن الحروف", lesson_id="l1", age_group="7-9")
+    assert not other_age.cached
+
+    await invalidate(lesson_tag("l1"))
+    assert not (await reply_cache.get_reply(agent, "احكي لي عن الحروف", lesson_id="l1", age_group="4-6")).cached
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_prompts_share_one_call(provider_calls):
+    agent = AgentRegistry().get("arabic")
+
+    replies = await asyncio.gather(*(reply_cache.get_reply(agent, "ما هي الحروف؟", age_group="4-6") for _ in range(5)))
+
+    assert len(provider_calls) == 1
+    assert len({reply.completion.text for reply in replies}) == 1
+    assert [reply.shared for reply in replies].count(False) == 1
+    assert sum(reply.completion.output_tokens for reply in replies) == 5
+
+
+@pytest.mark.asyncio
+async def test_unsafe_replies_are_kept_briefly_and_opted_out_agents_not_at_all(provider_calls, monkeypatch):
+    agent = AgentRegistry().get("english")
+
+    flagged = await reply_cache.get_reply(agent, "أعطني رابط", age_group="4-6")
+    assert flagged.safety.flags == ("external_link",)
+    assert flagged.completion.text == DEFAULT_SAFETY_VALIDATOR.fallback_response("en")
+
+    again = await reply_cache.get_reply(agent, "أعطني رابط", age_group="4-6")
+    assert again.cached and again.safety == flagged.safety and again.completion.text == flagged.completion.text
+    assert len(provider_calls) == 1
+
+    # Expired after REPLY_CACHE_UNSAFE_TTL_SECONDS, well before the local TTL of safe replies
+    later = time.monotonic() + settings.REPLY_CACHE_UNSAFE_TTL_SECONDS + 1
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=lambda: later))
+    assert not (await reply_cache.get_reply(agent, "أعطني رابط", age_group="4-6")).cached
+    assert len(provider_calls) == 2
+
+    opted_out = agent.model_copy(update={"cacheReplies": False})
+    await reply_cache.get_reply(opted_out, "hello", child_name="Sam")
+    assert not (await reply_cache.get_reply(opted_out, "hello", child_name="Sam")).cached
+    assert provider_calls[-2:] == [("hello", "Sam"), ("hello", "Sam")]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_unsafe_prompts_share_one_call(provider_calls, monkeypatch):
+    monkeypatch.setattr(settings, "REPLY_COALESCING_ENABLED", False)
+    agent = AgentRegistry().get("english")
+
+    replies = await asyncio.gather(*(reply_cache.get_reply(agent, "أعطني رابط", age_group="4-6") for _ in range(5)))
+
+    assert len(provider_calls) == 1
+    assert all(reply.safety.flags == ("external_link",) for reply in replies)
+    assert {reply.completion.text for reply in replies} == {DEFAULT_SAFETY_VALIDATOR.fallback_response("en")}
+
+
+@pytest.mark.asyncio
+async def test_local_tier_is_size_bounded(provider_calls, monkeypatch):
+    monkeypatch.setattr(reply_cache.reply_cache, "_max_entries", 2)
+    agent = AgentRegistry().get("arabic")
+
+    for prompt in ("واحد", "اثنان", "ثلاثة"):
+        await reply_cache.get_reply(agent, prompt)
+
+    assert reply_cache.reply_cache.stats()["local_entries"] == 2
+    assert not (await reply_cache.get_reply(agent, "واحد")).cached
+
+
+@pytest.mark.parametrize(
+    "text, flags",
+    [
+        ("أحسنت! الحرف التالي هو الباء.", ()),
+        ("عد معي: 1 2 3 4 5 6 7", ()),
+        ("   ", ("empty",)),
+        ("اقرأ المزيد على https://example.com/letters", ("external_link",)),
+        ("راسلني على teacher@example.com", ("contact_details",)),
+        ("اتصل بي على ٠٥٠-١٢٣-٤٥٦٧", ("contact_details",)),
+    ],
+)
+def test_agent_response_checks(text, flags):
+    verdict = DEFAULT_SAFETY_VALIDATOR.check_agent_response(text, "arabic", "4-6")
+    assert verdict.flags == flags and verdict.passed == (not flags)
+    assert DEFAULT_SAFETY_VALIDATOR.validate_agent_response(text, "arabic", "4-6") == (verdict.passed, verdict.reason)
@@ -0,0 +1,152 @@
+"""Retention cutoffs, batched and resumable purges, the throttle and dry-run reports."""
+
+import dataclasses
+import time
+from datetime import date, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.child import Child
+from app.models.guardian import Guardian
+from app.models.lesson import Lesson
+from app.models.retention import RetentionCheckpoint
+from app.models.session import ChatMessage
+from app.models.session import Session as LearningSession
+from app.services import retention
+from app.services.retention import TARGETS_BY_NAME
+
+
+@pytest.fixture
+def make_session(async_pg_engine, monkeypatch, tmp_path):
+    make_session = sessionmaker(async_pg_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(retention, "AsyncSessionLocal", make_session)
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "AUDIO_RETENTION_DAYS", 7)
+    monkeypatch.setattr(settings, "CHAT_RETENTION_DAYS", 30)
+    return make_session
+
+
+async def _seed(make_session, retention_days: int, ages: list[int]) -> tuple[Child, list[ChatMessage]]:
+    """A child keeping data for ``retention_days`` days, with one audio message per age in days."""
+    guardian = Guardian(email=f"{uuid4().hex}@example.com", hashed_password="x", first_name="G", last_name="T")
+    child = Child(
+        guardian_id=guardian.id,
+        first_name="C",
+        birth_date=date(2019, 1, 1),
+        age_group="6-8",
+        data_retention_days=retention_days,
+    )
+    lesson = Lesson(
+        title="L", description="L", subject="arabic", age_group="6-8", difficulty="beginner", estimated_duration=10
+    )
+    learning_session = LearningSession(child_id=child.id, lesson_id=lesson.id, subject="arabic", agent_id="agent")
+    now = datetime.utcnow()
+    messages = [
+        ChatMessage(
+            session_id=learning_session.id,
+            role="child",
+            content="...",
+            content_type="audio",
+            audio_url=f"audio/{uuid4().hex}.webm",
+            timestamp=now - timedelta(days=age, hours=1),
+        )
+        for age in ages
+    ]
+    async with make_session() as db:
+        db.add(guardian)
+        await db.flush()
+        db.add_all([child, lesson])
+        await db.flush()
+        db.add(learning_session)
+        await db.flush()
+        db.add_all(messages)
+        await db.commit()
+    return child, messages
+
+
+def _scoped(name: str, child: Child) -> retention.RetentionTarget:
+    """Target ``name`` limited to one child's rows, under its own checkpoint."""
+    target = TARGETS_BY_NAME[name]
+    return dataclasses.replace(
+        target,
+        name=f"{name}-{child.id}",
+        candidates=lambda now, days: target.candidates(now, days).where(Child.id == child.id),
+    )
+
+
+async def _candidates(make_session, name: str, child: Child) -> set:
+    target = TARGETS_BY_NAME[name]
+    async with make_session() as db:
+        rows = await db.execute(target.candidates(datetime.utcnow(), target.days()).where(Child.id == child.id))
+        return {row.id for row in rows}
+
+
+@pytest.mark.asyncio
+async def test_the_shorter_retention_period_applies(make_session):
+    ages = [3, 10, 40]
+    # The child keeps data longer than audio's global 7 days: audio still goes after 7 days
+    child, (_, week_old, month_old) = await _seed(make_session, 30, ages)
+    assert await _candidates(make_session, "audio_recordings", child) == {week_old.id, month_old.id}
+    assert await _candidates(make_session, "chat_messages", child) == {month_old.id}
+
+    # The child keeps data for less than both global periods
+    child, (_, week_old, month_old) = await _seed(make_session, 5, ages)
+    assert await _candidates(make_session, "audio_recordings", child) == {week_old.id, month_old.id}
+    assert await _candidates(make_session, "chat_messages", child) == {week_old.id, month_old.id}
+
+    # The child keeps data for a year: the global 30 days still apply to chat
+    child, (_, week_old, month_old) = await _seed(make_session, 365, ages)
+    assert await _candidates(make_session, "chat_messages", child) == {month_old.id}
+
+
+@pytest.mark.asyncio
+async def test_purges_in_throttled_batches_and_resumes_from_the_checkpoint(make_session, monkeypatch, tmp_path):
+    child, messages = await _seed(make_session, 30, [40] * 5 + [1])
+    for message in messages:
+        (tmp_path / message.audio_url).parent.mkdir(exist_ok=True)
+        (tmp_path / message.audio_url).write_bytes(b"audio")
+    target = _scoped("chat_messages", child)
+
+    # A pass interrupted after its first batch
+    checkpoint = await retention._load_checkpoint(target)
+    assert await retention._purge_batch(target, checkpoint, batch_size=2) == 2
+
+    # Resumes with the same cutoff, two rows per batch at no more than 10 rows a second
+    monkeypatch.setattr(settings, "RETENTION_ROWS_PER_SECOND", 10)
+    started = time.monotonic()
+    assert await retention.purge_target(target, batch_size=2) == 3
+    assert time.monotonic() - started >= 0.35  # Two batches of at least 0.2 s each
+
+    async with make_session() as db:
+        remaining = await db.scalar(
+            select(func.count()).select_from(ChatMessage).where(ChatMessage.session_id == messages[0].session_id)
+        )
+        checkpoint = await db.get(RetentionCheckpoint, target.name)
+    assert remaining == 1
+    assert checkpoint.rows_purged == 5 and checkpoint.files_purged == 5
+    assert checkpoint.completed_at is not None and checkpoint.last_id is None
+    assert [path.name for path in (tmp_path / "audio").iterdir()] == [messages[-1].audio_url.split("/")[-1]]
+
+
+@pytest.mark.asyncio
+async def test_dry_run_counts_without_purging(make_session):
+    child, messages = await _seed(make_session, 30, [10, 10, 10, 1])
+    target = _scoped("audio_recordings", child)
+
+    report = (await retention.dry_run_report([target]))[target.name]
+    assert report["rows"] == 3 and report["files"] == 3 and not report["resuming"]
+    assert report["policy"] == "AUDIO_RECORDINGS" and report["retentionDays"] == 7
+
+    # A pass in progress is reported from its checkpoint
+    checkpoint = await retention._load_checkpoint(target)
+    await retention._purge_batch(target, checkpoint, batch_size=1)
+    report = (await retention.dry_run_report([target]))[target.name]
+    assert report["resuming"] and report["rows"] == 2
+    assert report["referenceTime"] == checkpoint.reference_time.isoformat()
+    left = await _candidates(make_session, "audio_recordings", child)
+    assert len(left) == 2 and left < {message.id for message in messages[:3]}
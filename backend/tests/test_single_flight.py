@@ -0,0 +1,113 @@
+"""Request coalescing within a worker (Redis disabled), and across workers when Redis is reachable."""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from app.core import single_flight
+from app.core.database import get_redis
+from app.core.single_flight import SingleFlight
+
+
+@pytest.fixture
+def local_only(monkeypatch):
+    async def no_redis():
+        return None
+
+    monkeypatch.setattr(single_flight, "_redis", no_redis)
+
+
+def _upstream(delay: float = 0.05):
+    calls = []
+    cancelled = []
+
+    async def call():
+        calls.append(True)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return {"text": "answer", "call": len(calls)}
+
+    return call, calls, cancelled
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution(local_only):
+    flight = SingleFlight(f"test-{uuid4().hex[:8]}")
+    call, calls, _ = _upstream()
+
+    results = await asyncio.gather(*(flight.run("key", call) for _ in range(10)))
+
+    assert len(calls) == 1
+    assert all(result == {"text": "answer", "call": 1} for result, _ in results)
+    assert sum(shared for _, shared in results) == 9
+    stats = flight.stats()
+    assert stats["executions"] == 1 and stats["local_shared"] == 9 and stats["in_flight"] == 0
+
+    # Later calls are not coalesced with finished ones
+    assert (await flight.run("key", call)) == ({"text": "answer", "call": 2}, False)
+
+
+@pytest.mark.asyncio
+async def test_leader_disconnect_does_not_fail_followers(local_only):
+    flight = SingleFlight(f"test-{uuid4().hex[:8]}")
+    call, calls, cancelled = _upstream()
+
+    leader = asyncio.create_task(flight.run("key", call))
+    await asyncio.sleep(0.01)
+    follower = asyncio.create_task(flight.run("key", call))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert (await follower) == ({"text": "answer", "call": 1}, True)
+    assert leader.cancelled() and len(calls) == 1 and not cancelled
+
+
+@pytest.mark.asyncio
+async def test_upstream_is_cancelled_when_every_waiter_leaves(local_only):
+    flight = SingleFlight(f"test-{uuid4().hex[:8]}")
+    call, calls, cancelled = _upstream()
+
+    waiters = [asyncio.create_task(flight.run("key", call)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.sleep(0.01)
+
+    assert cancelled == [True] and flight.stats()["in_flight"] == 0
+    assert (await flight.run("key", call))[0]["call"] == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter(local_only):
+    flight = SingleFlight(f"test-{uuid4().hex[:8]}")
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    results = await asyncio.gather(*(flight.run("key", failing) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_workers_share_one_execution_through_redis():
+    try:
+        redis = await get_redis()
+        await redis.ping()
+    except Exception:
+        pytest.skip("Redis not reachable")
+
+    # Two groups with one name stand in for two workers
+    name = f"test-{uuid4().hex[:8]}"
+    workers = [SingleFlight(name), SingleFlight(name)]
+    call, calls, _ = _upstream(delay=0.2)
+
+    results = await asyncio.gather(*(worker.run("key", call) for worker in workers for _ in range(3)))
+
+    assert len(calls) == 1
+    assert all(result == {"text": "answer", "call": 1} for result, _ in results)
+    assert sum(worker.stats()["remote_shared"] for worker in workers) == 1
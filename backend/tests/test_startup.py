@@ -0,0 +1,30 @@
+import pytest
+
+from app.core.database import MIGRATIONS_DIR, migration_head
+
+
+def _write_migration(directory, name, revision, down_revision):
+    down = f'"{down_revision}"' if down_revision else "None"
+    (directory / f"{name}.py").write_text(f'revision = "{revision}"\ndown_revision = {down}\n')
+
+
+def test_migration_head_of_repo_is_latest_migration():
+    latest = sorted(path.name for path in MIGRATIONS_DIR.glob("[0-9]*.py"))[-1]
+    assert migration_head() == latest.split("_")[0]
+
+
+def test_migration_head_follows_chain(tmp_path):
+    _write_migration(tmp_path, "001_initial", "001", None)
+    _write_migration(tmp_path, "002_second", "002", "001")
+    _write_migration(tmp_path, "003_third", "003", "002")
+
+    assert migration_head(tmp_path) == "003"
+
+
+def test_migration_head_rejects_branches(tmp_path):
+    _write_migration(tmp_path, "001_initial", "001", None)
+    _write_migration(tmp_path, "002_left", "002a", "001")
+    _write_migration(tmp_path, "002_right", "002b", "001")
+
+    with pytest.raises(RuntimeError):
+        migration_head(tmp_path)